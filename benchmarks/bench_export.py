@@ -0,0 +1,87 @@
+"""Benchmark of the HTTP requests made by exports.
+
+Exports run through the real `spotipy` client against the fake Spotify Web API
+of `tests.spotify_server.SpotifyServer`, which pages and batches like Spotify
+and counts requests by endpoint and bytes sent. Per number of tracks, a
+playlist goes through the typical life of an export:
+
+- `create`: the playlist is created and filled.
+- `unchanged`: the same tracks are exported again given the previous state.
+- `append`: 10 % new tracks are exported given the previous state.
+- `sync`: a shuffled tenth of the tracks is replaced and the order changed, in
+  sync mode, without state so that the playlist is read back.
+
+The user owns `--playlists` other playlists, which are paged through to find
+the playlist by name, and the server delays every answer by `--latency`.
+
+Usage:
+    python benchmarks/bench_export.py [-t TRACKS ...] [-p PLAYLISTS] [-l LATENCY_MS] [-o OUTPUT]
+"""
+
+import argparse
+import contextlib
+import io
+import random
+
+from typing import Dict, List
+
+from common import report, timed
+
+from tests.spotify_server import SpotifyServer
+from tests.test_data.synthetic import track_uri
+
+TRACKS = [100, 1000, 10000]
+PLAYLISTS = 120
+# high enough for the client's rate limiting not to dominate the results
+RATE = 1000
+
+
+def _scenarios(n: int) -> Dict[str, dict]:
+    rng = random.Random(n)
+    uris = [track_uri(i) for i in range(n)]
+    appended = uris + [track_uri(i) for i in range(n, n + n // 10)]
+    synced = appended[n // 10:] + [track_uri(i) for i in range(2 * n, 2 * n + n // 10)]
+    rng.shuffle(synced)
+    return {'create': dict(track_uris=uris),
+            'unchanged': dict(track_uris=uris),
+            'append': dict(track_uris=appended),
+            'sync': dict(track_uris=synced, sync=True)}
+
+
+def run(tracks: List[int], playlists: int = PLAYLISTS, latency_ms: float = 0.0) -> Dict[str, dict]:
+    """Measures the requests made per number of tracks and stage of a playlist's life."""
+    results = {}
+    for n in tracks:
+        with SpotifyServer(playlists=playlists, latency=latency_ms / 1000) as server:
+            spc = server.connect(rate=RATE)
+            state = None
+            for scenario, kwargs in _scenarios(n).items():
+                if scenario == 'sync':
+                    state = None
+                    spc.invalidate_playlist_index()
+                server.requests.clear()
+                server.bytes = 0
+                result = []
+                with contextlib.redirect_stderr(io.StringIO()):  # progress bars
+                    seconds = timed(lambda: result.append(spc.export('bench-playlist', state=state, **kwargs)))
+                state = result[0].state
+                results[f'tracks_{n}_{scenario}'] = {
+                    'seconds': seconds,
+                    'requests': sum(server.requests.values()),
+                    'bytes': server.bytes,
+                    **{f'requests_{k}': v for k, v in sorted(server.requests.items())}}
+    return results
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description='Count HTTP requests made by exports against a local server.')
+    parser.add_argument('-t', '--tracks', type=int, nargs='+', default=TRACKS, help='Sizes of playlists in tracks.')
+    parser.add_argument('-p', '--playlists', type=int, default=PLAYLISTS, help='Number of other playlists of the user.')
+    parser.add_argument('-l', '--latency', type=float, default=0.0, help='Latency of the server in milliseconds.')
+    parser.add_argument('-o', '--output', help='Path of JSON file to write results to.')
+    args = parser.parse_args()
+    report({'export': run(args.tracks, args.playlists, args.latency)}, args.output)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,90 @@
+"""Benchmark of ingesting scraped data into the database.
+
+Synthetic shows of growing size are inserted with `insert_json_data` into a
+fresh database file each, then inserted again to measure re-ingesting media
+without changes, as done by every `fetch` of an unchanged show.
+
+Catalogs of growing numbers of titles of mixed types and sizes, with songs
+shared among media and songs without Spotify link, are generated and ingested
+title by title to measure how ingest scales with the size of the database.
+Only the inserts are timed.
+
+Usage:
+    python benchmarks/bench_ingest.py [-e EPISODES ...] [-s SONGS] [-t TITLES ...] [-o OUTPUT]
+"""
+
+import argparse
+import os
+import tempfile
+import time
+
+from typing import Dict, List
+
+from common import report, timed
+
+from tests.test_data.synthetic import SyntheticCatalog
+from tunefind2spotify.core.db import DBConnector
+
+EPISODES = [10, 100, 1000]
+EPISODES_PER_SEASON = 10
+TITLES = [1000, 10000]
+REUSE = 0.2
+MISSING = 0.1
+
+
+def run(episodes: List[int], songs_per_episode: int = 10) -> Dict[str, dict]:
+    """Measures ingesting a show per number of episodes."""
+    results = {}
+    for n in episodes:
+        show = SyntheticCatalog().show('bench-show', max(1, n // EPISODES_PER_SEASON), min(n, EPISODES_PER_SEASON),
+                                       songs_per_episode)
+        songs = n * songs_per_episode
+        with tempfile.TemporaryDirectory() as tmp:
+            dbc = DBConnector(db_filepath=os.path.join(tmp, 'bench.db'))
+            first = timed(dbc.insert_json_data, show)
+            again = timed(dbc.insert_json_data, show)
+            dbc.conn.close()
+        results[f'episodes_{n}'] = {'songs': songs,
+                                    'seconds': first,
+                                    'songs_per_s': songs / first,
+                                    'reingest_seconds': again,
+                                    'reingest_songs_per_s': songs / again}
+    return results
+
+
+def run_catalog(titles: List[int]) -> Dict[str, dict]:
+    """Measures ingesting a catalog per number of titles."""
+    results = {}
+    for n in titles:
+        matches, seconds = 0, 0.0
+        with tempfile.TemporaryDirectory() as tmp:
+            dbc = DBConnector(db_filepath=os.path.join(tmp, 'bench.db'))
+            # the catalog is consumed as generated, never held in memory
+            for media in SyntheticCatalog(reuse=REUSE, missing=MISSING).generate(n):
+                matches += len(media['songs']) if 'songs' in media else \
+                    sum(len(e['songs']) for s in media['seasons'] for e in s['episodes'])
+                start = time.perf_counter()
+                dbc.insert_json_data(media)
+                seconds += time.perf_counter() - start
+            songs = dbc._execute('SELECT COUNT(*) FROM songs').fetchone()[0]
+            dbc.conn.close()
+        results[f'titles_{n}'] = {'songs': songs,
+                                  'matches': matches,
+                                  'seconds': seconds,
+                                  'titles_per_s': n / seconds,
+                                  'matches_per_s': matches / seconds}
+    return results
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description='Measure ingest throughput of synthetic shows.')
+    parser.add_argument('-e', '--episodes', type=int, nargs='+', default=EPISODES, help='Sizes of shows in episodes.')
+    parser.add_argument('-s', '--songs', type=int, default=10, help='Songs per episode.')
+    parser.add_argument('-t', '--titles', type=int, nargs='+', default=TITLES, help='Sizes of catalogs in titles.')
+    parser.add_argument('-o', '--output', help='Path of JSON file to write results to.')
+    args = parser.parse_args()
+    report({'ingest': {**run(args.episodes, args.songs), **run_catalog(args.titles)}}, args.output)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,72 @@
+"""Benchmark of reading track URIs from databases of growing size.
+
+A database is filled with synthetic media in blocks of 1000 songs (one show of
+5 seasons with 10 episodes of 10 songs, and 10 movies of 50 songs). Once it
+holds the given numbers of songs, the latency of the queries run by exports is
+measured for media picked at random.
+
+Usage:
+    python benchmarks/bench_query.py [-s SIZE ...] [-q QUERIES] [-o OUTPUT]
+"""
+
+import argparse
+import os
+import random
+import tempfile
+
+from typing import Dict, List
+
+from common import report, summarize, timed
+
+from tests.test_data.synthetic import SyntheticCatalog
+from tunefind2spotify.core.db import DBConnector
+
+SIZES = [10_000, 100_000, 1_000_000]
+BLOCK_SIZE = 1000
+
+
+def _fill(dbc: DBConnector, catalog: SyntheticCatalog, blocks: range) -> None:
+    for i in blocks:
+        dbc.insert_json_data(catalog.show(f'show-{i}', seasons=5, episodes=10, songs_per_episode=10))
+        for j in range(10):
+            dbc.insert_json_data(catalog.movie(f'movie-{i}-{j}', songs=50))
+
+
+def run(sizes: List[int], queries: int = 100) -> Dict[str, dict]:
+    """Measures query latencies per number of songs in the database."""
+    rng = random.Random(0)
+    catalog = SyntheticCatalog()
+    results = {}
+    blocks = 0
+    with tempfile.TemporaryDirectory() as tmp:
+        dbc = DBConnector(db_filepath=os.path.join(tmp, 'bench.db'))
+        for size in sorted(sizes):
+            build = timed(_fill, dbc, catalog, range(blocks, size // BLOCK_SIZE))
+            blocks = size // BLOCK_SIZE
+            shows = [f'show-{rng.randrange(blocks)}' for _ in range(queries)]
+            movies = [f'movie-{rng.randrange(blocks)}-{rng.randrange(10)}' for _ in range(queries)]
+            results[f'songs_{size}'] = {
+                    'build_seconds': build,
+                    'file_mb': os.path.getsize(os.path.join(tmp, 'bench.db')) / 2 ** 20,
+                    **{f'movie_{k}': v for k, v in
+                       summarize([timed(dbc.get_track_uris_media, x) for x in movies]).items()},
+                    **{f'show_{k}': v for k, v in
+                       summarize([timed(dbc.get_track_uris_show, x) for x in shows]).items()},
+                    **{f'by_episode_{k}': v for k, v in
+                       summarize([timed(dbc.get_track_uris_by_episode, x) for x in shows]).items()}}
+        dbc.conn.close()
+    return results
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description='Measure latency of track URI queries by database size.')
+    parser.add_argument('-s', '--sizes', type=int, nargs='+', default=SIZES,
+                        help=f'Numbers of songs in the database, rounded down to multiples of {BLOCK_SIZE}.')
+    parser.add_argument('-q', '--queries', type=int, default=100, help='Queries per kind and size.')
+    parser.add_argument('-o', '--output', help='Path of JSON file to write results to.')
+    args = parser.parse_args()
+    report({'query': run(args.sizes, args.queries)}, args.output)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,70 @@
+"""Benchmark of scraping throughput against a local stand-in for Tunefind.
+
+A synthetic show is served by `tests.tunefind_server.TunefindServer`, which
+delays every answer by the configured latency, and scraped once per latency.
+Each song with a Spotify link costs two requests for resolving its forward link
+on top of the requests for seasons and episodes, so the results show how much
+of a scrape is spent waiting on the network. Optionally, the server adds
+jitter and answers with throttling (HTTP 429) or server errors (HTTP 5xx) at
+given rates, which the scraper retries.
+
+Usage:
+    python benchmarks/bench_scrape.py [-l LATENCY_MS ...] [-j JITTER_MS] [--throttle RATE] [--errors RATE]
+        [-o OUTPUT]
+"""
+
+import argparse
+import contextlib
+import io
+
+from typing import Dict, List
+
+from common import report, timed
+
+from tests.test_data.synthetic import SyntheticCatalog
+from tests.tunefind_server import TunefindServer
+from tunefind2spotify.core import tunefind_scraper
+from tunefind2spotify.utils import MediaType
+
+LATENCIES_MS = [0, 5, 20]
+
+
+def run(latencies_ms: List[float],
+        jitter_ms: float = 0.0,
+        throttle: float = 0.0,
+        errors: float = 0.0,
+        seasons: int = 2,
+        episodes: int = 5,
+        songs_per_episode: int = 8) -> Dict[str, dict]:
+    """Measures scraping a show per latency of the server in milliseconds."""
+    show = SyntheticCatalog().show('bench-show', seasons, episodes, songs_per_episode)
+    songs = seasons * episodes * songs_per_episode
+    results = {}
+    for latency in latencies_ms:
+        with TunefindServer([show], latency=latency / 1000, jitter=jitter_ms / 1000, throttle=throttle,
+                            errors=errors) as server:
+            tunefind_scraper.set_base_url(server.url)
+            with contextlib.redirect_stderr(io.StringIO()):  # progress bars
+                seconds = timed(tunefind_scraper.scrape, show['media_name'], MediaType.SHOW)
+        results[f'latency_{latency:g}ms'] = {'seconds': seconds,
+                                             'requests': server.requests,
+                                             'connections': server.connections,
+                                             'requests_per_s': server.requests / seconds,
+                                             'songs_per_s': songs / seconds}
+    return results
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description='Measure scraping throughput against a local server.')
+    parser.add_argument('-l', '--latency', type=float, nargs='+', default=LATENCIES_MS,
+                        help='Latencies of the server in milliseconds.')
+    parser.add_argument('-j', '--jitter', type=float, default=0.0, help='Jitter of the server in milliseconds.')
+    parser.add_argument('--throttle', type=float, default=0.0, help='Rate of throttled requests.')
+    parser.add_argument('--errors', type=float, default=0.0, help='Rate of requests failing with HTTP 5xx.')
+    parser.add_argument('-o', '--output', help='Path of JSON file to write results to.')
+    args = parser.parse_args()
+    report({'scrape': run(args.latency, args.jitter, args.throttle, args.errors)}, args.output)
+
+
+if __name__ == '__main__':
+    main()
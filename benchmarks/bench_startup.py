@@ -0,0 +1,76 @@
+"""Benchmark of the cold-start time of the command line interface.
+
+Each subcommand is invoked with `--help` (and pseudo-subcommand `version` as
+`--version`) in a fresh interpreter, so that the
+measured time is dominated by interpreter startup, imports and parser
+construction, i.e. the overhead every invocation of the CLI pays. The fastest
+and the median of the repetitions are reported per subcommand.
+
+Usage:
+    python benchmarks/bench_startup.py [-n REPETITIONS] [SUBCOMMAND ...]
+"""
+
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+import time
+
+from typing import Dict, List
+
+TOP_LEVEL_PATH = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+MAIN = os.path.join(TOP_LEVEL_PATH, 'tunefind2spotify', 'cmd', 'main.py')
+SUBCOMMANDS = ['version', 'fetch', 'export', 'export-many', 'export-seasons', 'match', 'pull', 'search', 'dump',
+               'load']
+
+
+def measure(argv: List[str], repetitions: int) -> List[float]:
+    """Measures the wall time in seconds of running a command repeatedly.
+
+    Args:
+        argv: Command and its arguments.
+        repetitions: Number of runs.
+
+    Returns:
+        Wall time of each run.
+    """
+    times = []
+    for _ in range(repetitions):
+        start = time.perf_counter()
+        subprocess.run(argv, cwd=TOP_LEVEL_PATH, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL, check=True)
+        times.append(time.perf_counter() - start)
+    return times
+
+
+def run(subcommands: List[str], repetitions: int) -> Dict[str, Dict[str, float]]:
+    """Measures the cold-start time per subcommand in milliseconds.
+
+    Note:
+        The startup of a bare interpreter is measured as reference under key
+        `(python)`.
+    """
+    commands = {'(python)': [sys.executable, '-c', 'pass']}
+    for subcommand in subcommands:
+        args = ['--version'] if subcommand == 'version' else [subcommand, '--help']
+        commands[subcommand] = [sys.executable, MAIN] + args
+    results = {}
+    for name, argv in commands.items():
+        times = measure(argv, repetitions)
+        results[name] = {'min_ms': min(times) * 1000, 'median_ms': statistics.median(times) * 1000}
+    return results
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description='Measure cold-start time of the CLI per subcommand.')
+    parser.add_argument('subcommands', nargs='*', default=SUBCOMMANDS, help='Subcommands to measure.')
+    parser.add_argument('-n', '--repetitions', type=int, default=10, help='Invocations per subcommand.')
+    args = parser.parse_args()
+    results = run(args.subcommands, args.repetitions)
+    width = max(len(x) for x in results)
+    for subcommand, x in results.items():
+        print(f'{subcommand:<{width}}  min {x["min_ms"]:7.1f} ms  median {x["median_ms"]:7.1f} ms')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,80 @@
+"""Helpers shared by the benchmarks.
+
+Importing this module makes the packages `tunefind2spotify` and `tests` of the
+working tree importable and silences logging below warnings, so that neither
+log output nor the log file interfere with measurements.
+
+Results are written as JSON documents with keys `meta` (see `metadata`) and
+`results` (by benchmark, then by case, metrics named after their unit, e.g.
+`seconds`, `p50_ms`, `songs_per_s` or `calls`), to be compared across runs with
+`benchmarks/compare.py`.
+"""
+
+import json
+import math
+import os
+import platform
+import sqlite3
+import subprocess
+import sys
+import time
+
+from datetime import datetime
+from typing import Callable, Dict, List, Optional
+
+TOP_LEVEL_PATH = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if TOP_LEVEL_PATH not in sys.path:
+    sys.path.insert(0, TOP_LEVEL_PATH)
+
+from tunefind2spotify.log import configure_logging  # noqa: E402
+
+configure_logging('WARNING', None)
+
+
+def timed(func: Callable, *args, **kwargs) -> float:
+    """Returns the wall time in seconds of calling a function."""
+    start = time.perf_counter()
+    func(*args, **kwargs)
+    return time.perf_counter() - start
+
+
+def summarize(seconds: List[float]) -> Dict[str, float]:
+    """Summarizes durations as count and nearest-rank percentiles in milliseconds."""
+    values = sorted(x * 1000 for x in seconds)
+    return {'count': len(values),
+            'p50_ms': values[max(0, math.ceil(len(values) / 2) - 1)],
+            'p95_ms': values[max(0, math.ceil(len(values) * 0.95) - 1)],
+            'max_ms': values[-1]}
+
+
+def metadata() -> Dict[str, str]:
+    """Describes the environment of a run."""
+    try:
+        commit = subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], cwd=TOP_LEVEL_PATH, capture_output=True,
+                                text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        commit = ''
+    return {'timestamp': datetime.now().isoformat(timespec='seconds'),
+            'commit': commit,
+            'python': platform.python_version(),
+            'sqlite': sqlite3.sqlite_version,
+            'platform': platform.platform()}
+
+
+def report(results: Dict[str, Dict[str, dict]], output: Optional[str] = None) -> None:
+    """Prints results by benchmark and case, and writes them to file as JSON.
+
+    Args:
+        results: Metrics by case by benchmark.
+        output: Path of the JSON file. Optional, defaults to `None` in which
+            case nothing is written.
+    """
+    for benchmark, cases in results.items():
+        print(f'[{benchmark}]')
+        for case, metrics in cases.items():
+            print(f'  {case}: ' + ', '.join(f'{k}={v:.4g}' if isinstance(v, float) else f'{k}={v}'
+                                            for k, v in metrics.items()))
+    if output:
+        with open(output, 'w') as f:
+            json.dump({'meta': metadata(), 'results': results}, f, indent=2)
+        print(f'Wrote results to \'{output}\'.')
@@ -0,0 +1,69 @@
+"""Compares the results of two benchmark runs.
+
+Prints the relative change of every metric found in both result files and flags
+regressions beyond the threshold. Metrics named `*_per_s` are better when
+higher; all other metrics (durations, request and call counts, sizes) are
+better when lower. Exits with status 1 if any metric regressed.
+
+Usage:
+    python benchmarks/compare.py BASELINE CURRENT [-t THRESHOLD]
+"""
+
+import argparse
+import json
+import sys
+
+from typing import Dict, List, Tuple
+
+
+def _flatten(results: Dict[str, Dict[str, dict]]) -> Dict[str, float]:
+    return {f'{benchmark}.{case}.{metric}': value
+            for benchmark, cases in results.items()
+            for case, metrics in cases.items()
+            for metric, value in metrics.items()
+            if isinstance(value, (int, float))}
+
+
+def compare(baseline: dict, current: dict, threshold: float) -> List[Tuple[str, float, float, float, bool]]:
+    """Compares the metrics of two runs.
+
+    Args:
+        baseline: Results of the earlier run, as written by `common.report`.
+        current: Results of the later run.
+        threshold: Relative change beyond which a change for the worse is a
+            regression, e.g. 0.1 for 10 %.
+
+    Returns:
+        Per metric found in both runs, its name, both values, the relative
+        change and whether it regressed.
+    """
+    old, new = _flatten(baseline['results']), _flatten(current['results'])
+    rows = []
+    for name in [x for x in old if x in new]:
+        change = (new[name] - old[name]) / old[name] if old[name] else 0.0
+        worse = -change if name.endswith('_per_s') else change
+        rows.append((name, old[name], new[name], change, worse > threshold))
+    return rows
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description='Compare the results of two benchmark runs.')
+    parser.add_argument('baseline', help='JSON file of the earlier run.')
+    parser.add_argument('current', help='JSON file of the later run.')
+    parser.add_argument('-t', '--threshold', type=float, default=0.1,
+                        help='Relative change for the worse counted as regression.')
+    args = parser.parse_args()
+    with open(args.baseline) as f:
+        baseline = json.load(f)
+    with open(args.current) as f:
+        current = json.load(f)
+    rows = compare(baseline, current, args.threshold)
+    width = max([len(x[0]) for x in rows] + [len('metric')])
+    print(f'{"metric":<{width}} {"baseline":>12} {"current":>12} {"change":>8}')
+    for name, old, new, change, regressed in rows:
+        print(f'{name:<{width}} {old:>12.4g} {new:>12.4g} {change:>+8.1%}' + ('  REGRESSION' if regressed else ''))
+    sys.exit(1 if any(x[-1] for x in rows) else 0)
+
+
+if __name__ == '__main__':
+    main()
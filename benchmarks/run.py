@@ -0,0 +1,44 @@
+"""Runs all offline benchmarks and writes their results to one JSON file.
+
+With `--quick`, the largest sizes (e.g. the database of 1M songs) are skipped
+to get results within a few seconds.
+
+Usage:
+    python benchmarks/run.py [--quick] [-o OUTPUT] [BENCHMARK ...]
+"""
+
+import argparse
+
+from common import report
+
+import bench_export
+import bench_ingest
+import bench_query
+import bench_scrape
+
+
+def _ingest(quick: bool) -> dict:
+    return {**bench_ingest.run(bench_ingest.EPISODES[:2] if quick else bench_ingest.EPISODES),
+            **bench_ingest.run_catalog(bench_ingest.TITLES[:1] if quick else bench_ingest.TITLES)}
+
+
+BENCHMARKS = {'scrape': lambda quick: bench_scrape.run(bench_scrape.LATENCIES_MS[:2] if quick
+                                                       else bench_scrape.LATENCIES_MS),
+              'ingest': _ingest,
+              'query': lambda quick: bench_query.run(bench_query.SIZES[:1] if quick else bench_query.SIZES),
+              'export': lambda quick: bench_export.run(bench_export.TRACKS[:2] if quick else bench_export.TRACKS)}
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description='Run the offline benchmarks.')
+    parser.add_argument('benchmarks', nargs='*', help=f'Benchmarks to run out of {list(BENCHMARKS)}, all by default.')
+    parser.add_argument('--quick', action='store_true', help='Skip the largest sizes.')
+    parser.add_argument('-o', '--output', default='benchmark.json', help='Path of JSON file to write results to.')
+    args = parser.parse_args()
+    if unknown := [x for x in args.benchmarks if x not in BENCHMARKS]:
+        parser.error(f'Unknown benchmarks: {unknown}')
+    report({x: BENCHMARKS[x](args.quick) for x in args.benchmarks or BENCHMARKS}, args.output)
+
+
+if __name__ == '__main__':
+    main()
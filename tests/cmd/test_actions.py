@@ -1,9 +1,11 @@
 """Test module for `tunefind2spotify.cmd.actions`."""
 
+import argparse
 import os
 import pytest
 
 from tunefind2spotify.cmd import actions
+from tunefind2spotify.core.storage import InMemoryStorage
 
 from tests.mock_logger import mock_logger
 
@@ -61,3 +63,32 @@ def test_find_credentials_not_found():
         actions.find_credentials('')
     with pytest.raises(actions.MissingCredentialsException):
         actions.find_credentials('ABC')
+
+
+def test_storage_action():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('-s', dest='storage', action=actions.StorageAction, default=None)
+    assert parser.parse_args([]).storage is None
+    assert parser.parse_args(['-s', 'sqlite']).storage is None
+    assert isinstance(parser.parse_args(['-s', 'memory']).storage, InMemoryStorage)
+
+
+def test_ttl_action():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--ttl', dest='ttl', nargs='+', action=actions.TTLAction)
+    assert parser.parse_args([]).ttl is None
+    assert parser.parse_args('--ttl show=60 MOVIE=0 --ttl show=120'.split()).ttl == \
+        {actions.MediaType.SHOW: 120, actions.MediaType.MOVIE: 0}
+    with pytest.raises(ValueError):
+        parser.parse_args('--ttl book=60'.split())
+    with pytest.raises(ValueError):
+        parser.parse_args('--ttl show=-1'.split())
+
+
+def test_positive_int():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('-e', dest='episodes', type=actions.positive_int)
+    assert parser.parse_args(['-e', '10']).episodes == 10
+    for value in ['0', '-3', 'ten']:
+        with pytest.raises(SystemExit):
+            parser.parse_args(['-e', value])
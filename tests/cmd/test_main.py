@@ -1,8 +1,14 @@
 """Test module for `tunefind2spotify.cmd.main`."""
 
+import json
+import logging
 import pytest
 import sys
 
+from tunefind2spotify import stats, trace
+from tunefind2spotify.cmd import main as main_module
+from tunefind2spotify.log import reset_logging, ROOT_LOGGER_NAME
+
 from tests.cmd import mock_main as main
 from tests.cmd.test_actions import MOCK_CRED_FILE_PATH
 from tests.test_data.mock_json_data import \
@@ -11,6 +17,14 @@ from tests.test_data.mock_json_data import \
     MOCK_GAME_JSON
 
 
+@pytest.fixture(autouse=True)
+def entrypoint_logging(monkeypatch, tmp_path):
+    """The entrypoint sets up logging, which is reset after each test; the log file goes to `tmp_path`."""
+    monkeypatch.setattr(main_module, 'DEFAULT_LOG_FILE', str(tmp_path / 't2s.log'))
+    yield
+    reset_logging()
+
+
 def test_entrypoint_usage():
     _copy = sys.argv
 
@@ -92,3 +106,158 @@ def test_entrypoint_usage_pull():
     main.entrypoint()
 
     sys.argv = _copy
+
+
+def test_entrypoint_usage_search():
+    _copy = sys.argv
+
+    sys.argv = [''] + f'fetch {MOCK_SHOW_JSON["media_name"]}'.split()
+    main.entrypoint()
+
+    sys.argv = ['', 'search', 'fluffy', '-l', '5']
+    main.entrypoint()
+
+    sys.argv = _copy
+
+
+def test_entrypoint_usage_dump_and_load(tmp_path):
+    _copy = sys.argv
+
+    sys.argv = [''] + f'dump {tmp_path / "dump.jsonl"} -m {MOCK_SHOW_JSON["media_name"]}'.split()
+    main.entrypoint()
+
+    sys.argv = [''] + f'load {tmp_path / "dump.jsonl"}'.split()
+    main.entrypoint()
+
+    sys.argv = _copy
+
+
+def test_entrypoint_usage_storage():
+    _copy = sys.argv
+
+    sys.argv = [''] + f'-s memory pull {MOCK_SHOW_JSON["media_name"]} -c {MOCK_CRED_FILE_PATH}'.split()
+    main.entrypoint()
+
+    sys.argv = _copy
+
+
+def test_entrypoint_usage_fetch_ttl():
+    _copy = sys.argv
+
+    sys.argv = [''] + f'fetch {MOCK_MOVIE_JSON["media_name"]} --ttl movie=0 show=60'.split()
+    main.entrypoint()
+
+    sys.argv = [''] + f'fetch {MOCK_MOVIE_JSON["media_name"]} --force'.split()
+    main.entrypoint()
+
+    sys.argv = _copy
+
+
+def test_entrypoint_usage_sync():
+    _copy = sys.argv
+
+    sys.argv = [''] + f'pull {MOCK_MOVIE_JSON["media_name"]} -c {MOCK_CRED_FILE_PATH} --sync'.split()
+    main.entrypoint()
+
+    sys.argv = [''] + f'export {MOCK_MOVIE_JSON["media_name"]} -c {MOCK_CRED_FILE_PATH} --sync --delta'.split()
+    with pytest.raises(SystemExit):
+        main.entrypoint()
+
+    sys.argv = _copy
+
+
+def test_entrypoint_usage_export_many():
+    _copy = sys.argv
+
+    sys.argv = [''] + f'-s memory export-many {MOCK_MOVIE_JSON["media_name"]} {MOCK_GAME_JSON["media_name"]} ' \
+                      f'-c {MOCK_CRED_FILE_PATH} -w 2 --sync --validate --market DE'.split()
+    main.entrypoint()
+
+    sys.argv = [''] + f'export-many -c {MOCK_CRED_FILE_PATH}'.split()
+    main.entrypoint()
+
+    sys.argv = _copy
+
+
+def test_entrypoint_usage_export_seasons():
+    _copy = sys.argv
+
+    sys.argv = [''] + f'export-seasons {MOCK_SHOW_JSON["media_name"]} -c {MOCK_CRED_FILE_PATH} -e 2 --sync'.split()
+    main.entrypoint()
+
+    sys.argv = _copy
+
+
+def test_entrypoint_usage_match():
+    _copy = sys.argv
+
+    sys.argv = [''] + f'-s memory match -c {MOCK_CRED_FILE_PATH} -t 0.5 -w 2'.split()
+    main.entrypoint()
+
+    sys.argv = [''] + f'match {MOCK_SHOW_JSON["media_name"]} -c {MOCK_CRED_FILE_PATH}'.split()
+    main.entrypoint()
+
+    sys.argv = _copy
+
+
+def test_entrypoint_usage_logging(tmp_path):
+    _copy = sys.argv
+
+    log_file = tmp_path / 'test.log'
+    sys.argv = [''] + f'--log-level debug --log-file {log_file} -s memory search mock'.split()
+    main.entrypoint()
+    assert logging.getLogger(ROOT_LOGGER_NAME).level == logging.DEBUG
+
+    sys.argv = _copy
+
+
+def test_entrypoint_usage_stats(capsys):
+    _copy = sys.argv
+
+    sys.argv = [''] + '--stats json search mock'.split()
+    main.entrypoint()
+    assert 'db.execute' in json.loads(capsys.readouterr().out)['timers']
+    stats.enable(False)
+    stats.reset()
+
+    sys.argv = _copy
+
+
+def test_entrypoint_usage_profile(capsys, tmp_path):
+    _copy = sys.argv
+
+    sys.argv = [''] + '--profile -s memory search mock'.split()
+    main.entrypoint()
+    assert 'cumulative' in capsys.readouterr().out
+
+    sys.argv = [''] + f'--profile tracemalloc --profile-output {tmp_path / "snapshot"} -s memory search mock'.split()
+    main.entrypoint()
+    # write the report of the snapshot while stderr is still captured
+    reset_logging()
+    assert 'Wrote memory snapshot' in capsys.readouterr().err
+    assert (tmp_path / 'snapshot').exists()
+
+    sys.argv = _copy
+
+
+def test_entrypoint_usage_trace(tmp_path):
+    _copy = sys.argv
+
+    path = tmp_path / 'trace.har'
+    sys.argv = [''] + f'--trace {path} search mock'.split()
+    main.entrypoint()
+    assert json.loads(path.read_text())['log']['entries'] == []
+    assert trace.is_enabled()
+    trace.enable(False)
+
+    sys.argv = _copy
+
+
+def test_entrypoint_usage_fetch_record_replay():
+    _copy = sys.argv
+
+    sys.argv = [''] + f'fetch {MOCK_MOVIE_JSON["media_name"]} --record a --replay b'.split()
+    with pytest.raises(SystemExit):
+        main.entrypoint()
+
+    sys.argv = _copy
@@ -0,0 +1,38 @@
+"""Test module for `tunefind2spotify.cmd.profiling`."""
+
+import os
+import pstats
+import pytest
+import tracemalloc
+
+from tunefind2spotify.cmd import profiling
+
+
+def _work(n, fail=False):
+    x = [str(i) for i in range(n)]
+    if fail:
+        raise RuntimeError('boom')
+    return len(x)
+
+
+def test_run_profiled_report(capsys):
+    assert profiling.run_profiled(_work, {'n': 1000}, profiler='cprofile') == 1000
+    assert '_work' in capsys.readouterr().out
+    assert profiling.run_profiled(_work, {'n': 1000}, profiler='tracemalloc') == 1000
+    assert 'Peak traced memory' in capsys.readouterr().out
+    assert not tracemalloc.is_tracing()
+
+
+def test_run_profiled_output(tmp_path):
+    path = os.path.join(tmp_path, 'profile.pstats')
+    with pytest.raises(RuntimeError):
+        profiling.run_profiled(_work, {'n': 10, 'fail': True}, profiler='cprofile', output=path)
+    assert any(x[2] == '_work' for x in pstats.Stats(path).stats)
+    path = os.path.join(tmp_path, 'snapshot')
+    profiling.run_profiled(_work, {'n': 10}, profiler='tracemalloc', output=path)
+    assert tracemalloc.Snapshot.load(path).traces is not None
+
+
+def test_run_profiled_unknown():
+    with pytest.raises(ValueError):
+        profiling.run_profiled(_work, {'n': 10}, profiler='perf')
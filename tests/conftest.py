@@ -0,0 +1,30 @@
+"""Fixtures shared by the test modules."""
+
+import pytest
+
+from tunefind2spotify import log
+from tunefind2spotify.core import tunefind_scraper
+
+from tests.core import mock_tunefind_scraper
+
+
+@pytest.fixture
+def scraper(monkeypatch):
+    """The actual scraper, for running it against `tests.tunefind_server.TunefindServer`."""
+    # undo the patches of the mock, use a fresh session without backoff
+    for name, value in mock_tunefind_scraper.ORIGINALS.items():
+        monkeypatch.setattr(tunefind_scraper, name, value)
+    monkeypatch.setattr(tunefind_scraper, 'BACKOFF', 0)
+    monkeypatch.setattr(tunefind_scraper, '_session', tunefind_scraper._create_session())
+    monkeypatch.setattr(tunefind_scraper, 'BASE_URL', tunefind_scraper.BASE_URL)
+    monkeypatch.setattr(tunefind_scraper, 'API', tunefind_scraper.API)
+    return tunefind_scraper
+
+
+@pytest.fixture
+def configured_logging(tmp_path):
+    """Logging as set up by the entrypoint, writing to a log file in `tmp_path`; reset afterwards."""
+    log_file = str(tmp_path / 'test.log')
+    log.configure_logging(log_file=log_file)
+    yield log_file
+    log.reset_logging()
@@ -24,52 +24,101 @@ from tests.mock_logger import mock_logger
 from tests.test_data.mock_json_data import \
     MOCK_SHOW_JSON, \
     MOCK_MOVIE_JSON, \
-    MOCK_GAME_JSON, \
-    _get_show_uris
+    MOCK_GAME_JSON
 
 
 class MockSpotifyClient:
     """Mock object for SpotifyClient that mocks returning methods, yields a
        noop function for any other attribute requested and counts calls to
        returned methods.
+
+       Tracks of playlists are kept in `_crt_items` and modified accordingly,
+       each modification bumps the playlist's snapshot id.
     """
     def __init__(self):
         self._counter = {}
         # some fake playlists
         self._crt_playlists = {'items': [{'name': 'DOESNOTEXIST', 'id': 00},
                                          {'name': 'DOESNTEXIST2', 'id': 99}]}
+        self._crt_items = {00: [], 99: []}
+        self._snapshots = {00: 0, 99: 0}
 
     def __getattribute__(self, item):  # noqa: C901
-        if item in ['_counter', '_crt_playlists', 'increment', 'reset_counter']:
+        if item in ['_counter', '_crt_playlists', '_crt_items', '_snapshots', 'increment', 'reset_counter',
+                    '_modify']:
             return object.__getattribute__(self, item)
         if item == 'current_user_playlists':
-            def func(limit=1, offset=0, *args, **kwargs):
+            def func(limit=50, offset=0, *args, **kwargs):
                 self.increment(item)
-                # force to unify all test cases and hit all branches
-                limit = 1
-                offset //= 50
-                return {'items': self._crt_playlists['items'][offset:limit + offset]}
+                return {'items': self._crt_playlists['items'][offset:limit + offset],
+                        'total': len(self._crt_playlists['items'])}
         elif item == 'user_playlist_create':
             def func(id_, pn, *args, **kwargs):
                 self.increment(item)
                 pid = {MOCK_SHOW_JSON['media_name']: 12,
                        MOCK_MOVIE_JSON['media_name']: 34,
-                       MOCK_GAME_JSON['media_name']: 56}[pn]
+                       MOCK_GAME_JSON['media_name']: 56}.get(pn, 100 + len(self._crt_items))
                 self._crt_playlists['items'].append({'name': pn, 'id': pid})
+                self._crt_items[pid] = []
+                self._snapshots[pid] = 0
                 return {'id': pid}
+        elif item == 'playlist':
+            def func(pid, *args, **kwargs):
+                self.increment(item)
+                return {'snapshot_id': str(self._snapshots[pid]),
+                        'tracks': {'items': [{'track': {'uri': x}} for x in self._crt_items[pid][:100]],
+                                   'total': len(self._crt_items[pid])}}
         elif item == 'playlist_items':
-            def func(pid, limit=1, offset=0, *args, **kwargs):
-                # force to unify all test cases and hit all branches
-                limit = 1
-                offset //= 50
+            def func(pid, limit=100, offset=0, *args, **kwargs):
+                self.increment(item)
+                return {'items': [{'track': {'uri': x}} for x in self._crt_items[pid][offset:limit + offset]],
+                        'total': len(self._crt_items[pid])}
+        elif item == 'playlist_add_items':
+            def func(pid, items, *args, **kwargs):
+                self.increment(item)
+                return self._modify(pid, None, lambda x: x + items)
+        elif item == 'playlist_replace_items':
+            def func(pid, items, *args, **kwargs):
+                self.increment(item)
+                return self._modify(pid, None, lambda x: list(items))
+        elif item == 'playlist_remove_specific_occurrences_of_items':
+            def func(pid, items, snapshot_id=None, *args, **kwargs):
+                self.increment(item)
+                positions = {p for x in items for p in x['positions']}
+                assert all(self._crt_items[pid][p] == x['uri'] for x in items for p in x['positions'])
+                return self._modify(pid, snapshot_id, lambda x: [u for p, u in enumerate(x) if p not in positions])
+        elif item == 'playlist_reorder_items':
+            def func(pid, range_start, insert_before, range_length=1, snapshot_id=None, *args, **kwargs):
                 self.increment(item)
-                return {12: {'items': [{'track': {'uri': x}}
-                                       for x in _get_show_uris()][offset:limit + offset]},
-                        34: {'items': [{'track': {'uri': x['spotify']}}
-                                       for x in MOCK_MOVIE_JSON['songs']][offset:limit + offset]},
-                        56: {'items': [{'track': {'uri': x['spotify']}}
-                                       for x in MOCK_GAME_JSON['songs']][offset:limit + offset]}
-                        }[pid]
+
+                def reorder(x):
+                    block = x[range_start:range_start + range_length]
+                    rest = x[:range_start] + x[range_start + range_length:]
+                    position = insert_before - range_length if insert_before > range_start else insert_before
+                    return rest[:position] + block + rest[position:]
+                return self._modify(pid, snapshot_id, reorder)
+        elif item == 'playlist_change_details':
+            def func(pid, *args, **kwargs):
+                self.increment(item)
+                return self._modify(pid, None, list)
+        elif item == 'tracks':
+            # ids starting with '0' do not exist, those starting with '1' are not playable in any market
+            def func(ids, market=None, *args, **kwargs):
+                self.increment(item)
+                assert len(ids) <= 50, 'Too many ids!'
+                return {'tracks': [None if x.startswith('0') else
+                                   dict(id=x, **({'is_playable': not x.startswith('1')} if market else {}))
+                                   for x in ids]}
+        elif item == 'search':
+            # finds a track named and performed as queried, plus a decoy, unless the name contains 'unknown'
+            def func(q, limit=10, type='track', *args, **kwargs):
+                self.increment(item)
+                name, _, artist = (x.strip('"') for x in q[len('track:'):].partition(' artist:'))
+                tracks = [] if 'unknown' in name else \
+                    [{'uri': 'spotify:track:decoy', 'name': 'Something else', 'artists': [{'name': 'Someone'}]},
+                     {'uri': f'spotify:track:{name.replace(" ", "-")}', 'name': name.title(),
+                      'artists': [{'name': artist.title()}]}]
+                return {'tracks': {'items': tracks[:limit]}}
         elif item == 'me':
             def func(*args, **kwargs):
                 self.increment(item)
@@ -79,6 +128,12 @@ class MockSpotifyClient:
                 self.increment(item)
         return func
 
+    def _modify(self, pid, snapshot_id, func):
+        assert snapshot_id is None or snapshot_id == str(self._snapshots[pid]), 'Outdated snapshot id!'
+        self._crt_items[pid] = func(self._crt_items[pid])
+        self._snapshots[pid] += 1
+        return {'snapshot_id': str(self._snapshots[pid])}
+
     def increment(self, name):
         if name not in self._counter.keys():
             self._counter[name] = 0
@@ -91,6 +146,7 @@ class MockSpotifyClient:
 def mock_init_spc(self, *args, **kwargs):
     # monkey patch the client object with mock instance
     self.client = MockSpotifyClient()
+    self.invalidate_playlist_index()
 
 
 # monkey patch module
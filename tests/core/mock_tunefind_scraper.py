@@ -8,6 +8,10 @@ their original functionality and returning correct data using sample test data
 executed during testing. Implies that successful tests are only valid while the
 sample data matches the data scheme from the API.
 
+The functions and the session replaced are kept in `ORIGINALS`, so that tests
+running the scraper against a local server (see `tests.tunefind_server`) can
+restore them.
+
 The module logger is also monkey patched with a logger that writes into a
 `StringIO` object. For testing purposes, logged content can be read from
 `*module*.string_capture`.
@@ -68,11 +72,13 @@ def mock_handle_redirect(*x):
     return ''
 
 
-def _get(url):
+def _get(url, *args, **kwargs):
 
     class MockRequestReturn:
         def __init__(self, status_code):
             self.status_code = status_code
+            self.raw = None
+            self.history = []
 
     url_split = url.split('/')
     if 'forward' in url_split:
@@ -88,13 +94,19 @@ def _get(url):
         None
 
 
+class MockSession:
+    get = staticmethod(_get)
+
+
 # monkey patch module
+ORIGINALS = {name: getattr(tunefind_scraper, name)
+             for name in ['_fetch_json', 'handle_redirect_link', '_session']}
 logger, string_capture = mock_logger(__name__)
 tunefind_scraper.logger = logger
 tunefind_scraper.string_capture = string_capture
 tunefind_scraper._fetch_json = mock_fetch_json
 tunefind_scraper.handle_redirect_link = mock_handle_redirect
-tunefind_scraper.requests.get = _get
+tunefind_scraper._session = MockSession()
 
 
 def __getattr__(name):
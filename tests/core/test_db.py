@@ -4,6 +4,8 @@ import datetime
 import pytest
 import _sqlite3
 
+from copy import deepcopy
+
 from tunefind2spotify.utils import MediaType
 
 from tests.core import mock_db as db
@@ -15,7 +17,8 @@ from tests.test_data.mock_json_data import \
 
 def test_db_created_correctly():
     dbc = db.DBConnector()
-    for table_name in ['media', 'songs', 'shows', 'match_show', 'match_other']:
+    for table_name in ['media', 'songs', 'shows', 'match_show', 'match_other', 'artists', 'song_artists',
+                       'songs_fts', 'media_fts']:
         cursor = dbc._execute(f'SELECT name FROM sqlite_master WHERE type="table" AND name="{table_name}";')
         assert cursor.fetchall()
 
@@ -125,6 +128,218 @@ def test_get_last_updated():
     assert time_diff_sec < 2, f'Expected timestamp in db to be current. Time difference too big: {time_diff_sec} [sec].'
 
 
+def test_search_songs():
+    dbc = db.DBConnector()
+    dbc.insert_json_data(MOCK_SHOW_JSON)
+    dbc.insert_json_data(MOCK_GAME_JSON)
+    hits = dbc.search('fluff')
+    assert {x['media_name'] for x in hits} == {MOCK_SHOW_JSON['media_name'], MOCK_GAME_JSON['media_name']}, \
+        f'Expected hits for show and game. Instead got: {hits} .'
+    assert all(x['artists'] == 'Agnes' for x in hits), f'Expected only songs by \'Agnes\'. Instead got: {hits} .'
+    hits = dbc.search('agnes fluufffffy')
+    assert {x['spotify_uri'] for x in hits} == {'spotify:track:UNICORN'}, \
+        f'Expected only hits for \'spotify:track:UNICORN\'. Instead got: {hits} .'
+
+
+def test_search_songs_show_reported_once_per_media():
+    dbc = db.DBConnector()
+    dbc.insert_json_data(MOCK_SHOW_JSON)
+    hits = dbc.search('author')
+    assert len(hits) == 2, f'Expected two distinct songs. Instead got: {hits} .'
+
+
+def test_search_media():
+    dbc = db.DBConnector()
+    dbc.insert_json_data(MOCK_MOVIE_JSON)
+    hits = dbc.search('mockies adv')
+    assert hits == [{'media_name': MOCK_MOVIE_JSON['media_name'],
+                     'readable_name': MOCK_MOVIE_JSON['readable_name'],
+                     'song_name': None,
+                     'artists': None,
+                     'spotify_uri': None}], f'Expected single hit for movie. Instead got: {hits} .'
+
+
+def test_search_limit_and_no_hits():
+    dbc = db.DBConnector()
+    dbc.insert_json_data(MOCK_MOVIE_JSON)
+    assert len(dbc.search('test', limit=1)) == 1
+    assert not dbc.search('8hsg094g')
+    assert not dbc.search('"*-')
+
+
+def test_search_index_rebuilt_for_existing_db():
+    dbc = db.DBConnector()
+    _val = db.REUSE
+    db.REUSE = True
+    dbc.insert_json_data(MOCK_GAME_JSON)
+    dbc._execute('DROP TABLE songs_fts')
+    dbc = db.DBConnector()
+    assert dbc.search('fluff'), 'Index should have been rebuilt from songs table.'
+    db.REUSE = _val
+
+
+def test_split_artists():
+    assert db.split_artists('A, B, A') == ['A', 'B']
+    assert db.split_artists('Earth, Wind & Fire') == ['Earth', 'Wind & Fire']
+    assert db.split_artists('') == []
+
+
+def test_get_media_for_artist():
+    dbc = db.DBConnector()
+    dbc.insert_json_data(MOCK_SHOW_JSON)
+    dbc.insert_json_data(MOCK_MOVIE_JSON)
+    dbc.insert_json_data(MOCK_GAME_JSON)
+    x = sorted(dbc.get_media_for_artist('agnes'))
+    y = sorted([MOCK_SHOW_JSON['media_name'], MOCK_MOVIE_JSON['media_name'], MOCK_GAME_JSON['media_name']])
+    assert x == y, f'Expected {y} . Instead got: {x} .'
+    assert not dbc.get_media_for_artist('8hsg094g')
+
+
+def test_get_songs_for_artist():
+    dbc = db.DBConnector()
+    dbc.insert_json_data(MOCK_SHOW_JSON)
+    dbc.insert_json_data(MOCK_SHOW_JSON)
+    songs = dbc.get_songs_for_artist('The author')
+    assert [x['spotify_uri'] for x in songs] == ['spotify:track:DEADBEEF', 'spotify:track:C0FEBABE'], \
+        f'Expected the two songs by \'The author\' in insertion order. Instead got: {songs} .'
+
+
+def test_artists_linked_for_existing_db():
+    dbc = db.DBConnector()
+    _val = db.REUSE
+    db.REUSE = True
+    dbc.insert_json_data(MOCK_GAME_JSON)
+    dbc._execute('DROP TABLE song_artists')
+    dbc._execute('DROP TABLE artists')
+    dbc = db.DBConnector()
+    assert dbc.get_media_for_artist('Agnes') == [MOCK_GAME_JSON['media_name']], \
+        'Artists should have been linked from songs table.'
+    db.REUSE = _val
+
+
+def test_db_insert_json_rolled_back_on_error():
+    dbc = db.DBConnector()
+    with pytest.raises(KeyError):
+        dbc.insert_json_data({k: v for k, v in MOCK_MOVIE_JSON.items() if k != 'songs'})
+    assert not dbc.media_exists(MOCK_MOVIE_JSON['media_name']), 'Failed insert should not leave partial data.'
+
+
+def test_db_insert_json_song_in_multiple_episodes():
+    dbc = db.DBConnector()
+    data = {'media_name': 'repeat', 'media_type': MediaType.SHOW, 'readable_name': 'Repeat',
+            'seasons': [{'episodes': [{'id': 1, 'songs': MOCK_MOVIE_JSON['songs'][:2]},
+                                      {'id': 2, 'songs': MOCK_MOVIE_JSON['songs'][1:3]}]}]}
+    dbc.insert_json_data(data)
+    assert len(dbc._execute('SELECT * FROM songs').fetchall()) == 3
+    assert len(dbc._execute('SELECT * FROM match_show').fetchall()) == 4
+    assert len(dbc.get_track_uris_show('repeat')) == 4
+
+
+def test_get_media_names():
+    dbc = db.DBConnector()
+    dbc.insert_json_data(MOCK_GAME_JSON)
+    dbc.insert_json_data(MOCK_SHOW_JSON)
+    assert dbc.get_media_names() == [MOCK_GAME_JSON['media_name'], MOCK_SHOW_JSON['media_name']]
+
+
+def test_get_json_data():
+    dbc = db.DBConnector()
+    for data in [MOCK_SHOW_JSON, MOCK_MOVIE_JSON, MOCK_GAME_JSON]:
+        dbc.insert_json_data(data)
+        x = dbc.get_json_data(data['media_name'])
+        assert x.pop('last_updated') == dbc.get_last_updated(data['media_name'])
+        assert x == data, f'Expected data of \'{data["media_name"]}\' to be restored. Instead got: {x} .'
+
+
+def test_get_json_data_keeps_last_updated():
+    dbc = db.DBConnector()
+    dbc.insert_json_data(dict(MOCK_GAME_JSON, last_updated=1234))
+    assert dbc.get_json_data(MOCK_GAME_JSON['media_name'])['last_updated'] == 1234
+
+
+def test_run_changes():
+    dbc = db.DBConnector()
+    run_id = dbc.insert_json_data(MOCK_SHOW_JSON)
+    assert dbc.get_run_changes(run_id) == {'episode': 3, 'song': 5, 'match': 5}
+    run_id = dbc.insert_json_data(MOCK_SHOW_JSON)
+    assert dbc.get_run_changes(run_id) == {'episode': 0, 'song': 0, 'match': 0}
+    data = deepcopy(MOCK_SHOW_JSON)
+    data['seasons'][1]['episodes'].append({'id': 220, 'songs': [MOCK_SHOW_JSON['seasons'][0]['episodes'][0]['songs'][0],
+                                                                MOCK_MOVIE_JSON['songs'][0]]})
+    run_id = dbc.insert_json_data(data)
+    assert dbc.get_run_changes(run_id) == {'episode': 1, 'song': 1, 'match': 2}
+
+
+def test_run_changes_media():
+    dbc = db.DBConnector()
+    dbc.insert_json_data(MOCK_SHOW_JSON)
+    run_id = dbc.insert_json_data(MOCK_GAME_JSON)
+    assert dbc.get_run_changes(run_id) == {'episode': 0, 'song': 5, 'match': 0}
+    run_id = dbc.insert_json_data(MOCK_GAME_JSON)
+    assert dbc.get_run_changes(run_id) == {'episode': 0, 'song': 0, 'match': 0}
+
+
+def test_changes_since_export():
+    dbc = db.DBConnector()
+    name = MOCK_MOVIE_JSON['media_name']
+    dbc.insert_json_data(dict(MOCK_MOVIE_JSON, songs=MOCK_MOVIE_JSON['songs'][:3]))
+    assert dbc.get_last_exported_run(name) is None
+    assert dbc.has_changes(name)
+    dbc.record_export(name)
+    last_exported_run = dbc.get_last_exported_run(name)
+    assert last_exported_run is not None
+    dbc.insert_json_data(dict(MOCK_MOVIE_JSON, songs=MOCK_MOVIE_JSON['songs'][:3]))
+    assert not dbc.has_changes(name, since_run=last_exported_run)
+    assert not dbc.get_new_track_uris(name, since_run=last_exported_run)
+    dbc.insert_json_data(MOCK_MOVIE_JSON)
+    assert dbc.has_changes(name, since_run=last_exported_run)
+    assert dbc.get_new_track_uris(name, since_run=last_exported_run) == \
+        [x['spotify'] for x in MOCK_MOVIE_JSON['songs'][3:]]
+    assert dbc.get_new_track_uris(name) == [x['spotify'] for x in MOCK_MOVIE_JSON['songs']]
+
+
+def test_runs_of_matches():
+    dbc = db.DBConnector()
+    movie = deepcopy(MOCK_MOVIE_JSON)
+    movie['songs'][0]['spotify'] = ''
+    run_id = dbc.insert_json_data(movie)
+    dbc.set_spotify_uris({movie['songs'][0]['id']: 'spotify:track:found'})
+    assert dbc._execute('SELECT id, run_type FROM runs ORDER BY id').fetchall() == \
+        [(run_id, 'fetch'), (run_id + 1, 'match')]
+    assert dbc.get_run_changes(run_id + 1) == {'episode': 0, 'song': 1, 'match': 0}
+
+
+def test_exports_migrated_for_existing_db():
+    dbc = db.DBConnector()
+    _val = db.REUSE
+    db.REUSE = True
+    name = MOCK_MOVIE_JSON['media_name']
+    dbc.insert_json_data(MOCK_MOVIE_JSON)
+    dbc._execute('DROP TABLE exports')
+    dbc._execute('''CREATE TABLE exports (id integer PRIMARY KEY AUTOINCREMENT, media_id integer NOT NULL,
+                    run_id integer NOT NULL, timestamp integer NOT NULL)''')
+    dbc._execute('INSERT INTO exports(media_id,run_id,timestamp) SELECT media_id, id, 0 FROM runs')
+    dbc = db.DBConnector()
+    assert dbc.get_last_exported_run(name) is not None, 'Existing exports are of the whole media.'
+    assert dbc.get_last_exported_run(name, 'Season') is None
+    db.REUSE = _val
+
+
+def test_track_availability_dropped_for_existing_db():
+    dbc = db.DBConnector()
+    _val = db.REUSE
+    db.REUSE = True
+    dbc._execute('DROP TABLE track_availability')
+    dbc._execute('CREATE TABLE track_availability (spotify_uri text PRIMARY KEY, available integer NOT NULL, '
+                 'checked integer NOT NULL)')
+    dbc._execute('INSERT INTO track_availability VALUES (\'spotify:track:a\', 1, 0)')
+    dbc = db.DBConnector()
+    assert dbc.get_track_availability(['spotify:track:a']) == {}, 'Checks of unknown markets should be dropped.'
+    dbc.set_track_availability({'spotify:track:a': True}, market='US')
+    assert dbc.get_track_availability(['spotify:track:a'], market='US') == {'spotify:track:a': True}
+    db.REUSE = _val
+
+
 def test_db_deconstructor():
     dbc = db.DBConnector()
     del dbc
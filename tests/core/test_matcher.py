@@ -0,0 +1,84 @@
+"""Test module for `tunefind2spotify.core.matcher`."""
+
+from copy import deepcopy
+
+from tunefind2spotify.core import matcher
+from tunefind2spotify.core.storage import InMemoryStorage
+
+from tests.core.mock_spotify_client import SpotifyClient
+from tests.test_data.mock_json_data import MOCK_MOVIE_JSON
+
+
+def _storage_with_unmatched_songs():
+    stg = InMemoryStorage()
+    movie = deepcopy(MOCK_MOVIE_JSON)
+    movie['songs'][0].update(name='Fluffy Unicorns (Remastered 2011)', artists='Agnes, Margo', spotify='')
+    movie['songs'][1].update(name='Unknown Song', spotify='')
+    movie['songs'][2].update(name='Fluffy Unicorns', artists='Agnes', spotify='')
+    stg.insert_json_data(movie)
+    return stg, movie
+
+
+def test_build_query():
+    assert matcher.build_query('Fluffy Unicorns (Remastered 2011)', 'Agnes, Margo') == \
+        'track:"fluffy unicorns" artist:"agnes"'
+    assert matcher.build_query('It\'s so fluffy! [Live]', '') == 'track:"it s so fluffy"'
+
+
+def test_best_match():
+    candidates = [{'uri': 'a', 'name': 'Something else', 'artists': 'Someone'},
+                  {'uri': 'b', 'name': 'It\'s So Fluffy', 'artists': 'Agnes, Gru'}]
+    uri, score = matcher.best_match('It\'s so fluffy!', 'Agnes', candidates)
+    assert uri == 'b' and score == 1.0
+    assert matcher.best_match('It\'s so fluffy!', 'Agnes', []) == (None, 0.0)
+    assert matcher.score('It\'s so fluffy!', 'Agnes', candidates[0]) < matcher.MATCH_THRESHOLD
+
+
+def test_match_songs():
+    stg, movie = _storage_with_unmatched_songs()
+    spc = SpotifyClient()
+    report = matcher.match_songs(stg, spc, workers=2)
+    # songs 0 and 2 share their query
+    assert report == matcher.MatchReport(songs=3, searched=2, matched=2, failed=0)
+    assert [x['tunefind_id'] for x in stg.get_unmatched_songs()] == [movie['songs'][1]['id']]
+    assert stg.get_track_uris_media(movie['media_name'])[:2] == ['spotify:track:fluffy-unicorns'] * 2
+    query = 'track:"unknown song" artist:"agnes"'
+    assert stg.get_search_cache([query]) == {query: (None, 0.0)}
+    # negative results are not searched again
+    report = matcher.match_songs(stg, spc)
+    assert report == matcher.MatchReport(songs=1, searched=0, matched=0, failed=0)
+    assert spc.client._counter['search'] == 2
+
+
+def test_match_songs_threshold_and_failure(monkeypatch):
+    stg, movie = _storage_with_unmatched_songs()
+    spc = SpotifyClient()
+    report = matcher.match_songs(stg, spc, media_name=movie['media_name'], threshold=1.01)
+    assert report.matched == 0 and len(stg.get_unmatched_songs()) == 3
+    # cached results are applied with a lower threshold without searching again
+    report = matcher.match_songs(stg, spc)
+    assert report.searched == 0 and report.matched == 2
+
+    stg, movie = _storage_with_unmatched_songs()
+
+    def failing_search(query):
+        raise RuntimeError('boom')
+
+    monkeypatch.setattr(spc, 'search_tracks', failing_search)
+    report = matcher.match_songs(stg, spc)
+    assert report.failed == report.searched == 2
+    assert stg.get_search_cache(['track:"fluffy unicorns" artist:"agnes"']) == {}
+
+
+def test_match_songs_without_searchable_name():
+    stg = InMemoryStorage()
+    movie = deepcopy(MOCK_MOVIE_JSON)
+    movie['songs'][0].update(name='!!!', artists='Agnes', spotify='')
+    movie['songs'][1].update(name='Fluffy Unicorns', artists='Agnes', spotify='')
+    stg.insert_json_data(movie)
+    spc = SpotifyClient()
+    report = matcher.match_songs(stg, spc)
+    assert report == matcher.MatchReport(songs=2, searched=1, matched=1, failed=0)
+    assert spc.client._counter['search'] == 1
+    assert stg.get_search_cache(['track:"" artist:"agnes"']) == {'track:"" artist:"agnes"': (None, 0.0)}
+    assert [x['tunefind_id'] for x in stg.get_unmatched_songs()] == [movie['songs'][0]['id']]
@@ -0,0 +1,138 @@
+"""Test module for `tunefind2spotify.core.rate_limit`."""
+
+import email.utils
+import pytest
+
+from datetime import datetime, timedelta, timezone
+from requests.exceptions import ConnectionError
+from spotipy import SpotifyException
+
+from tunefind2spotify.core import rate_limit
+
+
+class FakeClock:
+    """Clock whose time only advances by sleeping."""
+
+    def __init__(self):
+        self.now = 0.0
+        self.sleeps = []
+
+    def __call__(self):
+        return self.now
+
+    def sleep(self, seconds):
+        self.sleeps.append(seconds)
+        self.now += seconds
+
+
+class FlakyClient:
+    """Client whose method `call` raises the given exceptions before succeeding."""
+
+    def __init__(self, *exceptions):
+        self.exceptions = list(exceptions)
+        self.attribute = 'value'
+
+    def call(self, x):
+        if self.exceptions:
+            raise self.exceptions.pop(0)
+        return x
+
+    # name of a method not to be retried after ambiguous failures
+    playlist_add_items = call
+
+
+def _rate_limited(client, clock, **kwargs):
+    bucket = rate_limit.TokenBucket(rate=10, burst=2, clock=clock, sleep=clock.sleep)
+    return rate_limit.RateLimitedClient(client, bucket=bucket, sleep=clock.sleep, **kwargs)
+
+
+def test_token_bucket():
+    clock = FakeClock()
+    bucket = rate_limit.TokenBucket(rate=10, burst=2, clock=clock, sleep=clock.sleep)
+    assert bucket.acquire() == 0
+    assert bucket.acquire() == 0
+    assert bucket.acquire() == pytest.approx(0.1)
+    for _ in range(10):
+        bucket.acquire()
+    assert clock.now == pytest.approx(1.1)
+    bucket.throttle(5)
+    assert bucket.rate == 5
+    assert bucket.acquire() == pytest.approx(5)
+    bucket.recover()
+    assert bucket.rate == 6
+    for _ in range(10):
+        bucket.recover()
+    assert bucket.rate == bucket.max_rate
+
+
+def test_rate_limited_client_passes_through():
+    clock = FakeClock()
+    client = _rate_limited(FlakyClient(), clock)
+    assert client.call(3) == 3
+    assert client.attribute == 'value'
+    assert client.metrics['call'] == rate_limit.EndpointMetrics(calls=1, seconds=client.metrics['call'].seconds)
+
+
+def test_rate_limited_client_retry_after():
+    clock = FakeClock()
+    client = _rate_limited(FlakyClient(SpotifyException(429, -1, 'slow down', headers={'Retry-After': '3'}),
+                                       SpotifyException(503, -1, 'unavailable'),
+                                       ConnectionError()),
+                           clock)
+    assert client.call(3) == 3
+    assert clock.now >= 3
+    metrics = client.metrics['call']
+    assert (metrics.calls, metrics.retries, metrics.throttled, metrics.failures) == (4, 3, 1, 0)
+    assert client.bucket.rate == 6
+
+
+def test_parse_retry_after():
+    assert rate_limit.parse_retry_after('3') == 3
+    assert rate_limit.parse_retry_after(None) is None
+    assert rate_limit.parse_retry_after('soon') is None
+    assert rate_limit.parse_retry_after('Wed, 21 Oct 2015 07:28:00 GMT') == 0
+    date = email.utils.format_datetime(datetime.now(timezone.utc) + timedelta(seconds=100), usegmt=True)
+    assert 95 < rate_limit.parse_retry_after(date) <= 100
+
+
+@pytest.mark.parametrize('retry_after, pause', [('86400', rate_limit.MAX_RETRY_AFTER),
+                                                ('Wed, 21 Oct 2099 07:28:00 GMT', rate_limit.MAX_RETRY_AFTER),
+                                                ('soon', None)])
+def test_rate_limited_client_retry_after_capped(retry_after, pause):
+    clock = FakeClock()
+    client = _rate_limited(FlakyClient(SpotifyException(429, -1, 'slow down', headers={'Retry-After': retry_after})),
+                           clock)
+    assert client.call(3) == 3
+    if pause is None:
+        # malformed headers fall back to backoff
+        assert clock.now <= rate_limit.BASE_BACKOFF + 0.1
+    else:
+        assert clock.now == pytest.approx(pause, abs=0.1)
+
+
+def test_rate_limited_client_failures():
+    clock = FakeClock()
+    client = _rate_limited(FlakyClient(SpotifyException(404, -1, 'not found')), clock)
+    with pytest.raises(SpotifyException):
+        client.call(3)
+    assert client.metrics['call'].calls == 1
+    client = _rate_limited(FlakyClient(*[SpotifyException(502, -1, 'bad gateway')] * 3), clock, max_retries=2)
+    with pytest.raises(SpotifyException):
+        client.call(3)
+    metrics = client.metrics['call']
+    assert (metrics.calls, metrics.retries, metrics.failures) == (3, 2, 1)
+    assert all(x <= rate_limit.BASE_BACKOFF * 2 for x in clock.sleeps)
+
+
+def test_rate_limited_client_unsafe_methods():
+    clock = FakeClock()
+    client = _rate_limited(FlakyClient(SpotifyException(429, -1, 'slow down', headers={'Retry-After': '1'})), clock)
+    assert client.playlist_add_items(3) == 3
+    for exception in [SpotifyException(502, -1, 'bad gateway'), ConnectionError()]:
+        assert rate_limit.is_ambiguous(exception)
+        client = _rate_limited(FlakyClient(exception), clock)
+        with pytest.raises(type(exception)):
+            client.playlist_add_items(3)
+        assert client.metrics['playlist_add_items'].calls == 1
+    assert not rate_limit.is_ambiguous(SpotifyException(429, -1, 'slow down'))
+    assert not rate_limit.is_ambiguous(SpotifyException(400, -1, 'bad request'))
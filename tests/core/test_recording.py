@@ -0,0 +1,56 @@
+"""Test module for `tunefind2spotify.core.recording`, recording from and replaying a local Tunefind server."""
+
+import os
+
+import pytest
+import requests
+
+from tunefind2spotify import api
+from tunefind2spotify.core.recording import RecordingAdapter, ReplayAdapter
+from tunefind2spotify.core.storage import InMemoryStorage
+
+from tests.test_data.synthetic import SyntheticCatalog
+from tests.tunefind_server import TunefindServer
+
+CATALOG = SyntheticCatalog(seed=7, reuse=0.2, missing=0.2)
+SHOW = CATALOG.show('the-show', seasons=2, episodes=2, songs_per_episode=4)
+MOVIE = CATALOG.movie('the-movie', songs=6)
+
+
+def test_record_and_replay(scraper, tmp_path):
+    directory = str(tmp_path / 'recording')
+    recorded = InMemoryStorage()
+    with TunefindServer([SHOW, MOVIE]) as server:
+        scraper.set_base_url(server.url)
+        for media in [SHOW, MOVIE]:
+            api.fetch(media['readable_name'], storage=recorded, record=directory)
+    assert not any(x.endswith('.tmp') for x in os.listdir(directory))
+    assert 0 < len(os.listdir(directory)) < server.requests, 'Repeated requests should be stored once.'
+
+    # the server is gone, everything is answered from the directory
+    replayed = InMemoryStorage()
+    for media in [SHOW, MOVIE]:
+        api.fetch(media['readable_name'], storage=replayed, replay=directory)
+        # fetch times may differ by a second
+        assert dict(replayed.get_json_data(media['media_name']), last_updated=None) == \
+            dict(recorded.get_json_data(media['media_name']), last_updated=None)
+        assert recorded.get_json_data(media['media_name'])['media_type'] == media['media_type']
+    assert not isinstance(scraper._session.get_adapter(server.url), (RecordingAdapter, ReplayAdapter)), \
+        'The session should be reset after fetching.'
+
+
+def test_replay_missing(scraper, tmp_path):
+    with TunefindServer([MOVIE]) as server:
+        scraper.set_base_url(server.url)
+        scraper.record(str(tmp_path))
+        scraper.scrape(MOVIE['media_name'], MOVIE['media_type'])
+    scraper.reset_session()
+    scraper.replay(str(tmp_path))
+    assert scraper.scrape(MOVIE['media_name'], MOVIE['media_type']) == MOVIE
+    with pytest.raises(requests.ConnectionError):
+        scraper._fetch_json(f'{scraper.API}/show/unknown?fields=seasons')
+
+
+def test_replay_without_directory(scraper, tmp_path):
+    with pytest.raises(FileNotFoundError):
+        scraper.replay(str(tmp_path / 'missing'))
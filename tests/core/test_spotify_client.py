@@ -1,5 +1,13 @@
 """Test module for `tunefind2spotify.core.spotify_client`."""
 
+import pytest
+import random
+import threading
+import time
+
+from tunefind2spotify.exceptions import PlaylistModified
+
+from tests.core import mock_spotify_client
 from tests.core.mock_spotify_client import SpotifyClient
 from tests.test_data.mock_json_data import \
     MOCK_SHOW_JSON, \
@@ -18,8 +26,8 @@ def test_export_new_show():
     spc.export(playlist_name=MOCK_SHOW_JSON['media_name'],
                track_uris=uris_show,
                description='')
-    assert spc.client._counter['current_user_playlists'] == 3, \
-        f'Expected 3 call(s) to \'current_user_playlists\' ! ' \
+    assert spc.client._counter['current_user_playlists'] == 1, \
+        f'Expected 1 call(s) to \'current_user_playlists\' ! ' \
         f'Instead got {spc.client._counter["current_user_playlists"]} calls.'
     assert spc.client._counter['me'] == 1, \
         f'Expected 1 call(s) to \'me\' ! ' \
@@ -45,8 +53,8 @@ def test_export_new_movie():
     spc.export(playlist_name=MOCK_MOVIE_JSON['media_name'],
                track_uris=uris_movie,
                description='')
-    assert spc.client._counter['current_user_playlists'] == 3, \
-        f'Expected 3 call(s) to \'current_user_playlists\' ! ' \
+    assert spc.client._counter['current_user_playlists'] == 1, \
+        f'Expected 1 call(s) to \'current_user_playlists\' ! ' \
         f'Instead got {spc.client._counter["current_user_playlists"]} calls.'
     assert spc.client._counter['me'] == 1, \
         f'Expected 1 call(s) to \'me\' ! ' \
@@ -72,8 +80,8 @@ def test_export_new_game():
     spc.export(playlist_name=MOCK_GAME_JSON['media_name'],
                track_uris=uris_game,
                description='')
-    assert spc.client._counter['current_user_playlists'] == 3, \
-        f'Expected 3 call(s) to \'current_user_playlists\' ! ' \
+    assert spc.client._counter['current_user_playlists'] == 1, \
+        f'Expected 1 call(s) to \'current_user_playlists\' ! ' \
         f'Instead got {spc.client._counter["current_user_playlists"]} calls.'
     assert spc.client._counter['me'] == 1, \
         f'Expected 1 call(s) to \'me\' ! ' \
@@ -101,15 +109,18 @@ def test_export_existing_show():
     spc.export(playlist_name=MOCK_SHOW_JSON['media_name'],
                track_uris=uris_show,
                description='')
-    assert spc.client._counter['current_user_playlists'] == 6, \
-        f'Expected 6 call(s) to \'current_user_playlists\' ! ' \
-        f'Instead got {spc.client._counter["current_user_playlists"]} calls.'
+    assert 'current_user_playlists' not in spc.client._counter, \
+        f'Expected no call to \'current_user_playlists\' ! ' \
+        f'Instead got {spc.client._counter.get("current_user_playlists")} calls.'
     assert spc.client._counter['playlist_change_details'] == 1, \
         f'Expected 1 call(s) to \'playlist_change_details\' ! ' \
         f'Instead got {spc.client._counter["playlist_change_details"]} calls.'
-    assert spc.client._counter['playlist_items'] == 15, \
-        f'Expected 15 call(s) to \'playlist_items\' ! ' \
-        f'Instead got {spc.client._counter["playlist_items"]} calls.'
+    assert 'playlist_items' not in spc.client._counter, \
+        f'Expected no call to \'playlist_items\' ! ' \
+        f'Instead got {spc.client._counter.get("playlist_items")} calls.'
+    assert 'playlist_add_items' not in spc.client._counter, \
+        f'Expected no call to \'playlist_add_items\' ! ' \
+        f'Instead got {spc.client._counter.get("playlist_add_items")} calls.'
 
 
 def test_export_existing_movie():
@@ -124,15 +135,18 @@ def test_export_existing_movie():
     spc.export(playlist_name=MOCK_MOVIE_JSON['media_name'],
                track_uris=uris_movie,
                description='')
-    assert spc.client._counter['current_user_playlists'] == 6, \
-        f'Expected 6 call(s) to \'current_user_playlists\' ! ' \
-        f'Instead got {spc.client._counter["current_user_playlists"]} calls.'
+    assert 'current_user_playlists' not in spc.client._counter, \
+        f'Expected no call to \'current_user_playlists\' ! ' \
+        f'Instead got {spc.client._counter.get("current_user_playlists")} calls.'
     assert spc.client._counter['playlist_change_details'] == 1, \
         f'Expected 1 call(s) to \'playlist_change_details\' ! ' \
         f'Instead got {spc.client._counter["playlist_change_details"]} calls.'
-    assert spc.client._counter['playlist_items'] == 15, \
-        f'Expected 15 call(s) to \'playlist_items\' ! ' \
-        f'Instead got {spc.client._counter["playlist_items"]} calls.'
+    assert 'playlist_items' not in spc.client._counter, \
+        f'Expected no call to \'playlist_items\' ! ' \
+        f'Instead got {spc.client._counter.get("playlist_items")} calls.'
+    assert 'playlist_add_items' not in spc.client._counter, \
+        f'Expected no call to \'playlist_add_items\' ! ' \
+        f'Instead got {spc.client._counter.get("playlist_add_items")} calls.'
 
 
 def test_export_existing_game():
@@ -147,15 +161,52 @@ def test_export_existing_game():
     spc.export(playlist_name=MOCK_GAME_JSON['media_name'],
                track_uris=uris_game,
                description='')
-    assert spc.client._counter['current_user_playlists'] == 6, \
-        f'Expected 6 call(s) to \'current_user_playlists\' ! ' \
-        f'Instead got {spc.client._counter["current_user_playlists"]} calls.'
+    assert 'current_user_playlists' not in spc.client._counter, \
+        f'Expected no call to \'current_user_playlists\' ! ' \
+        f'Instead got {spc.client._counter.get("current_user_playlists")} calls.'
     assert spc.client._counter['playlist_change_details'] == 1, \
         f'Expected 1 call(s) to \'playlist_change_details\' ! ' \
         f'Instead got {spc.client._counter["playlist_change_details"]} calls.'
-    assert spc.client._counter['playlist_items'] == 15, \
-        f'Expected 15 call(s) to \'playlist_items\' ! ' \
-        f'Instead got {spc.client._counter["playlist_items"]} calls.'
+    assert 'playlist_items' not in spc.client._counter, \
+        f'Expected no call to \'playlist_items\' ! ' \
+        f'Instead got {spc.client._counter.get("playlist_items")} calls.'
+    assert 'playlist_add_items' not in spc.client._counter, \
+        f'Expected no call to \'playlist_add_items\' ! ' \
+        f'Instead got {spc.client._counter.get("playlist_add_items")} calls.'
+
+
+def test_export_existing_adds_missing_in_batches():
+    spc = SpotifyClient()
+    uris_movie = [x['spotify'] for x in MOCK_MOVIE_JSON['songs']]
+    spc.export(playlist_name=MOCK_MOVIE_JSON['media_name'],
+               track_uris=uris_movie,
+               description='')
+    spc.client.reset_counter()
+    spc.export(playlist_name=MOCK_MOVIE_JSON['media_name'],
+               track_uris=uris_movie + [f'spotify:track:new{i}' for i in range(250)],
+               description='')
+    assert spc.client._counter['playlist_add_items'] == 3, \
+        f'Expected 3 call(s) to \'playlist_add_items\' ! ' \
+        f'Instead got {spc.client._counter["playlist_add_items"]} calls.'
+
+
+def test_playlist_index():
+    spc = SpotifyClient()
+    spc.client._crt_playlists['items'].extend({'name': f'playlist{i}', 'id': 1000 + i} for i in range(228))
+    spc.client._crt_playlists['items'].append({'name': 'playlist0', 'id': 1})
+    assert spc._get_playlist_id('playlist227') == 1227
+    assert spc._get_playlist_id('playlist0') == 1000
+    assert spc.client._counter['current_user_playlists'] == 5, \
+        f'Expected 5 call(s) to \'current_user_playlists\' ! ' \
+        f'Instead got {spc.client._counter["current_user_playlists"]} calls.'
+    for media in [MOCK_SHOW_JSON, MOCK_MOVIE_JSON]:
+        spc.export(playlist_name=media['media_name'], track_uris=[], description='')
+    assert spc._playlist_exists(MOCK_MOVIE_JSON['media_name'])
+    assert spc.client._counter['current_user_playlists'] == 5
+    assert spc.client._counter['me'] == 1
+    spc.invalidate_playlist_index()
+    assert spc._get_playlist_id(MOCK_SHOW_JSON['media_name']) == 12
+    assert spc.client._counter['current_user_playlists'] == 10
 
 
 def test_playlist_exists_show():
@@ -230,45 +281,171 @@ def test_get_playlist_id_non_existent():
         f'Expected id for media {MOCK_GAME_JSON["media_name"]} to be empty!'
 
 
-def test_item_exists_in_playlist_show():
+@pytest.mark.parametrize('media', [MOCK_SHOW_JSON, MOCK_MOVIE_JSON, MOCK_GAME_JSON])
+def test_get_playlist_track_uris(media):
     spc = SpotifyClient()
-    uris_show = _get_show_uris()
-    spc.export(playlist_name=MOCK_SHOW_JSON['media_name'],
-               track_uris=uris_show,
+    uris = _get_show_uris() if media is MOCK_SHOW_JSON else [x['spotify'] for x in media['songs']]
+    spc.export(playlist_name=media['media_name'],
+               track_uris=uris,
                description='')
-    for uri in uris_show:
-        assert spc._item_exists_in_playlist(playlist_id=spc._get_playlist_id(MOCK_SHOW_JSON['media_name']),
-                                            track_uri=uri)
+    existing = spc._get_playlist_track_uris(spc._get_playlist_id(media['media_name']))
+    assert existing == set(uris)
+    assert not existing & {'as9f8h9ß', 'adza8snr', 'g7asencg'}
 
 
-def test_item_exists_in_playlist_movie():
+def test_playlist_locks_are_dropped():
     spc = SpotifyClient()
-    uris_movie = [x['spotify'] for x in MOCK_MOVIE_JSON['songs']]
-    spc.export(playlist_name=MOCK_MOVIE_JSON['media_name'],
-               track_uris=uris_movie,
-               description='')
-    for uri in uris_movie:
-        assert spc._item_exists_in_playlist(playlist_id=spc._get_playlist_id(MOCK_MOVIE_JSON['media_name']),
-                                            track_uri=uri)
+    spc.export(playlist_name=MOCK_MOVIE_JSON['media_name'], track_uris=[], description='')
+    assert MOCK_MOVIE_JSON['media_name'] not in spc._playlist_locks
+    acquired = []
+
+    def wait():
+        with spc._playlist_lock('The Mocks'):
+            acquired.append(True)
+
+    with spc._playlist_lock('The Mocks'):
+        thread = threading.Thread(target=wait)
+        thread.start()
+        while spc._playlist_locks['The Mocks'][1] < 2:
+            time.sleep(0.01)
+        assert not acquired, 'Second export should wait for the first one.'
+    thread.join()
+    assert acquired == [True]
+    assert 'The Mocks' not in spc._playlist_locks
+
+
+def test_plan_moves():
+    rng = random.Random(0)
+    for n in [0, 1, 2, 5, 30]:
+        for _ in range(20):
+            target = list(range(n))
+            current = rng.sample(target, n)
+            moves = mock_spotify_client._plan_moves(current, target)
+            lis = mock_spotify_client._longest_increasing_subsequence(current)
+            assert len(moves) <= n - len(lis)
+            for range_start, insert_before, range_length in moves:
+                block = current[range_start:range_start + range_length]
+                rest = current[:range_start] + current[range_start + range_length:]
+                position = insert_before - range_length if insert_before > range_start else insert_before
+                current = rest[:position] + block + rest[position:]
+            assert current == target
+    assert mock_spotify_client._plan_moves(list('abcdef'), list('cdefab')) == [(0, 6, 2)]
+
+
+def test_export_sync():
+    spc = SpotifyClient()
+    uris = [f'spotify:track:t{i}' for i in range(250)]
+    spc.export(playlist_name=MOCK_SHOW_JSON['media_name'], track_uris=uris, description='')
+    spc.client._crt_items[12] += ['spotify:track:foreign', uris[0]]
+    spc.client.reset_counter()
+    target = uris[1:] + ['spotify:track:new']
+    spc.export(playlist_name=MOCK_SHOW_JSON['media_name'], track_uris=target + target[:1], description='', sync=True)
+    assert spc.client._crt_items[12] == target
+    assert spc.client._counter['playlist'] == 3
+    assert spc.client._counter['playlist_remove_specific_occurrences_of_items'] == 1
+    assert spc.client._counter['playlist_add_items'] == 1
+    assert not {'playlist_reorder_items', 'playlist_replace_items'} & set(spc.client._counter)
+    # no changes
+    spc.client.reset_counter()
+    spc.export(playlist_name=MOCK_SHOW_JSON['media_name'], track_uris=target, description='', sync=True)
+    assert spc.client._crt_items[12] == target
+    assert spc.client._counter['playlist'] == 3
+    assert not {'playlist_remove_specific_occurrences_of_items', 'playlist_add_items', 'playlist_reorder_items',
+                'playlist_replace_items'} & set(spc.client._counter)
 
 
-def test_item_exists_in_playlist_game():
+def test_export_sync_large_playlist():
     spc = SpotifyClient()
-    uris_game = [x['spotify'] for x in MOCK_GAME_JSON['songs']]
-    spc.export(playlist_name=MOCK_GAME_JSON['media_name'],
-               track_uris=uris_game,
-               description='')
-    for uri in uris_game:
-        assert spc._item_exists_in_playlist(playlist_id=spc._get_playlist_id(MOCK_GAME_JSON['media_name']),
-                                            track_uri=uri)
+    uris = [f'spotify:track:t{i}' for i in range(250)]
+    spc.export(playlist_name=MOCK_MOVIE_JSON['media_name'], track_uris=uris, description='')
+    target = uris[1:200] + uris[:1] + uris[200:]
+    spc.client.reset_counter()
+    spc.export(playlist_name=MOCK_MOVIE_JSON['media_name'], track_uris=target, description='', sync=True)
+    assert spc.client._crt_items[34] == target
+    assert spc.client._counter['playlist'] == 3
+    assert spc.client._counter['playlist_items'] == 2
+    assert spc.client._counter['playlist_reorder_items'] == 1
+    # small playlists are replaced with a single request
+    uris_show = _get_show_uris()
+    spc.export(playlist_name=MOCK_SHOW_JSON['media_name'], track_uris=uris_show, description='')
+    spc.client.reset_counter()
+    spc.export(playlist_name=MOCK_SHOW_JSON['media_name'], track_uris=uris_show[::-1], description='', sync=True)
+    assert spc.client._crt_items[12] == uris_show[::-1]
+    assert spc.client._counter['playlist_replace_items'] == 1
+    assert 'playlist_add_items' not in spc.client._counter
+    # reversal is cheaper by replacing all tracks
+    spc.client.reset_counter()
+    spc.export(playlist_name=MOCK_MOVIE_JSON['media_name'], track_uris=uris[::-1], description='', sync=True)
+    assert spc.client._crt_items[34] == uris[::-1]
+    assert spc.client._counter['playlist_replace_items'] == 1
+    assert spc.client._counter['playlist_add_items'] == 2
+    assert 'playlist_reorder_items' not in spc.client._counter
 
 
-def test_item_exists_in_playlist_non_existent():
+def test_export_sync_modified_while_reading():
     spc = SpotifyClient()
-    uris_game = [x['spotify'] for x in MOCK_GAME_JSON['songs']]
-    spc.export(playlist_name=MOCK_GAME_JSON['media_name'],
-               track_uris=uris_game,
-               description='')
-    for uri in ['as9f8h9ß', 'adza8snr', 'g7asencg']:
-        assert not spc._item_exists_in_playlist(playlist_id=spc._get_playlist_id(MOCK_GAME_JSON['media_name']),
-                                                track_uri=uri)
+    uris = [f'spotify:track:t{i}' for i in range(150)]
+    spc.export(playlist_name=MOCK_GAME_JSON['media_name'], track_uris=uris, description='')
+    read_playlist_items = spc._read_playlist_items
+
+    def modifying_read(playlist_id, *args, **kwargs):
+        spc.client.playlist_add_items(playlist_id, ['spotify:track:concurrent'])
+        return read_playlist_items(playlist_id, *args, **kwargs)
+
+    spc._read_playlist_items = modifying_read
+    with pytest.raises(PlaylistModified):
+        spc.export(playlist_name=MOCK_GAME_JSON['media_name'], track_uris=uris[::-1], description='', sync=True)
+    del spc._read_playlist_items
+
+
+def test_export_with_state():
+    spc = SpotifyClient()
+    uris = [f'spotify:track:t{i}' for i in range(250)]
+    result = spc.export(playlist_name=MOCK_MOVIE_JSON['media_name'], track_uris=uris, description='a')
+    state = result.state
+    assert (result.added, result.removed) == (250, 0)
+    assert state == mock_spotify_client.PlaylistState(playlist_id=34,
+                                                      snapshot_id=str(spc.client._snapshots[34]),
+                                                      name=MOCK_MOVIE_JSON['media_name'],
+                                                      description='a',
+                                                      track_uris=uris)
+    # unchanged playlist is not read and details are not changed
+    spc.client.reset_counter()
+    result = spc.export(playlist_name=MOCK_MOVIE_JSON['media_name'], track_uris=uris[::-1][:200], description='a',
+                        sync=True, state=state)
+    state = result.state
+    assert (result.added, result.removed) == (0, 50)
+    assert spc.client._crt_items[34] == state.track_uris == uris[::-1][:200]
+    assert spc.client._counter['playlist'] == 1
+    assert not {'playlist_items', 'playlist_change_details'} & set(spc.client._counter)
+    assert state.snapshot_id == str(spc.client._snapshots[34])
+    # changed description
+    spc.client.reset_counter()
+    result = spc.export(playlist_name=MOCK_MOVIE_JSON['media_name'], track_uris=uris, description='b', state=state)
+    state = result.state
+    assert (result.added, result.removed) == (50, 0)
+    assert spc.client._counter['playlist_change_details'] == 1
+    assert state.snapshot_id == str(spc.client._snapshots[34])
+    assert state.track_uris == uris[::-1][:200] + uris[:50]
+    # modified elsewhere
+    spc.client.playlist_add_items(34, ['spotify:track:elsewhere'])
+    spc.client.reset_counter()
+    state = spc.export(playlist_name=MOCK_MOVIE_JSON['media_name'], track_uris=uris, description='b',
+                       state=state).state
+    assert spc.client._counter['playlist_items'] == 2
+    assert state.track_uris == spc.client._crt_items[34]
+    assert 'spotify:track:elsewhere' in state.track_uris
+
+
+def test_check_availability():
+    spc = SpotifyClient()
+    available = [f'spotify:track:{i:0>22}'.replace(':0', ':a', 1) for i in range(110)]
+    missing, locked = 'spotify:track:' + '0' * 22, 'spotify:track:' + '1' * 22
+    malformed = ['spotify:track:DEADBEEF', 'spotify:episode:' + 'a' * 22, None]
+    availability = spc.check_availability(available + [missing, locked] + malformed + available[:3])
+    assert availability == {**{x: True for x in available + [locked]}, **{x: False for x in [missing] + malformed}}
+    assert spc.client._counter['tracks'] == 3, \
+        f'Expected 3 call(s) to \'tracks\' ! ' \
+        f'Instead got {spc.client._counter["tracks"]} calls.'
+    assert spc.check_availability([locked], market='DE') == {locked: False}
+    assert spc.check_availability([]) == {}
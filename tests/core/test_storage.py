@@ -0,0 +1,239 @@
+"""Test module for `tunefind2spotify.core.storage`.
+
+Tests of the `Storage` interface run against all of its implementations.
+"""
+
+import pytest
+import subprocess
+import sys
+
+from copy import deepcopy
+
+from tunefind2spotify.core import storage
+from tunefind2spotify.core.storage import PlaylistState
+from tunefind2spotify.utils import MediaType
+
+from tests.core import mock_db as db
+from tests.test_data.mock_json_data import \
+    MOCK_SHOW_JSON, \
+    MOCK_MOVIE_JSON, \
+    MOCK_GAME_JSON, \
+    _get_show_uris
+
+
+@pytest.fixture(params=['sqlite', 'memory'])
+def stg(request):
+    if request.param == 'sqlite':
+        return db.DBConnector()
+    return storage.InMemoryStorage()
+
+
+def test_storage_is_abstract():
+    with pytest.raises(TypeError):
+        storage.Storage()
+    assert isinstance(db.DBConnector(), storage.Storage)
+
+
+def test_storage_without_spotify_client():
+    # the storage layer must not pull in `spotipy` and the Spotify client
+    code = 'import sys; import tunefind2spotify.core.db, tunefind2spotify.core.storage; ' \
+           'print([x for x in ["spotipy", "tunefind2spotify.core.spotify_client"] if x in sys.modules])'
+    assert subprocess.run([sys.executable, '-c', code], capture_output=True, text=True, check=True).stdout == '[]\n'
+
+
+def test_insert_and_get_json_data(stg):
+    for data in [MOCK_SHOW_JSON, MOCK_MOVIE_JSON, MOCK_GAME_JSON]:
+        stg.insert_json_data(data)
+        stg.insert_json_data(data)
+        x = stg.get_json_data(data['media_name'])
+        assert x.pop('last_updated') == stg.get_last_updated(data['media_name'])
+        assert x == data, f'Expected data of \'{data["media_name"]}\' to be restored. Instead got: {x} .'
+    assert stg.get_media_names() == [MOCK_SHOW_JSON['media_name'],
+                                     MOCK_MOVIE_JSON['media_name'],
+                                     MOCK_GAME_JSON['media_name']]
+
+
+def test_media_info(stg):
+    assert not stg.media_exists(MOCK_MOVIE_JSON['media_name'])
+    stg.insert_json_data(dict(MOCK_MOVIE_JSON, last_updated=1234))
+    assert stg.media_exists(MOCK_MOVIE_JSON['media_name'])
+    assert stg.get_media_type(MOCK_MOVIE_JSON['media_name']) is MediaType.MOVIE
+    assert stg.get_readable_name(MOCK_MOVIE_JSON['media_name']) == MOCK_MOVIE_JSON['readable_name']
+    assert stg.get_last_updated(MOCK_MOVIE_JSON['media_name']) == 1234
+    assert stg.get_playlist_description(MOCK_MOVIE_JSON['media_name']).startswith(
+        f'sourced from: https://www.tunefind.com/movie/{MOCK_MOVIE_JSON["media_name"]} | last-updated: ')
+
+
+def test_last_updated_bumped(stg):
+    stg.insert_json_data(dict(MOCK_MOVIE_JSON, last_updated=1000))
+    stg.insert_json_data(dict(MOCK_MOVIE_JSON, last_updated=2000))
+    assert stg.get_last_updated(MOCK_MOVIE_JSON['media_name']) == 2000
+    stg.insert_json_data(dict(MOCK_MOVIE_JSON, last_updated=1500))
+    assert stg.get_last_updated(MOCK_MOVIE_JSON['media_name']) == 2000
+    stg.insert_json_data(MOCK_MOVIE_JSON)
+    assert stg.get_last_updated(MOCK_MOVIE_JSON['media_name']) > 2000
+
+
+def test_get_track_uris(stg):
+    stg.insert_json_data(MOCK_SHOW_JSON)
+    stg.insert_json_data(MOCK_GAME_JSON)
+    assert sorted(stg.get_track_uris_show(MOCK_SHOW_JSON['media_name'])) == sorted(_get_show_uris())
+    assert stg.get_track_uris_show(MOCK_SHOW_JSON['media_name'], restrict_to_season=2) == ['spotify:track:empty']
+    with pytest.raises(ValueError):
+        stg.get_track_uris_show(MOCK_SHOW_JSON['media_name'], restrict_to_season=3)
+    assert sorted(stg.get_track_uris_media(MOCK_GAME_JSON['media_name'])) == \
+        sorted(x['spotify'] for x in MOCK_GAME_JSON['songs'])
+
+
+def test_get_track_uris_by_episode(stg):
+    stg.insert_json_data(MOCK_SHOW_JSON)
+    episodes = stg.get_track_uris_by_episode(MOCK_SHOW_JSON['media_name'])
+    expected = {}
+    for s, season in enumerate(MOCK_SHOW_JSON['seasons']):
+        for e, episode in enumerate(season['episodes']):
+            if uris := [x['spotify'] for x in episode['songs'] if x['spotify']]:
+                expected[(s + 1, e + 1)] = uris
+    assert episodes == expected
+    assert list(episodes) == sorted(expected)
+    assert [uri for x in episodes.values() for uri in x] == \
+        stg.get_track_uris_show(MOCK_SHOW_JSON['media_name'])
+    assert not stg.get_track_uris_by_episode('8hsg094g')
+
+
+def test_search(stg):
+    stg.insert_json_data(MOCK_SHOW_JSON)
+    stg.insert_json_data(MOCK_MOVIE_JSON)
+    hits = stg.search('fluff')
+    assert {(x['media_name'], x['spotify_uri']) for x in hits} == \
+        {(m['media_name'], uri) for m in [MOCK_SHOW_JSON, MOCK_MOVIE_JSON]
+         for uri in ['spotify:track:unicorn']}
+    hits = stg.search('mockies')
+    assert [(x['media_name'], x['song_name']) for x in hits] == [(MOCK_MOVIE_JSON['media_name'], None)]
+    assert len(stg.search('fluff', limit=1)) == 1
+    # hits on media come before hits on songs
+    movie = deepcopy(MOCK_MOVIE_JSON)
+    movie['songs'].append(dict(movie['songs'][0], id=999, name='Mockies Theme'))
+    stg.insert_json_data(movie)
+    hits = stg.search('mockies')
+    assert [x['song_name'] for x in hits] == [None, 'Mockies Theme']
+    assert not stg.search('8hsg094g')
+    assert not stg.search('')
+
+
+def test_artists(stg):
+    stg.insert_json_data(MOCK_SHOW_JSON)
+    stg.insert_json_data(MOCK_GAME_JSON)
+    assert sorted(stg.get_media_for_artist('AGNES')) == sorted([MOCK_SHOW_JSON['media_name'],
+                                                                 MOCK_GAME_JSON['media_name']])
+    assert [x['spotify_uri'] for x in stg.get_songs_for_artist('no one.')] == ['spotify:track:empty'] * 2
+    assert not stg.get_media_for_artist('8hsg094g')
+
+
+def test_changes(stg):
+    name = MOCK_SHOW_JSON['media_name']
+    run_id = stg.insert_json_data(MOCK_SHOW_JSON)
+    assert stg.get_run_changes(run_id) == {'episode': 3, 'song': 5, 'match': 5}
+    assert stg.get_last_exported_run(name) is None
+    stg.record_export(name, 'Season')
+    assert stg.get_last_exported_run(name, 'Season') == run_id
+    assert stg.get_last_exported_run(name) is None, 'Exports should be recorded per playlist.'
+    stg.record_export(name)
+    last_exported_run = stg.get_last_exported_run(name)
+    assert last_exported_run == run_id
+    run_id = stg.insert_json_data(MOCK_SHOW_JSON)
+    assert stg.get_run_changes(run_id) == {'episode': 0, 'song': 0, 'match': 0}
+    assert not stg.has_changes(name, since_run=last_exported_run)
+    data = deepcopy(MOCK_SHOW_JSON)
+    data['seasons'][1]['episodes'].append({'id': 220, 'songs': MOCK_MOVIE_JSON['songs'][:1]})
+    run_id = stg.insert_json_data(data)
+    assert stg.get_run_changes(run_id) == {'episode': 1, 'song': 1, 'match': 1}
+    assert stg.has_changes(name, since_run=last_exported_run)
+    assert stg.get_new_track_uris(name, since_run=last_exported_run) == [MOCK_MOVIE_JSON['songs'][0]['spotify']]
+    # changes restricted to episodes
+    assert stg.has_changes(name, since_run=last_exported_run, episodes=[(2, 1), (2, 2)])
+    assert not stg.has_changes(name, since_run=last_exported_run, episodes=[(1, 1), (1, 2), (2, 1)])
+    assert not stg.has_changes(name, since_run=last_exported_run, episodes=[])
+
+
+def test_linked_songs_are_episode_changes(stg):
+    name = MOCK_SHOW_JSON['media_name']
+    data = deepcopy(MOCK_SHOW_JSON)
+    data['seasons'][0]['episodes'][1]['songs'][0]['spotify'] = ''
+    stg.insert_json_data(data)
+    stg.record_export(name)
+    last_exported_run = stg.get_last_exported_run(name)
+    stg.set_spotify_uris({data['seasons'][0]['episodes'][1]['songs'][0]['id']: 'spotify:track:found'})
+    assert stg.has_changes(name, since_run=last_exported_run)
+    assert stg.has_changes(name, since_run=last_exported_run, episodes=[(1, 2)])
+    assert not stg.has_changes(name, since_run=last_exported_run, episodes=[(1, 1), (2, 1)])
+
+
+def test_playlist_state(stg):
+    assert stg.get_playlist_state('The Mocks') is None
+    state = PlaylistState(playlist_id='12', snapshot_id='abc', name='The Mocks', description='',
+                          track_uris=['spotify:track:unicorn', None])
+    stg.set_playlist_state(state)
+    state.track_uris.append('spotify:track:empty')
+    assert stg.get_playlist_state('The Mocks') == PlaylistState(playlist_id='12', snapshot_id='abc',
+                                                                 name='The Mocks', description='',
+                                                                 track_uris=['spotify:track:unicorn', None])
+    stg.set_playlist_state(state)
+    assert stg.get_playlist_state('The Mocks') == state
+
+
+def test_track_availability(stg):
+    uris = ['spotify:track:a', 'spotify:track:b']
+    assert stg.get_track_availability(uris) == {}
+    stg.set_track_availability({uris[0]: True, uris[1]: False})
+    assert stg.get_track_availability(uris + ['spotify:track:c']) == {uris[0]: True, uris[1]: False}
+    assert stg.get_track_availability(uris, max_age=60) == {uris[0]: True, uris[1]: False}
+    assert stg.get_track_availability(uris, max_age=-60) == {}
+    stg.set_track_availability({uris[1]: True})
+    assert stg.get_track_availability(uris[1:]) == {uris[1]: True}
+    # availability depends on the market
+    assert stg.get_track_availability(uris, market='US') == {}
+    stg.set_track_availability({uris[0]: False}, market='US')
+    assert stg.get_track_availability(uris, market='US') == {uris[0]: False}
+    assert stg.get_track_availability(uris, market='GB') == {}
+    assert stg.get_track_availability(uris) == {uris[0]: True, uris[1]: True}
+
+
+def test_unmatched_songs(stg):
+    movie = deepcopy(MOCK_MOVIE_JSON)
+    for song in movie['songs'][:2]:
+        song['spotify'] = ''
+    stg.insert_json_data(movie)
+    stg.insert_json_data(MOCK_GAME_JSON)
+    expected = [dict(tunefind_id=x['id'], song_name=x['name'], artists=x['artists']) for x in movie['songs'][:2]]
+    assert stg.get_unmatched_songs() == expected
+    assert stg.get_unmatched_songs(movie['media_name']) == expected
+    assert stg.get_unmatched_songs(MOCK_GAME_JSON['media_name']) == []
+    stg.set_spotify_uris({movie['songs'][0]['id']: 'spotify:track:found', movie['songs'][2]['id']: 'spotify:track:x'})
+    assert stg.get_unmatched_songs() == expected[1:]
+    # songs that have a URI keep it
+    assert stg.get_track_uris_media(movie['media_name']) == \
+        ['spotify:track:found'] + [x['spotify'] for x in movie['songs'][2:]]
+
+
+def test_matched_songs_are_changes(stg):
+    movie = deepcopy(MOCK_MOVIE_JSON)
+    movie['songs'][1]['spotify'] = ''
+    stg.insert_json_data(movie)
+    stg.record_export(movie['media_name'])
+    last_exported_run = stg.get_last_exported_run(movie['media_name'])
+    stg.set_spotify_uris({movie['songs'][1]['id']: 'spotify:track:found'})
+    assert stg.has_changes(movie['media_name'], since_run=last_exported_run)
+    assert stg.get_new_track_uris(movie['media_name'], since_run=last_exported_run) == ['spotify:track:found']
+    uris = stg.get_new_track_uris(movie['media_name'])
+    assert sorted(uris) == sorted(x['spotify'] or 'spotify:track:found' for x in movie['songs'])
+    # linking songs that already have a URI is no change
+    stg.record_export(movie['media_name'])
+    assert stg.get_last_exported_run(movie['media_name']) > last_exported_run
+    stg.set_spotify_uris({movie['songs'][0]['id']: 'spotify:track:other'})
+    assert not stg.has_changes(movie['media_name'], since_run=stg.get_last_exported_run(movie['media_name']))
+
+
+def test_search_cache(stg):
+    assert stg.get_search_cache(['a', 'b']) == {}
+    stg.set_search_cache({'a': ('spotify:track:a', 0.9), 'b': (None, 0.0)})
+    assert stg.get_search_cache(['a', 'b', 'c']) == {'a': ('spotify:track:a', 0.9), 'b': (None, 0.0)}
@@ -0,0 +1,457 @@
+"""Local fake of the parts of the Spotify Web API used by `SpotifyClient`.
+
+Unlike the mock @ `tests.core.mock_spotify_client`, which replaces `spotipy`
+at the Python level, the real `spotipy` client and the rate limiting wrapper
+make HTTP requests against this server, so that the requests an export incurs
+can be counted and timed:
+
+```
+with SpotifyServer(playlists=120, latency=0.01) as server:
+    spc = server.connect()
+    spc.export('My playlist', track_uris)
+    print(server.requests)
+```
+
+Served are the current user, their playlists (paged, at most
+`USER_PLAYLISTS_LIMIT` per page), creating playlists and changing their
+details, reading a playlist with its first page of items, and reading, adding,
+replacing, removing and reordering playlist items (paged respectively batched
+with at most `ITEMS_LIMIT` per request) under both `/items` and the older
+`/tracks` paths, as well as looking up tracks (at most `TRACKS_LIMIT`) and
+searching. Every modification of a playlist changes its `snapshot_id`;
+position based modifications given an outdated snapshot id fail with HTTP 400.
+Responses honor Spotify's `fields` filter, e.g.
+`fields=total,items(track(uri))`; unfiltered track objects are of realistic
+size.
+
+Requests beyond `max_rate` per second, and a random share `throttle` of all
+requests, are answered with HTTP 429 and header `Retry-After`. Requests are
+counted per endpoint, e.g. `GET /v1/playlists/{id}/items`.
+
+Attributes:
+    USER_PLAYLISTS_LIMIT (int): Maximal page size of the user's playlists.
+    ITEMS_LIMIT (int): Maximal number of playlist items per page or request.
+    TRACKS_LIMIT (int): Maximal number of tracks looked up per request.
+    SEARCH_LIMIT (int): Maximal number of search results per page.
+"""
+
+import base64
+import collections
+import json
+import random
+import re
+import threading
+import time
+
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, List, Optional, Tuple
+from urllib.parse import parse_qs, urlsplit
+
+from spotipy import Spotify
+
+from tunefind2spotify import trace
+from tunefind2spotify.core.rate_limit import RateLimitedClient, TokenBucket
+from tunefind2spotify.core.spotify_client import SpotifyClient
+
+USER_PLAYLISTS_LIMIT = 50
+ITEMS_LIMIT = 100
+TRACKS_LIMIT = 50
+SEARCH_LIMIT = 50
+
+USER_ID = 'fakeuser'
+_BASE62 = '0123456789abcdefghijklmnopqrstuvwxyzABCDEFGHIJKLMNOPQRSTUVWXYZ'
+
+
+class ApiError(Exception):
+    """Error answered as Spotify's error object."""
+
+    def __init__(self, status: int, message: str) -> None:
+        super().__init__(message)
+        self.status = status
+        self.message = message
+
+
+def _parse_fields(fields: str) -> dict:
+    """Parses Spotify's `fields` filter (e.g. `a,b(c,d(e))`) into a tree of dictionaries."""
+    tree, stack, name = {}, [], ''
+    for char in fields + ',':
+        if char in ',()' and name.strip():
+            tree[name.strip()] = tree.get(name.strip(), {})
+        if char == '(':
+            stack.append(tree)
+            tree = tree[name.strip()]
+        elif char == ')':
+            tree = stack.pop()
+        if char in ',()':
+            name = ''
+        else:
+            name += char
+    return tree
+
+
+def _select(obj, tree: dict):
+    """Keeps the fields of a JSON object selected by a parsed `fields` filter."""
+    if not tree:
+        return obj
+    if isinstance(obj, list):
+        return [_select(x, tree) for x in obj]
+    if isinstance(obj, dict):
+        return {k: _select(v, tree[k]) for k, v in obj.items() if k in tree}
+    return obj
+
+
+def _track(uri: str) -> dict:
+    """Returns a track object for a URI."""
+    track_id = uri.rsplit(':', 1)[-1]
+    return {'album': {'album_type': 'album',
+                      'id': track_id[::-1],
+                      'name': f'Album {track_id[:6]}',
+                      'release_date': '2000-01-01',
+                      'images': [{'url': f'https://i.scdn.co/image/{track_id}{x}', 'height': x, 'width': x}
+                                 for x in [640, 300, 64]]},
+            'artists': [{'id': track_id[1:] + '0', 'name': f'Artist {track_id[-6:]}', 'type': 'artist',
+                         'uri': f'spotify:artist:{track_id[1:]}0'}],
+            'available_markets': ['DE', 'GB', 'US'],
+            'duration_ms': 180000,
+            'explicit': False,
+            'external_urls': {'spotify': f'https://open.spotify.com/track/{track_id}'},
+            'id': track_id,
+            'is_local': False,
+            'name': f'Track {track_id[:6]}',
+            'popularity': 50,
+            'type': 'track',
+            'uri': uri}
+
+
+class _Handler(BaseHTTPRequestHandler):
+
+    server: 'SpotifyServer'
+    protocol_version = 'HTTP/1.1'
+    disable_nagle_algorithm = True
+
+    def log_message(self, *args) -> None:
+        pass
+
+    def do_GET(self) -> None:
+        self._handle('GET')
+
+    def do_POST(self) -> None:
+        self._handle('POST')
+
+    def do_PUT(self) -> None:
+        self._handle('PUT')
+
+    def do_DELETE(self) -> None:
+        self._handle('DELETE')
+
+    def _handle(self, method: str) -> None:
+        url = urlsplit(self.path)
+        params = {k: v[-1] for k, v in parse_qs(url.query).items()}
+        length = int(self.headers.get('Content-Length') or 0)
+        body = json.loads(self.rfile.read(length) or 'null') if length else None
+        throttled = self.server.admit(method, url.path)
+        try:
+            if throttled:
+                raise ApiError(429, 'API rate limit exceeded')
+            if not self.headers.get('Authorization', '').startswith('Bearer '):
+                raise ApiError(401, 'No token provided')
+            status, result = self.server.route(method, url.path, params, body)
+        except ApiError as e:
+            status, result = e.status, {'error': {'status': e.status, 'message': e.message}}
+        data = b'' if result is None else json.dumps(result).encode()
+        # counted before answering, so that counts are complete once the client has the answer
+        self.server.record(status, len(data))
+        self.send_response(status)
+        if status == 429:
+            self.send_header('Retry-After', str(self.server.retry_after))
+        if data:
+            self.send_header('Content-Type', 'application/json; charset=utf-8')
+        self.send_header('Content-Length', str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+
+class SpotifyServer(ThreadingHTTPServer):
+    """HTTP server answering on a free local port in a background thread.
+
+    Attributes:
+        url (str): Root of the server.
+        latency (float): Delay in seconds before answering any request.
+        throttle (float): Probability of answering with HTTP 429.
+        max_rate (float): Number of requests per second beyond which requests
+            are answered with HTTP 429, `None` for no limit.
+        retry_after (int): Value of header `Retry-After` of HTTP 429 in
+            seconds.
+        playlists (Dict[str, dict]): Playlists of the user by id, with keys
+            `name`, `description`, `public`, `collaborative`, `snapshot_id`
+            and `uris`.
+        requests (collections.Counter): Number of requests by endpoint.
+        responses (collections.Counter): Number of responses by status code.
+        bytes (int): Number of bytes of response bodies.
+    """
+
+    daemon_threads = True
+
+    def __init__(self,
+                 playlists: Optional[int] = 0,
+                 latency: Optional[float] = 0.0,
+                 throttle: Optional[float] = 0.0,
+                 max_rate: Optional[float] = None,
+                 retry_after: Optional[int] = 0,
+                 seed: Optional[int] = 0) -> None:
+        """Prepares serving a user with given number of (empty) playlists.
+
+        Args:
+            playlists: Number of playlists of the user, named `Playlist <n>`.
+                Optional, defaults to 0.
+            latency: Delay in seconds before answering any request. Optional,
+                defaults to 0.
+            throttle: Probability of HTTP 429. Optional, defaults to 0.
+            max_rate: Maximal number of requests per second. Optional, defaults
+                to `None`.
+            retry_after: Seconds to wait when throttled. Optional, defaults to
+                0.
+            seed: Seed of the random generator of ids and throttling.
+                Optional, defaults to 0.
+        """
+        super().__init__(('127.0.0.1', 0), _Handler)
+        self.url = f'http://127.0.0.1:{self.server_address[1]}'
+        self.latency = latency
+        self.throttle = throttle
+        self.max_rate = max_rate
+        self.retry_after = retry_after
+        self.requests = collections.Counter()
+        self.responses = collections.Counter()
+        self.bytes = 0
+        self.lock = threading.Lock()
+        self._rng = random.Random(seed)
+        self._window = collections.deque()
+        self._versions = {}
+        self.playlists = {}
+        for i in range(playlists):
+            self._create(f'Playlist {i + 1}', '', False, False)
+        self._thread = None
+
+    def connect(self, rate: Optional[float] = None) -> SpotifyClient:
+        """Returns the Spotify client, talking to this server.
+
+        Note:
+            The client is a singleton, the returned object is reconfigured on
+            each call. Its credentials are reset.
+
+        Args:
+            rate: Rate of the client's token bucket in calls per second.
+                Optional, defaults to `None` in which case the default rate
+                applies.
+        """
+        sp = Spotify(auth='fake-token', retries=0, status_retries=0, status_forcelist=())
+        sp.prefix = f'{self.url}/v1/'
+        trace.install(sp._session)
+        spc = SpotifyClient.__new__(SpotifyClient)
+        spc.client = RateLimitedClient(sp, TokenBucket(rate=rate, burst=max(1, int(rate))) if rate else None)
+        spc._credentials = None
+        spc.invalidate_playlist_index()
+        return spc
+
+    def admit(self, method: str, path: str) -> bool:
+        """Counts a request, waits for the latency and decides whether it is throttled."""
+        endpoint = f'{method} ' + re.sub(r'/(playlists|users)/[^/]+', r'/\1/{id}', path.rstrip('/'))
+        with self.lock:
+            self.requests[endpoint] += 1
+            now = time.monotonic()
+            while self._window and self._window[0] <= now - 1:
+                self._window.popleft()
+            throttled = self._rng.random() < self.throttle or \
+                (self.max_rate is not None and len(self._window) >= self.max_rate)
+            if not throttled:
+                self._window.append(now)
+        if self.latency:
+            time.sleep(self.latency)
+        return throttled
+
+    def record(self, status: int, size: int) -> None:
+        """Counts a response by status code and its size in bytes."""
+        with self.lock:
+            self.responses[status] += 1
+            self.bytes += size
+
+    def _new_id(self) -> str:
+        return ''.join(self._rng.choice(_BASE62) for _ in range(22))
+
+    def _bump(self, playlist_id: str) -> str:
+        self._versions[playlist_id] = self._versions.get(playlist_id, 0) + 1
+        snapshot_id = base64.b64encode(f'{self._versions[playlist_id]},{playlist_id}'.encode()).decode()
+        self.playlists[playlist_id]['snapshot_id'] = snapshot_id
+        return snapshot_id
+
+    def _create(self, name: str, description: str, public: bool, collaborative: bool) -> str:
+        playlist_id = self._new_id()
+        self.playlists[playlist_id] = dict(name=name, description=description, public=public,
+                                           collaborative=collaborative, uris=[])
+        self._bump(playlist_id)
+        return playlist_id
+
+    def _playlist(self, playlist_id: str, items: bool) -> dict:
+        x = self.playlists[playlist_id]
+        playlist = {'collaborative': x['collaborative'],
+                    'description': x['description'],
+                    'id': playlist_id,
+                    'name': x['name'],
+                    'owner': {'id': USER_ID, 'type': 'user'},
+                    'public': x['public'],
+                    'snapshot_id': x['snapshot_id'],
+                    'type': 'playlist',
+                    'uri': f'spotify:playlist:{playlist_id}'}
+        if items:
+            playlist['tracks'] = self._page(f'playlists/{playlist_id}/tracks', self._items(playlist_id), 0,
+                                            ITEMS_LIMIT)
+        else:
+            playlist['tracks'] = {'href': f'{self.url}/v1/playlists/{playlist_id}/tracks', 'total': len(x['uris'])}
+        return playlist
+
+    def _items(self, playlist_id: str) -> List[dict]:
+        return [{'added_at': '2000-01-01T00:00:00Z', 'is_local': False, 'track': _track(x)}
+                for x in self.playlists[playlist_id]['uris']]
+
+    def _page(self, path: str, items: List[dict], offset: int, limit: int) -> dict:
+        href = f'{self.url}/v1/{path}?offset={{}}&limit={limit}'
+        return {'href': href.format(offset),
+                'items': items[offset:offset + limit],
+                'limit': limit,
+                'next': href.format(offset + limit) if offset + limit < len(items) else None,
+                'offset': offset,
+                'previous': href.format(max(0, offset - limit)) if offset else None,
+                'total': len(items)}
+
+    def route(self, method: str, path: str, params: Dict[str, str], body) -> Tuple[int, Optional[dict]]:
+        """Answers a request, returning status code and JSON body (`None` for none).
+
+        Raises:
+            ApiError: In case the request is invalid.
+        """
+        parts = path.strip('/').split('/')
+        if parts[:1] != ['v1']:
+            raise ApiError(404, 'Service not found')
+        parts = parts[1:]
+        with self.lock:
+            status, result = self._route(method, parts, params, body)
+        if 'fields' in params and result is not None:
+            result = _select(result, _parse_fields(params['fields']))
+        return status, result
+
+    def _route(self,  # noqa: C901
+               method: str,
+               parts: List[str],
+               params: Dict[str, str],
+               body) -> Tuple[int, Optional[dict]]:
+        limit, offset = int(params.get('limit', 20)), int(params.get('offset', 0))
+        if parts == ['me'] and method == 'GET':
+            return 200, {'id': USER_ID, 'display_name': 'Fake User', 'type': 'user', 'uri': f'spotify:user:{USER_ID}'}
+        if parts == ['me', 'playlists'] and method == 'GET':
+            if not 0 < limit <= USER_PLAYLISTS_LIMIT:
+                raise ApiError(400, 'Invalid limit')
+            return 200, self._page('me/playlists', [self._playlist(x, False) for x in self.playlists], offset, limit)
+        if len(parts) == 3 and parts[0] == 'users' and parts[2] == 'playlists' and method == 'POST':
+            if parts[1] != USER_ID:
+                raise ApiError(403, 'You cannot create a playlist for another user')
+            if not (body or {}).get('name'):
+                raise ApiError(400, 'Missing required field: name')
+            playlist_id = self._create(body['name'], body.get('description') or '', bool(body.get('public', True)),
+                                       bool(body.get('collaborative', False)))
+            return 201, self._playlist(playlist_id, True)
+        if parts[:1] == ['tracks'] and method == 'GET':
+            ids = [x for x in params.get('ids', '').split(',') if x]
+            if not 0 < len(ids) <= TRACKS_LIMIT:
+                raise ApiError(400, 'Invalid ids')
+            return 200, {'tracks': [dict(_track(f'spotify:track:{x}'), **({'is_playable': True}
+                                                                          if 'market' in params else {}))
+                                    for x in ids]}
+        if parts == ['search'] and method == 'GET':
+            if not 0 < limit <= SEARCH_LIMIT:
+                raise ApiError(400, 'Invalid limit')
+            name = re.sub(r'^track:| artist:.*$', '', params.get('q', '')).strip('"')
+            track = dict(_track(f'spotify:track:{self._new_id()}'), name=name.title())
+            return 200, {'tracks': self._page('search', [track] if name else [], offset, limit)}
+        if parts[:1] != ['playlists'] or len(parts) < 2:
+            raise ApiError(404, 'Service not found')
+        if parts[1] not in self.playlists:
+            raise ApiError(404, 'Not found.')
+        return self._route_playlist(method, parts, params, body)
+
+    def _route_playlist(self,  # noqa: C901
+                        method: str,
+                        parts: List[str],
+                        params: Dict[str, str],
+                        body) -> Tuple[int, Optional[dict]]:
+        limit, offset = int(params.get('limit', 20)), int(params.get('offset', 0))
+        playlist_id, playlist = parts[1], self.playlists[parts[1]]
+        if len(parts) == 2 and method == 'GET':
+            return 200, self._playlist(playlist_id, True)
+        if len(parts) == 2 and method == 'PUT':
+            for key in ['name', 'description', 'public', 'collaborative']:
+                if key in (body or {}):
+                    playlist[key] = body[key]
+            self._bump(playlist_id)
+            return 200, None
+        if len(parts) != 3 or parts[2] not in ['items', 'tracks']:
+            raise ApiError(404, 'Service not found')
+        if method == 'GET':
+            if not 0 < limit <= ITEMS_LIMIT:
+                raise ApiError(400, 'Invalid limit')
+            return 200, self._page(f'playlists/{playlist_id}/{parts[2]}', self._items(playlist_id), offset, limit)
+        body = body or {}
+        if method == 'POST':
+            uris = body if isinstance(body, list) else body.get('uris', [])
+            if not 0 < len(uris) <= ITEMS_LIMIT:
+                raise ApiError(400, f'Too many ids requested (maximum {ITEMS_LIMIT})')
+            position = int(params.get('position', len(playlist['uris'])))
+            playlist['uris'][position:position] = uris
+            return 201, {'snapshot_id': self._bump(playlist_id)}
+        self._check_snapshot(playlist, body)
+        if method == 'PUT' and 'range_start' in body:
+            start, before, length = body['range_start'], body['insert_before'], body.get('range_length', 1)
+            uris = playlist['uris']
+            if not (0 <= start and start + length <= len(uris) and 0 <= before <= len(uris)):
+                raise ApiError(400, 'Index out of bounds')
+            block, rest = uris[start:start + length], uris[:start] + uris[start + length:]
+            position = before - length if before > start else before
+            playlist['uris'] = rest[:position] + block + rest[position:]
+            return 200, {'snapshot_id': self._bump(playlist_id)}
+        if method == 'PUT':
+            if len(body.get('uris', [])) > ITEMS_LIMIT:
+                raise ApiError(400, f'Too many ids requested (maximum {ITEMS_LIMIT})')
+            playlist['uris'] = list(body.get('uris', []))
+            return 200, {'snapshot_id': self._bump(playlist_id)}
+        if method == 'DELETE':
+            items = body.get('items', body.get('tracks', []))
+            if not 0 < len(items) <= ITEMS_LIMIT:
+                raise ApiError(400, f'Too many tracks requested (maximum {ITEMS_LIMIT})')
+            self._remove(playlist, items)
+            return 200, {'snapshot_id': self._bump(playlist_id)}
+        raise ApiError(405, 'Method not allowed')
+
+    def _check_snapshot(self, playlist: dict, body: dict) -> None:
+        if body.get('snapshot_id') not in [None, playlist['snapshot_id']]:
+            raise ApiError(400, 'Invalid snapshot id')
+
+    def _remove(self, playlist: dict, items: List[dict]) -> None:
+        positions = set()
+        for x in items:
+            if 'positions' in x:
+                uris = playlist['uris']
+                if any(not 0 <= p < len(uris) or uris[p] != x['uri'] for p in x['positions']):
+                    raise ApiError(400, 'Could not remove tracks, please check parameters.')
+                positions.update(x['positions'])
+            else:
+                positions.update(p for p, uri in enumerate(playlist['uris']) if uri == x['uri'])
+        playlist['uris'] = [uri for p, uri in enumerate(playlist['uris']) if p not in positions]
+
+    def __enter__(self) -> 'SpotifyServer':
+        self._thread = threading.Thread(target=self.serve_forever, kwargs={'poll_interval': 0.05}, daemon=True)
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.shutdown()
+        self.server_close()
+        self._thread.join()
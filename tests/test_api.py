@@ -1,6 +1,11 @@
 """Test module for `tunefind2spotify.api`."""
 
 import os
+import pytest
+
+from copy import deepcopy
+
+from tunefind2spotify.core.storage import InMemoryStorage
 
 from tests import mock_api as api
 from tests.test_data.mock_json_data import \
@@ -71,3 +76,284 @@ def test_pull():
     assert api.db.DBConnector().media_exists(MOCK_GAME_JSON['media_name'])
 
     api.db.REUSE = _val
+
+
+def test_search():
+    _val = api.db.REUSE
+    api.db.REUSE = True
+
+    api.fetch(MOCK_MOVIE_JSON['media_name'])
+    api.string_capture.reset()
+    hits = api.search('fluffy')
+    assert MOCK_MOVIE_JSON['media_name'] in [x['media_name'] for x in hits]
+    assert api.string_capture.getvalue().startswith('INFO')
+
+    api.string_capture.reset()
+    assert not api.search('8hsg094g')
+    assert 'No results' in api.string_capture.getvalue()
+
+    api.db.REUSE = _val
+
+
+def test_dump_and_load(tmp_path):
+    _val = api.db.REUSE
+    api.db.REUSE = True
+
+    api.fetch(MOCK_SHOW_JSON['media_name'])
+    api.fetch(MOCK_GAME_JSON['media_name'])
+    file = str(tmp_path / 'dump.jsonl.gz')
+    assert api.dump(file) >= 2
+    expected = api.db.DBConnector().get_json_data(MOCK_SHOW_JSON['media_name'])
+
+    api.db.REUSE = False
+    api.db.DBConnector()
+    api.db.REUSE = True
+    assert not api.db.DBConnector().media_exists(MOCK_SHOW_JSON['media_name'])
+    assert api.load(file) >= 2
+    assert api.db.DBConnector().get_json_data(MOCK_SHOW_JSON['media_name']) == expected
+    assert api.db.DBConnector().media_exists(MOCK_GAME_JSON['media_name'])
+
+    api.db.REUSE = _val
+
+
+def test_dump_selected_media(tmp_path):
+    _val = api.db.REUSE
+    api.db.REUSE = True
+
+    api.fetch(MOCK_MOVIE_JSON['media_name'])
+    file = str(tmp_path / 'dump.jsonl')
+    api.string_capture.reset()
+    assert api.dump(file, media_names=[MOCK_MOVIE_JSON['media_name'], '8hsg094g']) == 1
+    assert 'WARNING' in api.string_capture.getvalue()
+    with open(file) as f:
+        assert len(f.readlines()) == 2
+
+    api.db.REUSE = _val
+
+
+def test_load_invalid_file(tmp_path):
+    file = tmp_path / 'invalid.jsonl'
+    file.write_text('{}\n')
+    with pytest.raises(ValueError):
+        api.load(str(file))
+
+
+def test_export_skip_unchanged_and_delta():
+    _val = api.db.REUSE
+    api.db.REUSE = True
+
+    api.fetch(MOCK_MOVIE_JSON['media_name'])
+    api.export(MOCK_MOVIE_JSON['media_name'], credentials=CREDENTIALS)
+    api.fetch(MOCK_MOVIE_JSON['media_name'])
+    api.string_capture.reset()
+    api.export(MOCK_MOVIE_JSON['media_name'], credentials=CREDENTIALS, skip_unchanged=True)
+    assert 'Skipping' in api.string_capture.getvalue()
+
+    api.string_capture.reset()
+    api.export(MOCK_MOVIE_JSON['media_name'], credentials=CREDENTIALS, delta=True)
+    assert 'Exporting 0 songs' in api.string_capture.getvalue()
+
+    api.db.REUSE = _val
+
+
+def test_pull_in_memory():
+    stg = InMemoryStorage()
+    api.pull(MOCK_SHOW_JSON['media_name'], credentials=CREDENTIALS, storage=stg)
+    assert stg.media_exists(MOCK_SHOW_JSON['media_name'])
+    assert not api.db.DBConnector().media_exists(MOCK_SHOW_JSON['media_name'])
+    assert stg.get_last_exported_run(MOCK_SHOW_JSON['media_name']) is not None
+
+
+def test_fetch_skips_fresh_media():
+    stg = InMemoryStorage()
+    api.fetch(MOCK_MOVIE_JSON['media_name'], storage=stg)
+    api.string_capture.reset()
+    api.fetch(MOCK_MOVIE_JSON['media_name'], storage=stg)
+    assert 'Skipping fetch' in api.string_capture.getvalue()
+    assert len(stg.get_media_names()) == 1
+
+    api.string_capture.reset()
+    api.fetch(MOCK_MOVIE_JSON['media_name'], force=True, storage=stg)
+    api.fetch(MOCK_MOVIE_JSON['media_name'], ttl={api.MediaType.MOVIE: 0}, storage=stg)
+    assert 'Skipping fetch' not in api.string_capture.getvalue()
+
+    # stored type differs from requested one
+    api.string_capture.reset()
+    api.fetch(MOCK_MOVIE_JSON['media_name'], media_type=api.MediaType.GAME, storage=stg)
+    assert 'Skipping fetch' not in api.string_capture.getvalue()
+
+
+def test_fetch_stale_media():
+    stg = InMemoryStorage()
+    stg.insert_json_data(dict(MOCK_SHOW_JSON, last_updated=1))
+    api.string_capture.reset()
+    api.fetch(MOCK_SHOW_JSON['media_name'], storage=stg)
+    assert 'Skipping fetch' not in api.string_capture.getvalue()
+    assert stg.get_last_updated(MOCK_SHOW_JSON['media_name']) > 1
+
+
+def test_export_sync():
+    with pytest.raises(ValueError):
+        api.export(MOCK_MOVIE_JSON['media_name'], credentials=CREDENTIALS, delta=True, sync=True)
+    stg = InMemoryStorage()
+    api.pull(MOCK_MOVIE_JSON['media_name'], credentials=CREDENTIALS, storage=stg)
+    api.export(MOCK_MOVIE_JSON['media_name'], credentials=CREDENTIALS, sync=True, storage=stg)
+
+
+def test_export_mirrors_playlist_state():
+    stg = InMemoryStorage()
+    api.pull(MOCK_GAME_JSON['media_name'], credentials=CREDENTIALS, storage=stg)
+    playlist_name = stg.get_readable_name(MOCK_GAME_JSON['media_name'])
+    state = stg.get_playlist_state(playlist_name)
+    assert state.playlist_id == 56
+    assert sorted(state.track_uris) == sorted(set(stg.get_track_uris_media(MOCK_GAME_JSON['media_name'])))
+    api.export(MOCK_GAME_JSON['media_name'], credentials=CREDENTIALS, storage=stg)
+    assert stg.get_playlist_state(playlist_name) == state
+
+
+def test_export_many():
+    stg = InMemoryStorage()
+    for media in [MOCK_SHOW_JSON, MOCK_MOVIE_JSON, MOCK_GAME_JSON]:
+        api.fetch(media['media_name'], storage=stg)
+    reports = api.export_many([MOCK_GAME_JSON['media_name'], 'does-not-exist', MOCK_SHOW_JSON['media_name']],
+                              credentials=CREDENTIALS, workers=2, storage=stg)
+    assert [(x.media_name, x.playlist_id, x.error) for x in reports] == \
+        [(MOCK_GAME_JSON['media_name'], 56, None), (MOCK_SHOW_JSON['media_name'], 12, None)]
+    assert reports[1].added == len(set(stg.get_track_uris_show(MOCK_SHOW_JSON['media_name'])))
+    assert stg.get_last_exported_run(MOCK_GAME_JSON['media_name']) is not None
+    assert stg.get_last_exported_run(MOCK_MOVIE_JSON['media_name']) is None
+    # all media in storage
+    reports = api.export_many(None, credentials=CREDENTIALS, skip_unchanged=True, storage=stg)
+    assert [x.media_name for x in reports] == [MOCK_MOVIE_JSON['media_name']]
+
+
+def test_export_many_failure(monkeypatch):
+    stg = InMemoryStorage()
+    api.fetch(MOCK_MOVIE_JSON['media_name'], storage=stg)
+    api.fetch(MOCK_GAME_JSON['media_name'], storage=stg)
+    export = api.SpotifyClient.export
+
+    def failing_export(self, playlist_name, *args, **kwargs):
+        if playlist_name == stg.get_readable_name(MOCK_MOVIE_JSON['media_name']):
+            raise RuntimeError('boom')
+        return export(self, playlist_name, *args, **kwargs)
+
+    monkeypatch.setattr(api.SpotifyClient, 'export', failing_export)
+    reports = api.export_many([MOCK_MOVIE_JSON['media_name'], MOCK_GAME_JSON['media_name']],
+                              credentials=CREDENTIALS, storage=stg)
+    assert [(x.media_name, x.error is None) for x in reports] == \
+        [(MOCK_MOVIE_JSON['media_name'], False), (MOCK_GAME_JSON['media_name'], True)]
+    assert stg.get_last_exported_run(MOCK_MOVIE_JSON['media_name']) is None
+
+
+def test_export_seasons():
+    stg = InMemoryStorage()
+    stg.insert_json_data(MOCK_SHOW_JSON)
+    episodes = stg.get_track_uris_by_episode(MOCK_SHOW_JSON['media_name'])
+    seasons = sorted({season for season, _ in episodes})
+    readable_name = stg.get_readable_name(MOCK_SHOW_JSON['media_name'])
+    reports = api.export_seasons(MOCK_SHOW_JSON['media_name'], credentials=CREDENTIALS, storage=stg)
+    assert [x.playlist_name for x in reports] == [f'{readable_name} - S{x:02d}' for x in seasons]
+    assert all(x.error is None for x in reports)
+    assert sum(x.added for x in reports) == \
+        sum(len(set(sum((uris for (s, _), uris in episodes.items() if s == x), []))) for x in seasons)
+    assert stg.get_last_exported_run(MOCK_SHOW_JSON['media_name']) is None
+    for report in reports:
+        assert stg.get_playlist_state(report.playlist_name).playlist_id == report.playlist_id
+        assert stg.get_last_exported_run(MOCK_SHOW_JSON['media_name'], report.playlist_name) is not None
+    assert api.export_seasons(MOCK_SHOW_JSON['media_name'], credentials=CREDENTIALS, skip_unchanged=True,
+                              storage=stg) == []
+    # fixed episode ranges
+    reports = api.export_seasons(MOCK_SHOW_JSON['media_name'], credentials=CREDENTIALS, episodes_per_playlist=1,
+                                 storage=stg)
+    assert [x.playlist_name for x in reports] == \
+        sorted(f'{readable_name} - S{s:02d}E{e:02d}-E{e:02d}' for s, e in episodes)
+    with pytest.raises(ValueError):
+        api.export_seasons(MOCK_SHOW_JSON['media_name'], credentials=CREDENTIALS, episodes_per_playlist=0,
+                           storage=stg)
+
+
+def test_export_seasons_skips_unchanged_seasons():
+    stg = InMemoryStorage()
+    stg.insert_json_data(MOCK_SHOW_JSON)
+    readable_name = stg.get_readable_name(MOCK_SHOW_JSON['media_name'])
+    api.export_seasons(MOCK_SHOW_JSON['media_name'], credentials=CREDENTIALS, storage=stg)
+    data = deepcopy(MOCK_SHOW_JSON)
+    data['seasons'][1]['episodes'].append({'id': 220, 'songs': MOCK_MOVIE_JSON['songs'][:1]})
+    stg.insert_json_data(data)
+    reports = api.export_seasons(MOCK_SHOW_JSON['media_name'], credentials=CREDENTIALS, skip_unchanged=True,
+                                 storage=stg)
+    assert [x.playlist_name for x in reports] == [f'{readable_name} - S02']
+
+
+def test_export_after_export_seasons():
+    stg = InMemoryStorage()
+    stg.insert_json_data(MOCK_SHOW_JSON)
+    uris = stg.get_track_uris_show(MOCK_SHOW_JSON['media_name'])
+    api.export_seasons(MOCK_SHOW_JSON['media_name'], credentials=CREDENTIALS, storage=stg)
+    # the playlist of the whole show was never exported
+    report = api.export(MOCK_SHOW_JSON['media_name'], credentials=CREDENTIALS, skip_unchanged=True, storage=stg)
+    assert report.added == len(set(uris))
+    stg.insert_json_data(MOCK_SHOW_JSON)
+    assert api.export(MOCK_SHOW_JSON['media_name'], credentials=CREDENTIALS, skip_unchanged=True,
+                      storage=stg) is None
+    assert api.export_seasons(MOCK_SHOW_JSON['media_name'], credentials=CREDENTIALS, skip_unchanged=True,
+                              storage=stg) == []
+
+
+def test_export_seasons_not_a_show():
+    stg = InMemoryStorage()
+    api.fetch(MOCK_MOVIE_JSON['media_name'], storage=stg)
+    assert api.export_seasons(MOCK_MOVIE_JSON['media_name'], credentials=CREDENTIALS, storage=stg) == []
+    assert api.export_seasons('does-not-exist', credentials=CREDENTIALS, storage=stg) == []
+
+
+def test_export_validate():
+    stg = InMemoryStorage()
+    stg.insert_json_data(MOCK_SHOW_JSON)
+    uris = stg.get_track_uris_show(MOCK_SHOW_JSON['media_name'])
+    # mock URIs are malformed, so mark some as available in the cache
+    stg.set_track_availability({x: True for x in uris[:2]})
+    report = api.export(MOCK_SHOW_JSON['media_name'], credentials=CREDENTIALS, validate=True, storage=stg)
+    assert report.added == len(set(uris[:2]))
+    assert stg.get_playlist_state(stg.get_readable_name(MOCK_SHOW_JSON['media_name'])).track_uris == \
+        list(dict.fromkeys(uris[:2]))
+    assert stg.get_track_availability(uris) == {x: x in uris[:2] for x in uris}
+    assert 'unavailable' in api.string_capture.getvalue()
+
+
+def test_export_validate_per_market():
+    stg = InMemoryStorage()
+    stg.insert_json_data(MOCK_SHOW_JSON)
+    uris = stg.get_track_uris_show(MOCK_SHOW_JSON['media_name'])
+    stg.set_track_availability({x: True for x in uris})
+    # checks without market do not tell about the market
+    report = api.export(MOCK_SHOW_JSON['media_name'], credentials=CREDENTIALS, validate=True, market='US',
+                        storage=stg)
+    assert report.added == 0
+    assert stg.get_track_availability(uris, market='US') == {x: False for x in uris}
+    assert stg.get_track_availability(uris) == {x: True for x in uris}
+
+
+def test_match():
+    stg = InMemoryStorage()
+    api.fetch(MOCK_SHOW_JSON['media_name'], storage=stg)
+    unmatched = stg.get_unmatched_songs(MOCK_SHOW_JSON['media_name'])
+    report = api.match(CREDENTIALS, media_name=MOCK_SHOW_JSON['media_name'], storage=stg)
+    assert report.songs == len(unmatched) and report.failed == 0
+    assert len(stg.get_unmatched_songs()) == len(unmatched) - report.matched
+    assert 'Matched' in api.string_capture.getvalue()
+
+
+def test_export_delta_after_match():
+    stg = InMemoryStorage()
+    name = MOCK_SHOW_JSON['media_name']
+    api.fetch(name, storage=stg)
+    api.export(name, credentials=CREDENTIALS, storage=stg)
+    assert api.export(name, credentials=CREDENTIALS, skip_unchanged=True, storage=stg) is None
+    report = api.match(CREDENTIALS, media_name=name, storage=stg)
+    assert report.matched
+    matched = [x for x in stg.get_track_uris_show(name)
+               if x not in stg.get_playlist_state(stg.get_readable_name(name)).track_uris]
+    report = api.export(name, credentials=CREDENTIALS, skip_unchanged=True, delta=True, storage=stg)
+    assert report is not None and report.added == len(set(matched)) > 0
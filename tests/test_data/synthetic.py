@@ -0,0 +1,202 @@
+"""Synthetic data in the shape of scraped media, used for load and scaling tests.
+
+Unlike the hand-written samples @ `tests.test_data.mock_json_data`, media of
+arbitrary size are generated, in exactly the shape consumed by
+`DBConnector.insert_json_data` (and returned by `tunefind_scraper.scrape`).
+Names are drawn from a vocabulary of random words. Generation is deterministic
+given the seed, so that runs are comparable.
+
+Like on Tunefind, songs may be used by several media (and by several episodes
+of a show), and songs may lack a link to Spotify, in which case their `spotify`
+field is an empty string. Songs are reused from a pool of at most `POOL_SIZE`
+songs, a uniform sample (reservoir) of all songs generated so far, so that the
+memory of the generator is bounded however many media it generates.
+
+```
+catalog = SyntheticCatalog(seed=1, reuse=0.2, missing=0.1)
+for media in catalog.generate(10_000):
+    dbc.insert_json_data(media)
+```
+
+Attributes:
+    VOCABULARY_SIZE (int): Number of distinct words names are made of.
+    POOL_SIZE (int): Maximal number of songs kept for reuse.
+"""
+
+import hashlib
+import random
+import string
+
+from typing import Iterator, List, Optional, Set, Tuple
+
+from tunefind2spotify.utils import MediaType
+
+VOCABULARY_SIZE = 5000
+POOL_SIZE = 10000
+
+_BASE62 = string.digits + string.ascii_letters
+
+
+def track_uri(song_id: int) -> str:
+    """Returns a well-formed Spotify track URI, unique per song id."""
+    x = int.from_bytes(hashlib.blake2b(str(song_id).encode(), digest_size=16).digest(), 'big')
+    chars = []
+    for _ in range(22):
+        x, r = divmod(x, 62)
+        chars.append(_BASE62[r])
+    return 'spotify:track:' + ''.join(chars)
+
+
+class SyntheticCatalog:
+    """Generator of media whose songs are partly shared among them.
+
+    Attributes:
+        rng (random.Random): Source of randomness.
+        reuse (float): Probability that a song of a media is taken from the
+            pool of songs generated before instead of being a new one.
+        missing (float): Probability that a new song has no link to Spotify.
+    """
+
+    def __init__(self,
+                 seed: Optional[int] = 0,
+                 reuse: Optional[float] = 0.0,
+                 missing: Optional[float] = 0.0) -> None:
+        """Initializes the generator.
+
+        Args:
+            seed: Seed of the random generator. Optional, defaults to 0.
+            reuse: Probability that a song is reused. Optional, defaults to 0.
+            missing: Probability that a new song has no link to Spotify.
+                Optional, defaults to 0.
+        """
+        self.rng = random.Random(seed)
+        self.reuse = reuse
+        self.missing = missing
+        self._vocabulary = [''.join(self.rng.choice(string.ascii_lowercase) for _ in range(self.rng.randint(3, 9)))
+                            for _ in range(VOCABULARY_SIZE)]
+        self._songs = []  # pool of songs for reuse
+        self._generated = 0  # number of songs generated
+        self._next_id = 1
+
+    def _id(self) -> int:
+        x = self._next_id
+        self._next_id += 1
+        return x
+
+    def _words(self, n: int) -> str:
+        return ' '.join(self.rng.choices(self._vocabulary, k=n)).capitalize()
+
+    def song(self) -> dict:
+        """Returns a new song, linked to Spotify unless drawn to be missing."""
+        song_id = self._id()
+        song = {'id': song_id,
+                'name': self._words(self.rng.randint(1, 4)),
+                'spotify': '' if self.rng.random() < self.missing else track_uri(song_id),
+                'artists': ', '.join(self._words(2) for _ in range(self.rng.randint(1, 2)))}
+        if self.reuse:
+            self._keep(song)
+        return dict(song)
+
+    def _keep(self, song: dict) -> None:
+        """Adds a song to the pool, replacing a random one once the pool is full (reservoir sampling)."""
+        self._generated += 1
+        if len(self._songs) < POOL_SIZE:
+            self._songs.append(song)
+        elif (i := self.rng.randrange(self._generated)) < POOL_SIZE:
+            self._songs[i] = song
+
+    def songs(self, n: int, exclude: Optional[Set[int]] = None) -> List[dict]:
+        """Returns songs, each reused from earlier ones with probability `reuse`.
+
+        Args:
+            n: Number of songs.
+            exclude: Tunefind IDs of songs not to be reused, e.g. those already
+                used by the same media. Optional, defaults to `None`.
+
+        Returns:
+            List of songs without duplicates.
+        """
+        exclude = set() if exclude is None else exclude
+        songs = []
+        for _ in range(n):
+            song = None
+            if self._songs and self.rng.random() < self.reuse:
+                song = self.rng.choice(self._songs)
+                song = dict(song) if song['id'] not in exclude else None
+            song = song or self.song()
+            exclude.add(song['id'])
+            songs.append(song)
+        return songs
+
+    def show(self,
+             media_name: str,
+             seasons: Optional[int] = 1,
+             episodes: Optional[int] = 10,
+             songs_per_episode: Optional[int] = 5) -> dict:
+        """Returns a show with given number of seasons, episodes per season and songs per episode."""
+        return {'media_name': media_name,
+                'media_type': MediaType.SHOW,
+                'readable_name': media_name.replace('-', ' ').title(),
+                'seasons': [{'name': f'Season {s + 1}',
+                             'id': f'season/{s + 1}',
+                             'episodes': [{'name': f'Episode {e + 1}',
+                                           'id': self._id(),
+                                           'songs': self.songs(songs_per_episode)}
+                                          for e in range(episodes)]}
+                            for s in range(seasons)]}
+
+    def movie(self, media_name: str, songs: Optional[int] = 20) -> dict:
+        """Returns a movie with given number of songs."""
+        return {'media_name': media_name,
+                'media_type': MediaType.MOVIE,
+                'readable_name': media_name.replace('-', ' ').title(),
+                'songs': self.songs(songs)}
+
+    def game(self, media_name: str, songs: Optional[int] = 20) -> dict:
+        """Returns a game with given number of songs."""
+        return dict(self.movie(media_name, songs), media_type=MediaType.GAME)
+
+    def generate(self,
+                 titles: int,
+                 shows: Optional[float] = 0.4,
+                 games: Optional[float] = 0.1,
+                 seasons: Optional[Tuple[int, int]] = (1, 6),
+                 episodes: Optional[Tuple[int, int]] = (6, 13),
+                 songs_per_episode: Optional[Tuple[int, int]] = (2, 8),
+                 songs: Optional[Tuple[int, int]] = (10, 40)) -> Iterator[dict]:
+        """Generates a catalog of media of mixed types and sizes.
+
+        Note:
+            Media are generated lazily and the pool of songs for reuse is
+            bounded by `POOL_SIZE`, so that catalogs of any size can be
+            ingested without holding them in memory. Media names are unique
+            (`title-<number>`).
+
+        Args:
+            titles: Number of media.
+            shows: Share of shows. Optional, defaults to 0.4.
+            games: Share of games, the remainder are movies. Optional, defaults
+                to 0.1.
+            seasons: Range (inclusive) of seasons per show. Optional, defaults
+                to 1 to 6.
+            episodes: Range (inclusive) of episodes per season. Optional,
+                defaults to 6 to 13.
+            songs_per_episode: Range (inclusive) of songs per episode.
+                Optional, defaults to 2 to 8.
+            songs: Range (inclusive) of songs per movie or game. Optional,
+                defaults to 10 to 40.
+
+        Yields:
+            Media in the shape consumed by `insert_json_data`.
+        """
+        for i in range(titles):
+            x = self.rng.random()
+            if x < shows:
+                yield self.show(f'title-{i}',
+                                seasons=self.rng.randint(*seasons),
+                                episodes=self.rng.randint(*episodes),
+                                songs_per_episode=self.rng.randint(*songs_per_episode))
+            elif x < shows + games:
+                yield self.game(f'title-{i}', songs=self.rng.randint(*songs))
+            else:
+                yield self.movie(f'title-{i}', songs=self.rng.randint(*songs))
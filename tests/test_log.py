@@ -1,15 +1,66 @@
 """Test module for `tunefind2spotify.log`."""
 
-from tunefind2spotify.log import _LOG_LEVEL,\
+import logging
+import os
+import subprocess
+import sys
+
+from logging.handlers import QueueHandler
+
+from tunefind2spotify import log
+from tunefind2spotify.log import DEFAULT_LOG_LEVEL,\
+                                 ROOT_LOGGER_NAME,\
+                                 configure_logging,\
                                  fetch_logger,\
+                                 reset_logging,\
                                  flatten_multiline_string as fms
 
 
-def test_fetch_logger():
+def _queue_handlers():
+    # pytest attaches its own handlers to non-propagating loggers
+    return [x for x in logging.getLogger(ROOT_LOGGER_NAME).handlers if isinstance(x, QueueHandler)]
+
+
+def test_fetch_logger(configured_logging):
     logger = fetch_logger(__name__)
-    assert logger.level == _LOG_LEVEL, 'TODO'
-    assert logger.name == __name__, 'TODO'
-    assert len(logger.handlers) == 2, 'TODO'
+    assert logger.name == f'{ROOT_LOGGER_NAME}.{__name__}'
+    assert logger.getEffectiveLevel() == DEFAULT_LOG_LEVEL
+    assert not logger.handlers, 'Module loggers should share the handlers of the application\'s logger.'
+    assert fetch_logger('tunefind2spotify.api').name == 'tunefind2spotify.api'
+    assert len(_queue_handlers()) == 1
+
+
+def test_configure_logging(configured_logging, tmp_path):
+    log_file = os.path.join(tmp_path, 'other.log')
+    logger = fetch_logger(__name__)
+    configure_logging('debug', log_file)
+    assert logger.isEnabledFor(logging.DEBUG)
+    logger.debug('Written by %s.', 'listener')
+    configure_logging('WARNING', log_file)
+    logger.info('Not written.')
+    configure_logging(logging.INFO, '')
+    assert len(log._listener.handlers) == 1
+    configure_logging()
+    with open(log_file) as f:
+        lines = f.readlines()
+    assert len(lines) == 1 and lines[0].endswith(f'DEBUG:{logger.name}:Written by listener.\n')
+    assert len(_queue_handlers()) == 1
+
+
+def test_import_leaves_logging_unconfigured():
+    # importing any module of the package must not start the listener
+    code = 'import logging, tunefind2spotify.api, tunefind2spotify.log as log; ' \
+           'print(log._listener, logging.getLogger(log.ROOT_LOGGER_NAME).handlers)'
+    out = subprocess.run([sys.executable, '-c', code], capture_output=True, text=True, check=True).stdout
+    assert out.strip() == 'None [<NullHandler (NOTSET)>]'
+
+
+def test_stderr_looked_up_per_record(configured_logging, capsys):
+    fetch_logger(__name__).warning('To the current stderr.')
+    reset_logging()
+    assert 'WARNING: To the current stderr.' in capsys.readouterr().err
+    assert log._listener is None
+    assert [type(x) for x in logging.getLogger(ROOT_LOGGER_NAME).handlers] == [logging.NullHandler]
 
 
 def test_flatten_multiline_string():
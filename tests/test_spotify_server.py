@@ -0,0 +1,151 @@
+"""Test module for `tests.spotify_server`, running exports end-to-end."""
+
+import math
+import random
+
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+import requests
+
+from spotipy import SpotifyException
+
+from tests.spotify_server import ITEMS_LIMIT, SpotifyServer, _parse_fields, _select
+from tests.test_data.synthetic import track_uri
+
+URIS = [track_uri(i) for i in range(250)]
+
+
+def test_parse_fields():
+    assert _parse_fields('total,items(track(uri,name),added_at)') == \
+        {'total': {}, 'items': {'track': {'uri': {}, 'name': {}}, 'added_at': {}}}
+    assert _select({'total': 2, 'limit': 1, 'items': [{'track': {'uri': 'x', 'id': 'y'}, 'is_local': False}]},
+                   _parse_fields('total,items(track(uri))')) == {'total': 2, 'items': [{'track': {'uri': 'x'}}]}
+
+
+def test_export_create():
+    with SpotifyServer(playlists=120) as server:
+        result = server.connect(rate=1000).export('New', URIS, description='Test')
+        playlist = server.playlists[result.state.playlist_id]
+        assert (playlist['name'], playlist['description'], playlist['public']) == ('New', 'Test', False)
+        assert playlist['uris'] == URIS
+        assert result.state.snapshot_id == playlist['snapshot_id']
+    assert server.requests['GET /v1/me/playlists'] == math.ceil(121 / 50)
+    assert server.requests['POST /v1/playlists/{id}/items'] == math.ceil(len(URIS) / ITEMS_LIMIT)
+    assert server.requests['POST /v1/users/{id}/playlists'] == 1
+
+
+def test_export_update():
+    with SpotifyServer() as server:
+        spc = server.connect(rate=1000)
+        state = spc.export('Playlist', URIS).state
+        server.requests.clear()
+        state = spc.export('Playlist', URIS + [track_uri(1000)], state=state).state
+        assert server.requests == {'GET /v1/playlists/{id}': 1, 'POST /v1/playlists/{id}/items': 1}
+        target = URIS[10:] + [track_uri(i) for i in range(2000, 2005)]
+        random.Random(0).shuffle(target)
+        spc.invalidate_playlist_index()
+        result = spc.export('Playlist', target, sync=True)
+        assert server.playlists[result.state.playlist_id]['uris'] == target
+        assert server.requests['GET /v1/playlists/{id}/items'] == 2, 'Items beyond the first page should be paged.'
+
+
+def test_limits_and_snapshots():
+    with SpotifyServer() as server:
+        spc = server.connect(rate=1000)
+        state = spc.export('Playlist', URIS[:10]).state
+        with pytest.raises(SpotifyException) as e:
+            spc.client.playlist_add_items(state.playlist_id, URIS[:ITEMS_LIMIT + 1])
+        assert e.value.http_status == 400
+        spc.client.playlist_add_items(state.playlist_id, URIS[10:11])
+        with pytest.raises(SpotifyException) as e:
+            spc.client.playlist_reorder_items(state.playlist_id, 0, 5, snapshot_id=state.snapshot_id)
+        assert e.value.http_status == 400
+        with pytest.raises(SpotifyException) as e:
+            spc.client.playlist('0' * 22)
+        assert e.value.http_status == 404
+    assert server.responses[400] == 2 and server.responses[404] == 1
+
+
+def test_fields():
+    with SpotifyServer() as server:
+        spc = server.connect(rate=1000)
+        state = spc.export('Playlist', URIS[:50]).state
+        server.bytes = 0
+        spc.client.playlist_items(state.playlist_id, fields='items(track(uri))', limit=50)
+        filtered = server.bytes
+        spc.client.playlist_items(state.playlist_id, limit=50)
+        assert server.bytes - filtered > 10 * filtered
+
+
+def test_throttle():
+    with SpotifyServer(throttle=0.3, seed=1) as server:
+        spc = server.connect(rate=1000)
+        result = spc.export('Playlist', URIS)
+        assert server.playlists[result.state.playlist_id]['uris'] == URIS
+    assert server.responses[429]
+    assert sum(x.throttled for x in spc.client.metrics.values()) == server.responses[429]
+
+
+def test_max_rate():
+    server = SpotifyServer(max_rate=5)
+    try:
+        assert [server.admit('GET', '/v1/me') for _ in range(6)] == [False] * 5 + [True]
+        assert server.requests['GET /v1/me'] == 6
+    finally:
+        server.server_close()
+
+
+def test_export_failing_after_applied():
+    with SpotifyServer(playlists=10) as server:
+        spc = server.connect(rate=1000)
+        sp = spc.client.client
+        create, add = sp.user_playlist_create, sp.playlist_add_items
+        failures = [SpotifyException(502, -1, 'Bad gateway'), requests.ConnectionError('Connection reset'),
+                    SpotifyException(504, -1, 'Gateway timeout')]
+
+        def applied_then_failing(func):
+            def call(*args, **kwargs):
+                result = func(*args, **kwargs)
+                if failures:
+                    raise failures.pop(0)
+                return result
+            return call
+
+        # Spotify applies the requests, but their answers get lost
+        sp.user_playlist_create = applied_then_failing(create)
+        sp.playlist_add_items = applied_then_failing(add)
+        result = spc.export('Playlist', URIS)
+        assert not failures
+        assert [x['name'] for x in server.playlists.values()].count('Playlist') == 1
+        assert server.playlists[result.state.playlist_id]['uris'] == URIS
+        assert server.requests['POST /v1/users/{id}/playlists'] == 1
+        assert server.requests['POST /v1/playlists/{id}/items'] == math.ceil(len(URIS) / ITEMS_LIMIT)
+
+
+def test_export_failing_before_applied():
+    with SpotifyServer() as server:
+        spc = server.connect(rate=1000)
+        sp = spc.client.client
+        add, failures = sp.playlist_add_items, [requests.Timeout('Read timed out')]
+
+        def failing_then_adding(*args, **kwargs):
+            if failures:
+                raise failures.pop(0)
+            return add(*args, **kwargs)
+
+        sp.playlist_add_items = failing_then_adding
+        result = spc.export('Playlist', URIS)
+        assert server.playlists[result.state.playlist_id]['uris'] == URIS
+        assert server.requests['GET /v1/playlists/{id}/items'] == 1, 'The playlist should be read after the failure.'
+
+
+def test_concurrent_exports_of_same_name():
+    with SpotifyServer(playlists=60, latency=0.005) as server:
+        spc = server.connect(rate=1000)
+        # e.g. the US and the UK version of a show sharing their readable name
+        with ThreadPoolExecutor(max_workers=2) as executor:
+            results = list(executor.map(lambda x: spc.export('The Show', x), [URIS[:100], URIS[50:150]]))
+    assert [x['name'] for x in server.playlists.values()].count('The Show') == 1
+    assert results[0].state.playlist_id == results[1].state.playlist_id
+    assert set(server.playlists[results[0].state.playlist_id]['uris']) == set(URIS[:150])
@@ -0,0 +1,65 @@
+"""Test module for `tunefind2spotify.stats`."""
+
+import json
+import pytest
+
+from tunefind2spotify import stats
+
+
+@pytest.fixture
+def enabled():
+    stats.reset()
+    stats.enable()
+    yield
+    stats.enable(False)
+    stats.reset()
+
+
+def test_disabled_records_nothing():
+    stats.reset()
+    stats.count('test.counter')
+    stats.record('test.timer', 1.0)
+    with stats.timer('test.timer'):
+        pass
+    assert not stats.is_enabled()
+    assert stats.snapshot() == {'counters': {}, 'timers': {}}
+
+
+def test_counters_and_timers(enabled):
+    stats.count('db.statements')
+    stats.count('db.statements', 2)
+    for ms in range(1, 101):
+        stats.record('tunefind.json', ms / 1000)
+    with stats.timer('db.execute'):
+        pass
+    data = stats.snapshot()
+    assert data['counters'] == {'db.statements': 3}
+    timer = data['timers']['tunefind.json']
+    assert timer['count'] == 100
+    assert timer['p50_ms'] == pytest.approx(50) and timer['p95_ms'] == pytest.approx(95)
+    assert timer['max_ms'] == pytest.approx(100) and timer['total_ms'] == pytest.approx(5050)
+    assert sum(timer['histogram'].values()) == 100 and timer['histogram']['1'] == 1
+    assert data['timers']['db.execute']['count'] == 1
+
+
+def test_percentiles_estimated_from_buckets(enabled):
+    for _ in range(10000):
+        stats.record('spotify.tracks', 0.003)
+    stats.record('spotify.tracks', 7.0)
+    timer = stats.snapshot()['timers']['spotify.tracks']
+    # durations are not kept, the estimates lie within the bucket of the rank
+    assert 2 < timer['p50_ms'] <= timer['p95_ms'] <= 5
+    assert timer['histogram'] == {'5': 10000, 'inf': 1}
+    assert timer['max_ms'] == pytest.approx(7000) and timer['total_ms'] == pytest.approx(37000)
+    stats.record('spotify.slow', 9.0)
+    assert stats.snapshot()['timers']['spotify.slow']['p50_ms'] == pytest.approx(9000)
+
+
+def test_format_report(enabled):
+    stats.count('db.commits')
+    stats.record('spotify.playlist_add_items', 0.5)
+    stats.record('spotify.playlist_add_items', 7.0)
+    report = stats.format_report()
+    assert [x for x in report.splitlines() if x.startswith('[')] == ['[db]', '[spotify]']
+    assert json.loads(stats.format_report(as_json=True))['timers']['spotify.playlist_add_items']['histogram'] == \
+        {'500': 1, 'inf': 1}
@@ -0,0 +1,74 @@
+"""Test module for `tests.test_data.synthetic`."""
+
+from tunefind2spotify.core.spotify_client import TRACK_URI_PATTERN
+from tunefind2spotify.utils import MediaType
+
+from tests.core import mock_db as db
+from tests.test_data import synthetic
+from tests.test_data.synthetic import SyntheticCatalog, track_uri
+
+
+def _songs(media):
+    if media['media_type'] == MediaType.SHOW:
+        return [x for s in media['seasons'] for e in s['episodes'] for x in e['songs']]
+    return media['songs']
+
+
+def test_track_uri():
+    assert TRACK_URI_PATTERN.fullmatch(track_uri(1))
+    assert len({track_uri(i) for i in range(1000)}) == 1000
+
+
+def test_generate_deterministic():
+    assert list(SyntheticCatalog(seed=3, reuse=0.5).generate(20)) == \
+        list(SyntheticCatalog(seed=3, reuse=0.5).generate(20))
+    assert list(SyntheticCatalog(seed=3).generate(20)) != list(SyntheticCatalog(seed=4).generate(20))
+
+
+def test_generate_mix():
+    catalog = list(SyntheticCatalog(seed=1, reuse=0.3, missing=0.2).generate(300, shows=0.5, games=0.2))
+    assert len({x['media_name'] for x in catalog}) == 300
+    assert {x['media_type'] for x in catalog} == set(MediaType)
+    for media in catalog:
+        groups = [media['songs']] if media['media_type'] != MediaType.SHOW else \
+            [e['songs'] for s in media['seasons'] for e in s['episodes']]
+        for songs in groups:
+            assert len({x['id'] for x in songs}) == len(songs), 'Songs of a movie, game or episode should be unique.'
+    songs = [x for media in catalog for x in _songs(media)]
+    unique = {x['id']: x for x in songs}
+    assert 0.1 < sum(not x['spotify'] for x in unique.values()) / len(unique) < 0.3
+    assert 0.2 < 1 - len(unique) / len(songs) < 0.4
+    assert all(x == unique[x['id']] for x in songs), 'Reused songs should equal the original.'
+
+
+def test_generate_without_reuse():
+    songs = [x for media in SyntheticCatalog().generate(50) for x in _songs(media)]
+    assert len({x['id'] for x in songs}) == len(songs)
+    assert all(x['spotify'] for x in songs)
+
+
+def test_generate_bounded_pool(monkeypatch):
+    monkeypatch.setattr(synthetic, 'POOL_SIZE', 50)
+    catalog = SyntheticCatalog(seed=2, reuse=0.5)
+    songs = [x for media in catalog.generate(100) for x in _songs(media)]
+    assert len(catalog._songs) == 50
+    first = {x['id']: i for i, x in reversed(list(enumerate(songs)))}
+    assert any(first[x['id']] < 1000 for x in songs[1000:]), 'Songs of early media should still be reused.'
+
+
+def test_show_shape():
+    show = SyntheticCatalog().show('the-show', seasons=2, episodes=3, songs_per_episode=4)
+    assert [x['id'] for x in show['seasons']] == ['season/1', 'season/2']
+    assert [len(x['episodes']) for x in show['seasons']] == [3, 3]
+    assert all(len(e['songs']) == 4 for s in show['seasons'] for e in s['episodes'])
+
+
+def test_ingest_round_trip():
+    dbc = db.DBConnector()
+    catalog = list(SyntheticCatalog(seed=2, reuse=0.3, missing=0.1).generate(30))
+    for media in catalog:
+        dbc.insert_json_data(media)
+    for media in catalog:
+        data = dbc.get_json_data(media['media_name'])
+        del data['last_updated']
+        assert data == media
@@ -0,0 +1,77 @@
+"""Test module for `tunefind2spotify.trace`."""
+
+import json
+
+import pytest
+
+from tunefind2spotify import trace
+from tunefind2spotify.utils import MediaType
+
+from tests.spotify_server import SpotifyServer
+from tests.test_data.synthetic import SyntheticCatalog, track_uri
+from tests.tunefind_server import TunefindServer
+
+SHOW = SyntheticCatalog(seed=3, missing=0.2).show('the-show', seasons=1, episodes=3, songs_per_episode=4)
+
+
+@pytest.fixture
+def enabled():
+    trace.reset()
+    trace.enable()
+    yield
+    trace.enable(False)
+    trace.reset()
+
+
+def test_disabled_records_nothing(scraper):
+    trace.reset()
+    with TunefindServer([SHOW]) as server:
+        scraper.set_base_url(server.url)
+        scraper.scrape(SHOW['media_name'], MediaType.SHOW)
+    assert not trace.is_enabled()
+    assert trace.entries() == []
+
+
+def test_scrape(scraper, enabled):
+    with TunefindServer([SHOW]) as server:
+        scraper.set_base_url(server.url)
+        scraper.scrape(SHOW['media_name'], MediaType.SHOW)
+    entries = trace.entries()
+    assert len(entries) == server.requests
+    assert all(x['request']['method'] == 'GET' and x['request']['url'].startswith(server.url) for x in entries)
+    assert len([x for x in entries if x['timings']['connect'] >= 0]) == server.connections
+    redirects = [x for x in entries if x['response']['status'] == 302]
+    # forward links are requested twice, with and without following the redirect
+    assert len(redirects) == 2 * len([x for x in SHOW['seasons'][0]['episodes'] for y in x['songs'] if y['spotify']])
+    assert all(x['response']['redirectURL'].startswith('/track/') for x in redirects)
+    api = [x for x in entries if '/api/frontend/' in x['request']['url']]
+    assert all(x['response']['content']['size'] > 0 and x['response']['content']['mimeType'] == 'application/json'
+               for x in api)
+    assert all(x['time'] >= x['timings']['wait'] >= 0 for x in entries)
+    assert sum(x['_retries'] for x in entries) == 0
+
+
+def test_retries(scraper, enabled):
+    with TunefindServer([SHOW], throttle=0.2, seed=2) as server:
+        scraper.set_base_url(server.url)
+        scraper.scrape(SHOW['media_name'], MediaType.SHOW)
+    entries = trace.entries()
+    assert server.responses[429]
+    assert sum(x['_retries'] for x in entries) == server.responses[429]
+    assert len(entries) == server.requests - server.responses[429]
+
+
+def test_spotify(enabled, tmp_path):
+    with SpotifyServer(playlists=60) as server:
+        server.connect(rate=1000).export('Playlist', [track_uri(i) for i in range(150)])
+    entries = trace.entries()
+    assert len(entries) == sum(server.requests.values())
+    assert sum(x['response']['bodySize'] for x in entries) == server.bytes
+    adds = [x for x in entries if x['request']['method'] == 'POST' and x['request']['url'].endswith('/items')]
+    assert len(adds) == 2 and all(x['request']['bodySize'] > 0 for x in adds)
+    assert {'name': 'limit', 'value': '50'} in entries[0]['request']['queryString']
+    path = tmp_path / 'trace.har'
+    trace.write(str(path))
+    har = json.loads(path.read_text())
+    assert har['log']['version'] == '1.2' and len(har['log']['entries']) == len(entries)
+    assert 'fake-token' not in path.read_text()
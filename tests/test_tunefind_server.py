@@ -0,0 +1,87 @@
+"""Test module for `tests.tunefind_server`, running the scraper end-to-end."""
+
+import time
+
+import pytest
+import requests
+
+from tunefind2spotify import stats
+from tunefind2spotify.utils import MediaType
+
+from tests.test_data.synthetic import SyntheticCatalog
+from tests.tunefind_server import TunefindServer
+
+CATALOG = SyntheticCatalog(seed=5, reuse=0.2, missing=0.2)
+SHOW = CATALOG.show('the-show', seasons=2, episodes=3, songs_per_episode=4)
+MOVIE = CATALOG.movie('the-movie', songs=6)
+GAME = CATALOG.game('the-game', songs=6)
+
+
+def test_scrape(scraper):
+    with TunefindServer([SHOW, MOVIE, GAME]) as server:
+        scraper.set_base_url(server.url)
+        for media in [SHOW, MOVIE, GAME]:
+            assert scraper.name_and_type_check(media['readable_name'], None) == \
+                (media['media_name'], media['media_type'])
+            assert scraper.scrape(media['media_name'], media['media_type']) == media
+    assert set(server.responses) == {200, 302, 404}
+    assert server.connections < server.requests / 10, 'Connections should be kept alive.'
+
+
+def test_unknown_media(scraper):
+    with TunefindServer([SHOW]) as server:
+        scraper.set_base_url(server.url)
+        with pytest.raises(scraper.MediaNotFound):
+            scraper.name_and_type_check('unknown', None)
+    assert server.responses == {404: len(MediaType)}
+
+
+def test_latency(scraper):
+    with TunefindServer([MOVIE], latency=0.05, jitter=0.05) as server:
+        scraper.set_base_url(server.url)
+        start = time.perf_counter()
+        assert scraper._resource_exists(MOVIE['media_name'], MediaType.MOVIE)
+        assert 0.05 <= time.perf_counter() - start
+
+
+def test_retry_faults(scraper):
+    stats.reset()
+    stats.enable()
+    try:
+        with TunefindServer([SHOW], throttle=0.15, errors=0.15, seed=1) as server:
+            scraper.set_base_url(server.url)
+            assert scraper.scrape(SHOW['media_name'], MediaType.SHOW) == SHOW
+    finally:
+        stats.enable(False)
+    assert server.responses[429] and sum(server.responses[x] for x in [500, 502, 503])
+    assert stats.snapshot()['counters']['tunefind.retries'] == \
+        server.responses[429] + sum(server.responses[x] for x in [500, 502, 503])
+    stats.reset()
+
+
+def test_persistent_errors(scraper):
+    with TunefindServer([SHOW], errors=1.0) as server:
+        scraper.set_base_url(server.url)
+        with pytest.raises(requests.HTTPError):
+            scraper.scrape(SHOW['media_name'], MediaType.SHOW)
+    assert server.requests == scraper.RETRIES + 1
+
+
+def test_retry_after_capped(scraper, monkeypatch):
+    monkeypatch.setattr(scraper, 'MAX_RETRY_AFTER', 0.05)
+    with TunefindServer([SHOW], throttle=1.0, retry_after=3600) as server:
+        scraper.set_base_url(server.url)
+        start = time.perf_counter()
+        with pytest.raises(requests.HTTPError):
+            scraper.scrape(SHOW['media_name'], MediaType.SHOW)
+        assert time.perf_counter() - start < 5, 'Retries should not wait as long as Retry-After asks.'
+    assert server.responses == {429: scraper.RETRIES + 1}
+
+
+def test_empty_body(scraper):
+    with TunefindServer([SHOW], empty=1.0) as server:
+        scraper.set_base_url(server.url)
+        assert scraper._resource_exists(SHOW['media_name'], MediaType.SHOW)
+        with pytest.raises(scraper.EmptyJSONResponse):
+            scraper.scrape(SHOW['media_name'], MediaType.SHOW)
+    assert server.empty_responses == 2
@@ -2,7 +2,7 @@
 
 from copy import deepcopy
 
-from tunefind2spotify.utils import singleton, MediaType, dict_keep
+from tunefind2spotify.utils import singleton, MediaType, dict_keep, open_text
 
 
 class TestSingleton:
@@ -87,3 +87,21 @@ class TestDictKeep:
         res = dict_keep(self.d, ['a', 'b', 'c', 'd', 'e'])
         assert self.d == _copy, 'Original dict must remain unaffected.'
         assert res == self.d, 'Dict content should not have changed.'
+
+
+class TestOpenText:
+
+    def test_roundtrip(self, tmp_path):
+        for name in ['plain.txt', 'compressed.txt.gz']:
+            path = str(tmp_path / name)
+            with open_text(path, 'w') as f:
+                f.write('line 1\nline 2\n')
+            with open_text(path, 'r') as f:
+                assert f.readlines() == ['line 1\n', 'line 2\n']
+
+    def test_compressed(self, tmp_path):
+        path = str(tmp_path / 'compressed.txt.gz')
+        with open_text(path, 'w') as f:
+            f.write('x')
+        with open(path, 'rb') as f:
+            assert f.read(2) == b'\x1f\x8b', 'Files ending with `.gz` should be gzip compressed.'
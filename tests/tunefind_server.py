@@ -0,0 +1,218 @@
+"""Local stand-in for Tunefind's frontend API.
+
+Serves media in the shape of scraped data (see `tests.test_data.synthetic`)
+through the endpoints requested by `tunefind2spotify.core.tunefind_scraper`, so
+that the scraper can be run end-to-end without network access:
+
+```
+with TunefindServer([show, movie], latency=0.01) as server:
+    tunefind_scraper.set_base_url(server.url)
+    tunefind_scraper.scrape(show['media_name'], MediaType.SHOW)
+```
+
+Links to Spotify are served as forward links `/forward/spotify/<song id>`,
+redirecting (302) to `/track/<track id>` on the same server, from which the
+scraper recovers the original track URI.
+
+Connections are kept alive (HTTP/1.1). Answers can be delayed (`latency` plus
+up to `jitter` seconds) and replaced at random, with given probabilities, by
+throttling (HTTP 429 with `Retry-After`), server errors (HTTP 500, 502 or 503)
+or, for API requests, empty JSON objects. Faults are drawn from a seeded random
+generator, and every request, connection and fault is counted, so that the
+behavior of the scraper under these conditions can be asserted.
+"""
+
+import collections
+import json
+import random
+import threading
+import time
+
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import List, Optional, Tuple
+from urllib.parse import urlsplit
+
+from tunefind2spotify.utils import MediaType
+
+
+def _song_event(song: dict) -> dict:
+    """Converts a scraped song back into a song event as returned by Tunefind."""
+    return {'song': {'id': song['id'],
+                     'name': song['name'],
+                     'spotify': f'/forward/spotify/{song["id"]}' if song['spotify'] else None,
+                     'artists': [{'name': x} for x in song['artists'].split(', ')]}}
+
+
+class _Handler(BaseHTTPRequestHandler):
+
+    server: 'TunefindServer'
+    protocol_version = 'HTTP/1.1'
+    # headers and body are written separately, avoid delayed ACKs on keep-alive connections
+    disable_nagle_algorithm = True
+
+    def log_message(self, *args) -> None:
+        pass
+
+    def setup(self) -> None:
+        super().setup()
+        with self.server.lock:
+            self.server.connections += 1
+
+    def send_response(self, code: int, message: Optional[str] = None) -> None:
+        with self.server.lock:
+            self.server.responses[code] += 1
+        super().send_response(code, message)
+
+    def do_GET(self) -> None:
+        path = urlsplit(self.path).path.strip('/').split('/')
+        delay, fault = self.server.draw()
+        if delay:
+            time.sleep(delay)
+        if fault == 429:
+            self.send_response(429)
+            self.send_header('Retry-After', str(self.server.retry_after))
+            self.send_header('Content-Length', '0')
+            self.end_headers()
+        elif fault:
+            self._send_json({'error': 'Server error'}, status=fault)
+        elif path[:2] == ['forward', 'spotify'] and path[2:3] and path[2] in self.server.forward_links:
+            self.send_response(302)
+            self.send_header('Location', f'/track/{self.server.forward_links[path[2]]}')
+            self.send_header('Content-Length', '0')
+            self.end_headers()
+        elif path[:1] == ['track'] and len(path) == 2:
+            self._send_json({})
+        elif path[:2] == ['api', 'frontend'] and (body := self.server.resolve(path[2:])) is not None:
+            self._send_json({} if self.server.draw_empty() else body)
+        else:
+            self._send_json({}, status=404)
+
+    def _send_json(self, body: dict, status: Optional[int] = 200) -> None:
+        data = json.dumps(body).encode()
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+
+class TunefindServer(ThreadingHTTPServer):
+    """HTTP server answering on a free local port in a background thread.
+
+    Note:
+        Knobs may be changed while the server is running, e.g. to let faults
+        cease.
+
+    Attributes:
+        url (str): Root of the server, to be passed to
+            `tunefind_scraper.set_base_url`.
+        latency (float): Delay in seconds before answering any request.
+        jitter (float): Upper bound of a random delay in seconds added to the
+            latency.
+        throttle (float): Probability of answering with HTTP 429.
+        errors (float): Probability of answering with HTTP 5xx.
+        empty (float): Probability of answering API requests with `{}`.
+        retry_after (int): Value of header `Retry-After` of HTTP 429 in
+            seconds.
+        requests (int): Number of requests received.
+        connections (int): Number of connections accepted.
+        responses (collections.Counter): Number of responses by status code.
+        empty_responses (int): Number of API requests answered with `{}`.
+    """
+
+    daemon_threads = True
+
+    def __init__(self,
+                 media: List[dict],
+                 latency: Optional[float] = 0.0,
+                 jitter: Optional[float] = 0.0,
+                 throttle: Optional[float] = 0.0,
+                 errors: Optional[float] = 0.0,
+                 empty: Optional[float] = 0.0,
+                 retry_after: Optional[int] = 0,
+                 seed: Optional[int] = 0) -> None:
+        """Prepares serving given media.
+
+        Args:
+            media: Media in the shape consumed by `insert_json_data`.
+            latency: Delay in seconds before answering any request. Optional,
+                defaults to 0.
+            jitter: Upper bound of random delay added. Optional, defaults to 0.
+            throttle: Probability of HTTP 429. Optional, defaults to 0.
+            errors: Probability of HTTP 5xx. Optional, defaults to 0.
+            empty: Probability of empty JSON objects. Optional, defaults to 0.
+            retry_after: Seconds to wait when throttled. Optional, defaults to
+                0.
+            seed: Seed of the random generator of delays and faults. Optional,
+                defaults to 0.
+        """
+        super().__init__(('127.0.0.1', 0), _Handler)
+        self.url = f'http://127.0.0.1:{self.server_address[1]}'
+        self.latency = latency
+        self.jitter = jitter
+        self.throttle = throttle
+        self.errors = errors
+        self.empty = empty
+        self.retry_after = retry_after
+        self.requests = 0
+        self.connections = 0
+        self.responses = collections.Counter()
+        self.empty_responses = 0
+        self.lock = threading.Lock()
+        self._rng = random.Random(seed)
+        self.media = {(x['media_type'], x['media_name']): x for x in media}
+        self.episodes = {str(e['id']): e for x in media if x['media_type'] == MediaType.SHOW
+                         for s in x['seasons'] for e in s['episodes']}
+        songs = [y for x in media for y in (x['songs'] if 'songs' in x else
+                                            [z for s in x['seasons'] for e in s['episodes'] for z in e['songs']])]
+        self.forward_links = {str(x['id']): x['spotify'].split(':')[-1] for x in songs if x['spotify']}
+        self._thread = None
+
+    def draw(self) -> Tuple[float, Optional[int]]:
+        """Counts a request and draws its delay and fault (status code or `None`)."""
+        with self.lock:
+            self.requests += 1
+            delay = self.latency + (self._rng.uniform(0, self.jitter) if self.jitter else 0.0)
+            x = self._rng.random()
+            if x < self.throttle:
+                return delay, 429
+            if x < self.throttle + self.errors:
+                return delay, self._rng.choice([500, 502, 503])
+            return delay, None
+
+    def draw_empty(self) -> bool:
+        """Draws whether to answer an API request with an empty JSON object."""
+        with self.lock:
+            if self.empty and self._rng.random() < self.empty:
+                self.empty_responses += 1
+                return True
+            return False
+
+    def resolve(self, path: List[str]) -> Optional[dict]:
+        """Returns the body for an API path, `None` if there is nothing at it."""
+        if path[:1] == ['episode'] and len(path) == 2 and path[1] in self.episodes:
+            return {'episode': {'song_events': [_song_event(x) for x in self.episodes[path[1]]['songs']]}}
+        media_type = MediaType.read_in(path[0]) if path else None
+        if media_type is None or len(path) < 2 or (media_type, path[1]) not in self.media:
+            return None
+        media = self.media[(media_type, path[1])]
+        if media_type != MediaType.SHOW:
+            return {path[0]: {'name': media['readable_name']},
+                    'song_events': [_song_event(x) for x in media['songs']]}
+        if len(path) == 2:
+            return {'show': {'name': media['readable_name']},
+                    'seasons': [{'id': x['id'], 'name': x['name']} for x in media['seasons']]}
+        if len(path) == 4 and path[2] == 'season' and path[3].isdigit() and 0 < int(path[3]) <= len(media['seasons']):
+            return {'episodes': [{'id': x['id'], 'name': x['name']}
+                                 for x in media['seasons'][int(path[3]) - 1]['episodes']]}
+        return None
+
+    def __enter__(self) -> 'TunefindServer':
+        self._thread = threading.Thread(target=self.serve_forever, kwargs={'poll_interval': 0.05}, daemon=True)
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.shutdown()
+        self.server_close()
+        self._thread.join()
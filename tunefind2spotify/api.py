@@ -1,18 +1,83 @@
-"""Module that defines top-level API for end-user."""
+"""Module that defines top-level API for end-user.
 
-from typing import Optional
+Attributes:
+    DUMP_FORMAT (str): Identifier in the header line of files written by
+        `dump`.
+    DUMP_VERSION (int): Version of the dump file format.
+    DEFAULT_TTL (Dict[MediaType, int]): Time in seconds per media type for
+        which scraped data is considered fresh by `fetch`.
+    AVAILABILITY_TTL (int): Time in seconds for which a cached check of a
+        track's availability on Spotify is reused.
+"""
 
-from tunefind2spotify.core import tunefind_scraper, db
+import json
+import time
+
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from dataclasses import dataclass
+from datetime import datetime
+from typing import Dict, List, Optional, Tuple, Union
+
+from tunefind2spotify import stats
+from tunefind2spotify.core import tunefind_scraper, db, matcher
+from tunefind2spotify.exceptions import log_and_raise
 from tunefind2spotify.log import fetch_logger
-from tunefind2spotify.core.spotify_client import SpotifyClient, SpotifyCredentials
-from tunefind2spotify.utils import MediaType
+from tunefind2spotify.core.spotify_client import ExportResult, SpotifyClient, SpotifyCredentials
+from tunefind2spotify.core.storage import Storage
+from tunefind2spotify.utils import MediaType, open_text
 
 
 logger = fetch_logger(__name__)
 
+DUMP_FORMAT = 'tunefind2spotify-dump'
+DUMP_VERSION = 1
+DEFAULT_TTL = {MediaType.SHOW: 24 * 60 * 60,
+               MediaType.MOVIE: 30 * 24 * 60 * 60,
+               MediaType.GAME: 30 * 24 * 60 * 60}
+AVAILABILITY_TTL = 7 * 24 * 60 * 60
+
+
+def _get_storage(storage: Optional[Storage] = None) -> Storage:
+    """Returns given storage or the database connector by default."""
+    return db.DBConnector() if storage is None else storage
+
+
+def _is_fresh(dbc: Storage,
+              media_name: str,
+              media_type: Optional[MediaType] = None,
+              ttl: Optional[Dict[MediaType, int]] = None) -> bool:
+    """Checks whether the stored data of given media is younger than its TTL.
+
+    Args:
+        dbc: Storage holding the data.
+        media_name: Normalized name of the media.
+        media_type: Type of media requested. Optional, defaults to `None` in
+            which case any stored type is accepted.
+        ttl: Time to live in seconds per media type overriding `DEFAULT_TTL`.
+            Optional, defaults to `None`.
+
+    Returns:
+        Whether the media exists in storage (with requested type) and was
+        scraped less than its TTL ago.
+    """
+    if not dbc.media_exists(media_name):
+        return False
+    stored_type = dbc.get_media_type(media_name)
+    if isinstance(media_type, MediaType) and media_type != stored_type:
+        return False
+    max_age = {**DEFAULT_TTL, **(ttl or {})}[stored_type]
+    age = int(datetime.now().timestamp()) - dbc.get_last_updated(media_name)
+    logger.debug(f'Stored data of \'{media_name}\' is {age}s old (TTL {max_age}s).')
+    return age < max_age
+
 
 def fetch(media_name: str,
           media_type: Optional[MediaType] = None,
+          ttl: Optional[Dict[MediaType, int]] = None,
+          force: Optional[bool] = False,
+          storage: Optional[Storage] = None,
+          record: Optional[str] = None,
+          replay: Optional[str] = None,
           **kwargs) -> None:
     """Scrapes song info for `media_name` from Tunefind and stores in database.
 
@@ -24,46 +89,470 @@ def fetch(media_name: str,
         then the corresponding media name is `'assassins-creed-valhalla-2020'`
         and the media type `MediaType.GAME` respectively.
 
+        Media whose stored data is still fresh according to `ttl` are skipped
+        without any request to Tunefind, unless `force` is set.
+
     Args:
         media_name: Name of the media as specified by Tunefind.
         media_type: Type of media as in the categories found on Tunefind. Must
             be one of `MediaType` enum values. Optional, defaults to `None` in
             which case the correct media type will be inferred from probing Tunefind.
+        ttl: Time in seconds per media type for which stored data is considered
+            fresh. Optional, defaults to `None` in which case `DEFAULT_TTL`
+            applies. Media types not given fall back to `DEFAULT_TTL`.
+        force: Scrape even if the stored data is fresh. Optional, defaults to
+            False.
+        storage: Storage in which to store the data. Optional, defaults to
+            `None` in which case the database is used.
+        record: Directory to store every response from Tunefind in. Optional,
+            defaults to `None` in which case nothing is stored.
+        replay: Directory of responses stored by an earlier fetch with
+            `record`, to scrape from instead of Tunefind. Optional, defaults to
+            `None` in which case Tunefind is requested.
     """
-    media_name, media_type = tunefind_scraper.name_and_type_check(media_name, media_type)
-    json_data = tunefind_scraper.scrape(media_name=media_name, media_type=media_type)
-    dbc = db.DBConnector()
-    dbc.insert_json_data(json_data)
+    dbc = _get_storage(storage)
+    if not force and _is_fresh(dbc, tunefind_scraper.name_normalization(media_name), media_type, ttl):
+        logger.info(f'Stored data of \'{media_name}\' is fresh. Skipping fetch.')
+        return
+    if record is not None:
+        tunefind_scraper.record(record)
+    if replay is not None:
+        tunefind_scraper.replay(replay)
+    try:
+        with stats.timer('fetch.check'):
+            media_name, media_type = tunefind_scraper.name_and_type_check(media_name, media_type)
+        with stats.timer('fetch.scrape'):
+            json_data = tunefind_scraper.scrape(media_name=media_name, media_type=media_type)
+    finally:
+        if record is not None or replay is not None:
+            tunefind_scraper.reset_session()
+    with stats.timer('fetch.store'):
+        run_id = dbc.insert_json_data(json_data)
+    changes = dbc.get_run_changes(run_id)
+    logger.info(f'Stored \'{media_name}\' (run {run_id}): {changes["episode"]} new episodes, '
+                f'{changes["song"]} new songs, {changes["match"]} new episode matches.')
+
+
+@dataclass
+class ExportReport:
+    """Dataclass to hold the outcome of exporting a media.
+
+    Args:
+        media_name: Name of the media.
+        playlist_id: ID of the playlist exported to, `None` if the export
+            failed.
+        added: Number of tracks added to the playlist.
+        removed: Number of tracks removed from the playlist.
+        seconds: Duration of the export in seconds.
+        error: Message of the error the export failed with, `None` on success.
+        playlist_name: Name of the playlist exported to.
+    """
+
+    media_name: str
+    playlist_id: Optional[str] = None
+    added: int = 0
+    removed: int = 0
+    seconds: float = 0.0
+    error: Optional[str] = None
+    playlist_name: Optional[str] = None
+
+
+def _media_exists(dbc: Storage, media_name: str) -> bool:
+    """Checks whether given media exists in storage, warning if it does not."""
+    if not dbc.media_exists(media_name):
+        logger.warning(f'Media \'{media_name}\' does not exist in database. Please fetch first.')
+        return False
+    return True
+
+
+def _is_unchanged(dbc: Storage,
+                  media_name: str,
+                  last_exported_run: Optional[int],
+                  playlist_name: Optional[str] = None,
+                  episodes: Optional[List[Tuple[int, int]]] = None) -> bool:
+    """Checks whether given media (or given episodes of it) has no changes
+    since the run last exported (to given playlist)."""
+    if last_exported_run is not None and not dbc.has_changes(media_name, last_exported_run, episodes):
+        target = f' to \'{playlist_name}\'' if playlist_name else ''
+        logger.info(f'No changes for \'{media_name}\' since last export{target}. Skipping.')
+        return True
+    return False
+
+
+def _export_kwargs(dbc: Storage,
+                   playlist_name: str,
+                   track_uris: List[str],
+                   description: str,
+                   sync: bool) -> dict:
+    """Returns keyword arguments for `SpotifyClient.export`, including the
+    mirrored state of the playlist."""
+    return dict(playlist_name=playlist_name,
+                track_uris=track_uris,
+                description=description,
+                sync=sync,
+                state=dbc.get_playlist_state(playlist_name))
+
+
+def _prepare_export(dbc: Storage,
+                    media_name: str,
+                    skip_unchanged: bool,
+                    delta: bool,
+                    sync: bool) -> Optional[dict]:
+    """Reads everything needed to export given media from storage.
+
+    Args:
+        dbc: Storage holding the data.
+        media_name: Normalized name of the media.
+        skip_unchanged: See `export`.
+        delta: See `export`.
+        sync: See `export`.
+
+    Returns:
+        Keyword arguments for `SpotifyClient.export` or `None` if the media is
+        not to be exported.
+    """
+    if not _media_exists(dbc, media_name):
+        return None
+    last_exported_run = dbc.get_last_exported_run(media_name)
+    if skip_unchanged and _is_unchanged(dbc, media_name, last_exported_run):
+        return None
+    media_type = dbc.get_media_type(media_name)
+    if delta and last_exported_run is not None:
+        uris = dbc.get_new_track_uris(media_name, since_run=last_exported_run)
+        logger.info(f'Exporting {len(uris)} songs added to \'{media_name}\' since last export.')
+    elif media_type is MediaType.SHOW:
+        uris = dbc.get_track_uris_show(media_name=media_name)
+    else:
+        uris = dbc.get_track_uris_media(media_name=media_name)
+    return _export_kwargs(dbc, dbc.get_readable_name(media_name), uris, dbc.get_playlist_description(media_name), sync)
+
+
+def _filter_available(dbc: Storage,
+                      spc: SpotifyClient,
+                      playlists: Dict[str, dict],
+                      market: Optional[str] = None) -> None:
+    """Removes tracks unavailable on Spotify from the playlists to export.
+
+    Note:
+        Availability is read from the cache in storage where possible, which
+        holds checks per market. The remaining tracks of all playlists are
+        checked together, so that batches are filled across media, and the
+        results are cached.
+
+    Args:
+        dbc: Storage holding the cache.
+        spc: Client to check availability with.
+        playlists: Keyword arguments for `SpotifyClient.export` by key, the
+            track URIs of which are filtered in place.
+        market: See `SpotifyClient.check_availability`.
+    """
+    uris = list(dict.fromkeys(uri for x in playlists.values() for uri in x['track_uris']))
+    availability = dbc.get_track_availability(uris, market=market, max_age=AVAILABILITY_TTL)
+    unknown = [x for x in uris if x not in availability]
+    if unknown:
+        checked = spc.check_availability(unknown, market=market)
+        dbc.set_track_availability(checked, market=market)
+        availability.update(checked)
+    unavailable = {x for x in uris if not availability[x]}
+    logger.info(f'Checked availability of {len(uris)} tracks ({len(unknown)} not cached): '
+                f'{len(unavailable)} unavailable.')
+    for playlist in playlists.values():
+        playlist['track_uris'] = [x for x in playlist['track_uris'] if x not in unavailable]
+
+
+def _timed_export(spc: SpotifyClient, **kwargs) -> Tuple[ExportResult, float]:
+    """Calls `SpotifyClient.export` and measures its duration in seconds."""
+    start = time.perf_counter()
+    result = spc.export(**kwargs)
+    seconds = time.perf_counter() - start
+    stats.record('export.playlist', seconds)
+    return result, seconds
+
+
+def _finish_export(dbc: Storage,
+                   media_name: str,
+                   outcome: Union[Tuple[ExportResult, float], Exception],
+                   season_playlist: Optional[str] = None) -> ExportReport:
+    """Records the export of given media in storage.
+
+    Args:
+        dbc: Storage holding the data.
+        media_name: Normalized name of the media.
+        outcome: Result and duration of the export or the exception it failed
+            with, in which case nothing is recorded.
+        season_playlist: Name of the playlist exported to, if not the playlist
+            of the whole media. Optional, defaults to `None`.
+
+    Returns:
+        Report of the export.
+    """
+    if isinstance(outcome, Exception):
+        return ExportReport(media_name=media_name, error=repr(outcome), playlist_name=season_playlist)
+    result, seconds = outcome
+    dbc.set_playlist_state(result.state)
+    dbc.record_export(media_name, season_playlist)
+    return ExportReport(media_name=media_name,
+                        playlist_id=result.state.playlist_id,
+                        added=result.added,
+                        removed=result.removed,
+                        seconds=seconds,
+                        playlist_name=result.state.name)
+
+
+def _run_exports(spc: SpotifyClient,
+                 playlists: Dict[str, dict],
+                 workers: int) -> Dict[str, Union[Tuple[ExportResult, float], Exception]]:
+    """Runs exports concurrently in a pool of worker threads.
+
+    Args:
+        spc: Client shared by all exports.
+        playlists: Keyword arguments for `SpotifyClient.export` by key.
+        workers: Maximal number of concurrent exports.
+
+    Returns:
+        Result and duration of each export by key, or the exception it failed
+        with.
+    """
+    outcomes = {}
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        futures = {executor.submit(_timed_export, spc, **playlist): key for key, playlist in playlists.items()}
+        for future in as_completed(futures):
+            key = futures[future]
+            try:
+                outcomes[key] = future.result()
+            except Exception as e:
+                logger.error(f'Export of \'{key}\' failed: {e!r}')
+                outcomes[key] = e
+    return outcomes
 
 
 def export(media_name: str,
            credentials: SpotifyCredentials,
-           **kwargs) -> None:
+           skip_unchanged: Optional[bool] = False,
+           delta: Optional[bool] = False,
+           sync: Optional[bool] = False,
+           validate: Optional[bool] = False,
+           market: Optional[str] = None,
+           storage: Optional[Storage] = None,
+           **kwargs) -> Optional[ExportReport]:
     """Create playlist for `media_name` from information available in database.
 
+    Note:
+        The state of the playlist after the export is mirrored in the storage,
+        sparing to read the playlist on the next export if it was not modified
+        in the meantime.
+
     Args:
         media_name: Name of the media as specified by Tunefind.
         credentials: Spotify API credentials dataclass.
+        skip_unchanged: Do not export if no fetch added songs since the last
+            export. Optional, defaults to False.
+        delta: Only export the songs that fetches added since the last
+            export. Optional, defaults to False.
+        sync: Make an existing playlist equal to the songs in the database
+            including their order, removing all other tracks. Optional,
+            defaults to False.
+        validate: Drop tracks that are unavailable on Spotify before the
+            export. Optional, defaults to False.
+        market: ISO 3166-1 alpha-2 country code that tracks must be playable
+            in for `validate`. Optional, defaults to `None` in which case
+            tracks only need to exist.
+        storage: Storage from which to read the data. Optional, defaults to
+            `None` in which case the database is used.
+
+    Returns:
+        Report of the export or `None` if the media was not exported.
+
+    Raises:
+        ValueError: In case both `delta` and `sync` are set.
     """
+    if delta and sync:
+        log_and_raise(logger, ValueError, 'Options `delta` and `sync` are mutually exclusive.')
     media_name = tunefind_scraper.name_normalization(media_name)
-    dbc = db.DBConnector()
-    if dbc.media_exists(media_name):
-        media_type = dbc.get_media_type(media_name)
-        if media_type is MediaType.SHOW:
-            uris = dbc.get_track_uris_show(media_name=media_name)
+    dbc = _get_storage(storage)
+    playlist = _prepare_export(dbc, media_name, skip_unchanged, delta, sync)
+    if playlist is None:
+        return None
+    spc = SpotifyClient(credentials)
+    if validate:
+        _filter_available(dbc, spc, {media_name: playlist}, market=market)
+    return _finish_export(dbc, media_name, _timed_export(spc, **playlist))
+
+
+def export_many(media_names: Optional[List[str]],
+                credentials: SpotifyCredentials,
+                workers: Optional[int] = 4,
+                skip_unchanged: Optional[bool] = False,
+                delta: Optional[bool] = False,
+                sync: Optional[bool] = False,
+                validate: Optional[bool] = False,
+                market: Optional[str] = None,
+                storage: Optional[Storage] = None,
+                **kwargs) -> List[ExportReport]:
+    """Creates playlists for multiple media concurrently.
+
+    Note:
+        The storage is only accessed from the calling thread. The exports to
+        Spotify run in a pool of worker threads sharing one client and thereby
+        one rate limit budget. An export failing does not affect the others.
+
+    Args:
+        media_names: Names of the media. Optional, `None` or an empty list
+            exports all media in storage.
+        credentials: Spotify API credentials dataclass.
+        workers: Maximal number of concurrent exports. Optional, defaults to 4.
+        skip_unchanged: See `export`.
+        delta: See `export`.
+        sync: See `export`.
+        validate: See `export`.
+        market: See `export`.
+        storage: Storage from which to read the data. Optional, defaults to
+            `None` in which case the database is used.
+
+    Returns:
+        Reports of the media exported (or failed to), in order of
+        `media_names`.
+
+    Raises:
+        ValueError: In case both `delta` and `sync` are set.
+    """
+    if delta and sync:
+        log_and_raise(logger, ValueError, 'Options `delta` and `sync` are mutually exclusive.')
+    dbc = _get_storage(storage)
+    media_names = list(dict.fromkeys(tunefind_scraper.name_normalization(x)
+                                     for x in media_names or dbc.get_media_names()))
+    playlists = {}
+    for media_name in media_names:
+        if (playlist := _prepare_export(dbc, media_name, skip_unchanged, delta, sync)) is not None:
+            playlists[media_name] = playlist
+    spc = SpotifyClient(credentials)
+    if validate:
+        _filter_available(dbc, spc, playlists, market=market)
+    reports = {}
+    for media_name, outcome in _run_exports(spc, playlists, workers).items():
+        reports[media_name] = x = _finish_export(dbc, media_name, outcome)
+        if x.error is None:
+            logger.info(f'Exported \'{media_name}\' in {x.seconds:.1f}s: {x.added} tracks added, '
+                        f'{x.removed} removed.')
+    failed = sum(x.error is not None for x in reports.values())
+    logger.info(f'Exported {len(reports) - failed} of {len(media_names)} media, {failed} failed.')
+    return [reports[x] for x in media_names if x in reports]
+
+
+def _season_playlists(readable_name: str,
+                      episodes: Dict[Tuple[int, int], List[str]],
+                      episodes_per_playlist: Optional[int] = None) -> Dict[str, Dict[Tuple[int, int], List[str]]]:
+    """Groups a show's episodes into playlists per season or episode range.
+
+    Note:
+        Episode ranges are fixed intervals of episode numbers, so that the name
+        of a playlist does not change when episodes are added.
+
+    Args:
+        readable_name: Readable name of the show.
+        episodes: Song URIs by season and episode number.
+        episodes_per_playlist: Number of episodes per playlist within a season.
+            Optional, defaults to `None` in which case there is one playlist
+            per season.
+
+    Returns:
+        Song URIs by season and episode number by playlist name.
+    """
+    playlists = {}
+    for (season, episode), uris in episodes.items():
+        if episodes_per_playlist:
+            first = (episode - 1) // episodes_per_playlist * episodes_per_playlist + 1
+            name = f'{readable_name} - S{season:02d}E{first:02d}-E{first + episodes_per_playlist - 1:02d}'
         else:
-            uris = dbc.get_track_uris_media(media_name=media_name)
-        spc = SpotifyClient(credentials)
-        spc.export(playlist_name=dbc.get_readable_name(media_name),
-                   track_uris=uris,
-                   description=dbc.get_playlist_description(media_name))
-    else:
-        logger.warning(f'Media \'{media_name}\' does not exist in database. Please fetch first.')
+            name = f'{readable_name} - S{season:02d}'
+        playlists.setdefault(name, {})[season, episode] = uris
+    return playlists
+
+
+def export_seasons(media_name: str,
+                   credentials: SpotifyCredentials,
+                   episodes_per_playlist: Optional[int] = None,
+                   workers: Optional[int] = 4,
+                   skip_unchanged: Optional[bool] = False,
+                   sync: Optional[bool] = False,
+                   validate: Optional[bool] = False,
+                   market: Optional[str] = None,
+                   storage: Optional[Storage] = None,
+                   **kwargs) -> List[ExportReport]:
+    """Creates one playlist per season (or range of episodes) of a show.
+
+    Note:
+        Playlists are named after the show's readable name with suffix
+        `- S01` per season or `- S01E01-E10` per range of episodes. The URIs of
+        all seasons are read with a single query and the playlists are
+        exported concurrently, see `export_many`. Exports are recorded per
+        playlist, apart from those of the whole show by `export`, and
+        `skip_unchanged` only considers changes of the playlist's episodes.
+
+    Args:
+        media_name: Name of the show as specified by Tunefind.
+        credentials: Spotify API credentials dataclass.
+        episodes_per_playlist: Number of episodes per playlist within a season.
+            Optional, defaults to `None` in which case there is one playlist
+            per season. Must be positive.
+        workers: Maximal number of concurrent exports. Optional, defaults to 4.
+        skip_unchanged: See `export`.
+        sync: See `export`.
+        validate: See `export`.
+        market: See `export`.
+        storage: Storage from which to read the data. Optional, defaults to
+            `None` in which case the database is used.
+
+    Returns:
+        Reports of the playlists exported (or failed to), ordered by season
+        and episode.
+
+    Raises:
+        ValueError: If `episodes_per_playlist` is not positive.
+    """
+    if episodes_per_playlist is not None and episodes_per_playlist <= 0:
+        log_and_raise(logger, ValueError, f'Number of episodes per playlist must be positive, '
+                                          f'got {episodes_per_playlist}.')
+    media_name = tunefind_scraper.name_normalization(media_name)
+    dbc = _get_storage(storage)
+    if not _media_exists(dbc, media_name):
+        return []
+    if dbc.get_media_type(media_name) is not MediaType.SHOW:
+        logger.warning(f'Media \'{media_name}\' is not a show. Please use export instead.')
+        return []
+    description = dbc.get_playlist_description(media_name)
+    playlists = {}
+    for name, episodes in _season_playlists(dbc.get_readable_name(media_name),
+                                            dbc.get_track_uris_by_episode(media_name),
+                                            episodes_per_playlist).items():
+        last_exported_run = dbc.get_last_exported_run(media_name, name)
+        if not (skip_unchanged and _is_unchanged(dbc, media_name, last_exported_run, name, list(episodes))):
+            uris = [uri for x in episodes.values() for uri in x]
+            playlists[name] = _export_kwargs(dbc, name, uris, description, sync)
+    if not playlists:
+        return []
+    spc = SpotifyClient(credentials)
+    if validate:
+        _filter_available(dbc, spc, playlists, market=market)
+    reports = [_finish_export(dbc, media_name, outcome, season_playlist=name)
+               for name, outcome in sorted(_run_exports(spc, playlists, workers).items())]
+    failed = sum(x.error is not None for x in reports)
+    logger.info(f'Exported {len(reports) - failed} of {len(playlists)} playlists of \'{media_name}\', '
+                f'{failed} failed.')
+    return reports
 
 
 def pull(media_name: str,
          credentials: SpotifyCredentials,
          media_type: Optional[MediaType] = None,
+         skip_unchanged: Optional[bool] = False,
+         delta: Optional[bool] = False,
+         sync: Optional[bool] = False,
+         ttl: Optional[Dict[MediaType, int]] = None,
+         force: Optional[bool] = False,
+         validate: Optional[bool] = False,
+         market: Optional[str] = None,
+         storage: Optional[Storage] = None,
          **kwargs) -> None:
     """Fetches then exports the data for given `media_name`.
 
@@ -73,6 +562,154 @@ def pull(media_name: str,
         media_type: Type of media as in the categories found on Tunefind. Must
             be one of `MediaType` enum values. Optional, defaults to `None` in
             which case the correct media type will be inferred from probing Tunefind.
+        skip_unchanged: See `export`.
+        delta: See `export`.
+        sync: See `export`.
+        validate: See `export`.
+        market: See `export`.
+        ttl: See `fetch`.
+        force: See `fetch`.
+        storage: Storage used for the data. Optional, defaults to `None` in
+            which case the database is used.
+    """
+    fetch(media_name, media_type, ttl=ttl, force=force, storage=storage)
+    export(media_name, credentials, skip_unchanged=skip_unchanged, delta=delta, sync=sync, validate=validate,
+           market=market, storage=storage)
+
+
+def match(credentials: SpotifyCredentials,
+          media_name: Optional[str] = None,
+          threshold: Optional[float] = matcher.MATCH_THRESHOLD,
+          workers: Optional[int] = matcher.MATCH_WORKERS,
+          storage: Optional[Storage] = None,
+          **kwargs) -> matcher.MatchReport:
+    """Searches Spotify for songs in storage that Tunefind does not link to.
+
+    Note:
+        Results of searches are cached, so that each song is only searched
+        once and an interrupted run can simply be repeated. See
+        `tunefind2spotify.core.matcher`.
+
+    Args:
+        credentials: Spotify API credentials dataclass.
+        media_name: Name of the media to restrict the songs to. Optional,
+            defaults to `None` in which case all songs are considered.
+        threshold: Minimal score of a match between 0 and 1. Optional, defaults
+            to `matcher.MATCH_THRESHOLD`.
+        workers: Maximal number of concurrent searches. Optional, defaults to
+            `matcher.MATCH_WORKERS`.
+        storage: Storage holding the songs. Optional, defaults to `None` in
+            which case the database is used.
+
+    Returns:
+        Report of the run.
+    """
+    if media_name is not None:
+        media_name = tunefind_scraper.name_normalization(media_name)
+    report = matcher.match_songs(_get_storage(storage), SpotifyClient(credentials),
+                                 media_name=media_name, threshold=threshold, workers=workers)
+    logger.info(f'Matched {report.matched} of {report.songs} songs without Spotify link '
+                f'({report.searched} searched, {report.failed} failed).')
+    return report
+
+
+def search(query: str,
+           limit: Optional[int] = 20,
+           storage: Optional[Storage] = None,
+           **kwargs) -> List[Dict[str, Optional[str]]]:
+    """Full-text search for songs, artists and media in the database.
+
+    Args:
+        query: Search terms. Each word must match (as prefix) for a hit.
+        limit: Maximum number of hits. Optional, defaults to 20.
+        storage: Storage to search. Optional, defaults to `None` in which case
+            the database is used.
+
+    Returns:
+        List of ranked hits as returned by `Storage.search`.
+    """
+    dbc = _get_storage(storage)
+    hits = dbc.search(query, limit=limit)
+    if not hits:
+        logger.info(f'No results found for \'{query}\'.')
+    for hit in hits:
+        if hit['song_name'] is None:
+            logger.info(f'[{hit["media_name"]}] {hit["readable_name"]}')
+        else:
+            logger.info(f'[{hit["media_name"]}] {hit["song_name"]} - {hit["artists"]}')
+    return hits
+
+
+def dump(file: str,
+         media_names: Optional[List[str]] = None,
+         storage: Optional[Storage] = None,
+         **kwargs) -> int:
+    """Streams media from database into a line-delimited JSON file.
+
+    Note:
+        The first line is a header identifying the format, each following line
+        holds one media in the schema consumed by `load`. The file is gzip
+        compressed if its name ends with `.gz`.
+
+    Args:
+        file: Path of the file to be written.
+        media_names: Names of the media to be dumped. Optional, defaults to
+            `None` in which case all media in the storage are dumped.
+        storage: Storage from which to read the data. Optional, defaults to
+            `None` in which case the database is used.
+
+    Returns:
+        Number of media dumped.
+    """
+    dbc = _get_storage(storage)
+    if not media_names:
+        media_names = dbc.get_media_names()
+    count = 0
+    with open_text(file, 'w') as f:
+        f.write(json.dumps({'format': DUMP_FORMAT, 'version': DUMP_VERSION}) + '\n')
+        for media_name in media_names:
+            media_name = tunefind_scraper.name_normalization(media_name)
+            if not dbc.media_exists(media_name):
+                logger.warning(f'Media \'{media_name}\' does not exist in database. Skipping.')
+                continue
+            f.write(json.dumps(dbc.get_json_data(media_name), separators=(',', ':')) + '\n')
+            count += 1
+    logger.info(f'Dumped {count} media to \'{file}\'.')
+    return count
+
+
+def load(file: str,
+         storage: Optional[Storage] = None,
+         **kwargs) -> int:
+    """Loads media from a file written by `dump` into the database.
+
+    Note:
+        Media are read and inserted one line at a time, each in a single bulk
+        transaction. Data already present in the database is kept.
+
+    Args:
+        file: Path of the file to be read.
+        storage: Storage in which to store the data. Optional, defaults to
+            `None` in which case the database is used.
+
+    Returns:
+        Number of media loaded.
+
+    Raises:
+        ValueError: In case the file is not a dump of a supported version.
     """
-    fetch(media_name, media_type)
-    export(media_name, credentials)
+    dbc = _get_storage(storage)
+    count = 0
+    with open_text(file, 'r') as f:
+        header = json.loads(f.readline() or '{}')
+        if header.get('format') != DUMP_FORMAT or header.get('version') != DUMP_VERSION:
+            log_and_raise(logger, ValueError, f'File \'{file}\' is not a supported dump. Header: {header}')
+        for line in f:
+            if not line.strip():
+                continue
+            data = json.loads(line)
+            data['media_type'] = MediaType(data['media_type'])
+            dbc.insert_json_data(data)
+            count += 1
+    logger.info(f'Loaded {count} media from \'{file}\'.')
+    return count
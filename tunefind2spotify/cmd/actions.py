@@ -1,19 +1,27 @@
-"""Definition of custom `argparse.Action` derivatives for use with cmd API."""
+"""Definition of custom `argparse.Action` derivatives for use with cmd API.
+
+Note:
+    Modules depending on `spotipy` or `sqlite3` are imported where needed only,
+    to keep startup of the command line interface fast.
+"""
 
 import argparse
 import enum
 import os
 
-from typing import Optional
+from typing import Optional, TYPE_CHECKING
 
-from tunefind2spotify.core.spotify_client import SpotifyCredentials
 from tunefind2spotify.exceptions import log_and_raise, MissingCredentialsException
 from tunefind2spotify.log import fetch_logger
+from tunefind2spotify.utils import MediaType
+
+if TYPE_CHECKING:
+    from tunefind2spotify.core.spotify_client import SpotifyCredentials
 
 logger = fetch_logger(__name__)
 
 
-def _unpack(creds: str, delimiter: str) -> SpotifyCredentials:
+def _unpack(creds: str, delimiter: str) -> 'SpotifyCredentials':
     """Attempts to extract credential parts from given string.
 
     Args:
@@ -23,6 +31,8 @@ def _unpack(creds: str, delimiter: str) -> SpotifyCredentials:
     Returns:
         Spotify API credentials dataclass.
     """
+    from tunefind2spotify.core.spotify_client import SpotifyCredentials
+
     i, s, r = '', '', ''
     if str.count(creds, delimiter) != 2 or len(creds) < 5:
         logger.debug(f'Insufficient credentials to be extracted from string \'{creds}\'.')
@@ -31,7 +41,7 @@ def _unpack(creds: str, delimiter: str) -> SpotifyCredentials:
     return SpotifyCredentials(i, s, r)
 
 
-def find_credentials(value: str, delimiter: Optional[str] = '|') -> SpotifyCredentials:
+def find_credentials(value: str, delimiter: Optional[str] = '|') -> 'SpotifyCredentials':
     """Searches the credentials for the Spotify API passed to the application.
 
     Note:
@@ -55,6 +65,8 @@ def find_credentials(value: str, delimiter: Optional[str] = '|') -> SpotifyCrede
             were found.
     """
 
+    from tunefind2spotify.core.spotify_client import SpotifyCredentials
+
     if len(delimiter) != 1:
         log_and_raise(logger, ValueError, f'Delimiter must be a single character. Provided \'{delimiter}\' instead.')
 
@@ -104,6 +116,23 @@ def find_credentials(value: str, delimiter: Optional[str] = '|') -> SpotifyCrede
                       '\'credentials\' a (not None valued) key in passed dictionary.')
 
 
+def positive_int(value: str) -> int:
+    """Argparse type for integers greater than zero.
+
+    Args:
+        value: Command line value.
+
+    Returns:
+        Parsed integer.
+
+    Raises:
+        argparse.ArgumentTypeError: If `value` is not a positive integer.
+    """
+    if not value.isdigit() or int(value) <= 0:
+        raise argparse.ArgumentTypeError(f'\'{value}\' is not a positive integer.')
+    return int(value)
+
+
 class EnumAction(argparse.Action):
     """Argparse action for handling enum conversion."""
 
@@ -141,3 +170,46 @@ class SpotifyCredentialsAction(argparse.Action):
         """Find and set Spotify credentials."""
         value = find_credentials(values)
         setattr(namespace, self.dest, value)
+
+
+class StorageAction(argparse.Action):
+    """Argparse action for handling the choice of storage backend."""
+
+    CHOICES = ('sqlite', 'memory')
+
+    def __init__(self, **kwargs) -> None:
+        """Sets choices."""
+        kwargs.setdefault('choices', self.CHOICES)
+        super(StorageAction, self).__init__(**kwargs)
+
+    def __call__(self,
+                 parser,
+                 namespace,
+                 values,
+                 option_string=None) -> None:
+        """Set storage instance, `None` selects the default database."""
+        from tunefind2spotify.core.storage import InMemoryStorage
+
+        value = InMemoryStorage() if values == 'memory' else None
+        setattr(namespace, self.dest, value)
+
+
+class TTLAction(argparse.Action):
+    """Argparse action for handling time to live values per media type."""
+
+    def __call__(self,
+                 parser,
+                 namespace,
+                 values,
+                 option_string=None) -> None:
+        """Parse values of format `TYPE=SECONDS` into dict, accumulating repeated use."""
+        ttl = dict(getattr(namespace, self.dest, None) or {})
+        for value in values if isinstance(values, list) else [values]:
+            media_type, _, seconds = value.partition('=')
+            media_type = MediaType.read_in(media_type)
+            if media_type is None or not seconds.isdigit():
+                log_and_raise(logger, ValueError,
+                              f'TTL \'{value}\' is not of format TYPE=SECONDS with TYPE one of '
+                              f'{MediaType._member_names_}.')
+            ttl[media_type] = int(seconds)
+        setattr(namespace, self.dest, ttl)
@@ -2,6 +2,13 @@
 
 This module defines and implements the command line interface and usage.
 
+Note:
+    To keep startup fast, heavy dependencies (`requests`, `spotipy`, `sqlite3`
+    etc.) are not imported at module level. The subcommands refer to their
+    functions in `tunefind2spotify.api` by name and the API module is only
+    imported once the arguments are parsed, so that e.g. `--help` and
+    `--version` do not pay for it.
+
 Attributes:
     PROGRAM_NAME (str): Name of this program.
     VERSION_FILE (str): Path to file holding the version number of the program.
@@ -21,9 +28,10 @@ _TOP_LEVEL_PATH = os.path.dirname(
                    )
 sys.path.insert(0, _TOP_LEVEL_PATH)
 
-from tunefind2spotify import api  # noqa: E402
-from tunefind2spotify.cmd.actions import EnumAction, SpotifyCredentialsAction  # noqa: E402
-from tunefind2spotify.log import fetch_logger  # noqa: E402
+from tunefind2spotify import stats  # noqa: E402
+from tunefind2spotify.cmd.actions import (EnumAction, SpotifyCredentialsAction, StorageAction, TTLAction,  # noqa: E402
+                                          positive_int)
+from tunefind2spotify.log import configure_logging, fetch_logger, DEFAULT_LOG_FILE  # noqa: E402
 from tunefind2spotify.utils import MediaType  # noqa: E402
 
 logger = fetch_logger(__name__)
@@ -32,6 +40,16 @@ PROGRAM_NAME = 'tunefind2spotify'
 VERSION_FILE = os.path.join(_TOP_LEVEL_PATH, 'VERSION')
 DEFAULT_CRED_FILE = '.spotipy_credentials'
 
+api = None  # `tunefind2spotify.api`, imported by `_load_api`
+
+
+def _load_api():
+    """Imports the API module on first use."""
+    global api
+    if api is None:
+        from tunefind2spotify import api
+    return api
+
 
 def entrypoint():
     parser = argparse.ArgumentParser(prog=PROGRAM_NAME,
@@ -41,6 +59,61 @@ def entrypoint():
                         action='version',
                         version=f'{PROGRAM_NAME} {open(VERSION_FILE, "r").readline()}')
 
+    parser.add_argument('-s', '--storage',
+                        dest='storage',
+                        action=StorageAction,
+                        default=None,
+                        help='Storage backend for media information. `memory` keeps data only for the duration of '
+                             'the invocation (e.g. for `pull`). Optional, defaults to `sqlite`.')
+
+    parser.add_argument('--log-level',
+                        dest='log_level',
+                        type=str.upper,
+                        choices=['DEBUG', 'INFO', 'WARNING', 'ERROR'],
+                        default='INFO',
+                        help='Minimal level of log messages. Optional, defaults to `INFO`.')
+
+    parser.add_argument('--log-file',
+                        dest='log_file',
+                        type=str,
+                        default=DEFAULT_LOG_FILE,
+                        help=f'File to append the log to, an empty string disables logging to file. Optional, '
+                             f'defaults to `{DEFAULT_LOG_FILE}`.')
+
+    parser.add_argument('--stats',
+                        dest='stats',
+                        nargs='?',
+                        const='text',
+                        default=None,
+                        choices=['text', 'json'],
+                        help='Print counters and timings per stage (requests, SQL statements, Spotify calls) at '
+                             'exit, as table or JSON. Optional, defaults to no report.')
+
+    parser.add_argument('--profile',
+                        dest='profile',
+                        nargs='?',
+                        const='cprofile',
+                        default=None,
+                        choices=['cprofile', 'tracemalloc'],
+                        help='Run the subcommand under a profiler and print a report at exit. Optional, defaults to '
+                             'no profiling, `cprofile` if given without value.')
+
+    parser.add_argument('--profile-output',
+                        dest='profile_output',
+                        type=str,
+                        default=None,
+                        help='File to write the raw profile to (`.pstats` for `cprofile`, snapshot for '
+                             '`tracemalloc`) instead of printing a report.')
+
+    parser.add_argument('--trace',
+                        dest='trace',
+                        metavar='FILE',
+                        type=str,
+                        default=None,
+                        help='Record every HTTP request to Tunefind and Spotify (status, timings, sizes, retries, '
+                             'redirects) and write them to FILE in HAR format at exit. Optional, defaults to no '
+                             'tracing.')
+
     credentials_options = (['-c', '--credentials'],
                            dict(dest='credentials',
                                 type=str,
@@ -56,13 +129,62 @@ def entrypoint():
                                      'file `{DEFAULT_CRED_FILE}`.')
                            )
 
+    skip_unchanged_options = (['--skip-unchanged'],
+                              dict(dest='skip_unchanged',
+                                   action='store_true',
+                                   help='Do not export if no fetch added songs since the last export.')
+                              )
+
+    delta_options = (['--delta'],
+                     dict(dest='delta',
+                          action='store_true',
+                          help='Only export the songs that fetches added since the last export.')
+                     )
+
+    sync_options = (['--sync'],
+                    dict(dest='sync',
+                         action='store_true',
+                         help='Make an existing playlist equal to the songs in database including their order, '
+                              'removing all other tracks. Not applicable with `--delta`.')
+                    )
+
+    validate_options = (['--validate'],
+                        dict(dest='validate',
+                             action='store_true',
+                             help='Drop tracks that are unavailable on Spotify before exporting.')
+                        )
+
+    market_options = (['--market'],
+                      dict(dest='market',
+                           type=str,
+                           default=None,
+                           help='Country code (ISO 3166-1 alpha-2) tracks must be playable in for `--validate`. '
+                                'Optional, defaults to tracks only having to exist.')
+                      )
+
+    ttl_options = (['--ttl'],
+                   dict(dest='ttl',
+                        metavar='TYPE=SECONDS',
+                        nargs='+',
+                        action=TTLAction,
+                        help='Time in seconds per media type for which stored data is considered fresh and not '
+                             'scraped again, e.g. `--ttl show=3600 movie=0`. Optional, defaults to one day for '
+                             'shows and 30 days for movies and games.')
+                   )
+
+    force_options = (['--force'],
+                     dict(dest='force',
+                          action='store_true',
+                          help='Scrape even if stored data is fresh.')
+                     )
+
     # create the subparsers
     subparsers = parser.add_subparsers(help='sub-command help')
 
     # fetch command
     parser_fetch = subparsers.add_parser('fetch',
                                          help='Scrape song info for media from Tunefind and store in database.')
-    parser_fetch.set_defaults(func=api.fetch)
+    parser_fetch.set_defaults(func='fetch')
     parser_fetch.add_argument('media_name',
                               metavar='MEDIA-NAME',
                               type=str,
@@ -72,21 +194,114 @@ def entrypoint():
                               type=MediaType,
                               action=EnumAction,
                               help='Type of media to scrape. Optional, will be inferred if not given.')
+    parser_fetch.add_argument(*ttl_options[0], **ttl_options[1])
+    parser_fetch.add_argument(*force_options[0], **force_options[1])
+    group_fetch = parser_fetch.add_mutually_exclusive_group()
+    group_fetch.add_argument('--record',
+                             dest='record',
+                             metavar='DIR',
+                             type=str,
+                             default=None,
+                             help='Store every response from Tunefind in DIR, to be replayed with `--replay`. '
+                                  'Optional, defaults to no recording.')
+    group_fetch.add_argument('--replay',
+                             dest='replay',
+                             metavar='DIR',
+                             type=str,
+                             default=None,
+                             help='Scrape from the responses stored in DIR by `--record` instead of Tunefind, '
+                                  'without network access. Combine with `--force` to ingest media whose stored '
+                                  'data is fresh. Optional, defaults to requesting Tunefind.')
 
     # export command
     parser_export = subparsers.add_parser('export',
                                           help='Create playlist from media information in database.')
-    parser_export.set_defaults(func=api.export)
+    parser_export.set_defaults(func='export')
     parser_export.add_argument('media_name',
                                metavar='MEDIA-NAME',
                                type=str,
                                help='Name of media to scrape.')
     cred_arg = parser_export.add_argument(*credentials_options[0], **credentials_options[1])
+    parser_export.add_argument(*skip_unchanged_options[0], **skip_unchanged_options[1])
+    group_export = parser_export.add_mutually_exclusive_group()
+    group_export.add_argument(*delta_options[0], **delta_options[1])
+    group_export.add_argument(*sync_options[0], **sync_options[1])
+    parser_export.add_argument(*validate_options[0], **validate_options[1])
+    parser_export.add_argument(*market_options[0], **market_options[1])
+
+    # export-many command
+    parser_export_many = subparsers.add_parser('export-many',
+                                               help='Create playlists for multiple media concurrently.')
+    parser_export_many.set_defaults(func='export_many')
+    parser_export_many.add_argument('media_names',
+                                    metavar='MEDIA-NAME',
+                                    type=str,
+                                    nargs='*',
+                                    help='Names of media to export. Optional, defaults to all media in database.')
+    cred_arg = parser_export_many.add_argument(*credentials_options[0], **credentials_options[1])
+    parser_export_many.add_argument('-w', '--workers',
+                                    dest='workers',
+                                    type=int,
+                                    default=4,
+                                    help='Maximal number of concurrent exports. Optional, defaults to 4.')
+    parser_export_many.add_argument(*skip_unchanged_options[0], **skip_unchanged_options[1])
+    group_export_many = parser_export_many.add_mutually_exclusive_group()
+    group_export_many.add_argument(*delta_options[0], **delta_options[1])
+    group_export_many.add_argument(*sync_options[0], **sync_options[1])
+    parser_export_many.add_argument(*validate_options[0], **validate_options[1])
+    parser_export_many.add_argument(*market_options[0], **market_options[1])
+
+    # export-seasons command
+    parser_export_seasons = subparsers.add_parser('export-seasons',
+                                                  help='Create one playlist per season of a show.')
+    parser_export_seasons.set_defaults(func='export_seasons')
+    parser_export_seasons.add_argument('media_name',
+                                       metavar='MEDIA-NAME',
+                                       type=str,
+                                       help='Name of show to export.')
+    cred_arg = parser_export_seasons.add_argument(*credentials_options[0], **credentials_options[1])
+    parser_export_seasons.add_argument('-e', '--episodes',
+                                       dest='episodes_per_playlist',
+                                       type=positive_int,
+                                       default=None,
+                                       help='Number of episodes per playlist within a season. Optional, defaults '
+                                            'to one playlist per season.')
+    parser_export_seasons.add_argument('-w', '--workers',
+                                       dest='workers',
+                                       type=int,
+                                       default=4,
+                                       help='Maximal number of concurrent exports. Optional, defaults to 4.')
+    parser_export_seasons.add_argument(*skip_unchanged_options[0], **skip_unchanged_options[1])
+    parser_export_seasons.add_argument(*sync_options[0], **sync_options[1])
+    parser_export_seasons.add_argument(*validate_options[0], **validate_options[1])
+    parser_export_seasons.add_argument(*market_options[0], **market_options[1])
+
+    # match command
+    parser_match = subparsers.add_parser('match',
+                                         help='Search Spotify for songs that Tunefind does not link to.')
+    parser_match.set_defaults(func='match')
+    parser_match.add_argument('media_name',
+                              metavar='MEDIA-NAME',
+                              type=str,
+                              nargs='?',
+                              default=None,
+                              help='Name of media to restrict the songs to. Optional, defaults to all songs.')
+    cred_arg = parser_match.add_argument(*credentials_options[0], **credentials_options[1])
+    parser_match.add_argument('-t', '--threshold',
+                              dest='threshold',
+                              type=float,
+                              default=0.8,
+                              help='Minimal score of a match between 0 and 1. Optional, defaults to 0.8.')
+    parser_match.add_argument('-w', '--workers',
+                              dest='workers',
+                              type=int,
+                              default=4,
+                              help='Maximal number of concurrent searches. Optional, defaults to 4.')
 
     # pull command
     parser_pull = subparsers.add_parser('pull',
                                         help='Combination of first fetch and then export.')
-    parser_pull.set_defaults(func=api.pull)
+    parser_pull.set_defaults(func='pull')
     parser_pull.add_argument('media_name',
                              metavar='MEDIA-NAME',
                              type=str,
@@ -96,8 +311,55 @@ def entrypoint():
                              type=MediaType,
                              action=EnumAction,
                              help='Type of media to scrape. Optional, will be inferred if not given.')
+    parser_pull.add_argument(*skip_unchanged_options[0], **skip_unchanged_options[1])
+    group_pull = parser_pull.add_mutually_exclusive_group()
+    group_pull.add_argument(*delta_options[0], **delta_options[1])
+    group_pull.add_argument(*sync_options[0], **sync_options[1])
+    parser_pull.add_argument(*validate_options[0], **validate_options[1])
+    parser_pull.add_argument(*market_options[0], **market_options[1])
+    parser_pull.add_argument(*ttl_options[0], **ttl_options[1])
+    parser_pull.add_argument(*force_options[0], **force_options[1])
+
+    # search command
+    parser_search = subparsers.add_parser('search',
+                                          help='Full-text search for songs, artists and media in database.')
+    parser_search.set_defaults(func='search')
+    parser_search.add_argument('query',
+                               metavar='QUERY',
+                               type=str,
+                               help='Search terms. Quote to pass multiple words.')
+    parser_search.add_argument('-l', '--limit',
+                               dest='limit',
+                               type=int,
+                               default=20,
+                               help='Maximum number of results. Optional, defaults to 20.')
+
+    # dump command
+    parser_dump = subparsers.add_parser('dump',
+                                        help='Write media from database into a (gzip compressed) JSON lines file.')
+    parser_dump.set_defaults(func='dump')
+    parser_dump.add_argument('file',
+                             metavar='FILE',
+                             type=str,
+                             help='Path of file to write. Compressed with gzip if ending with `.gz`.')
+    parser_dump.add_argument('-m', '--media_names',
+                             dest='media_names',
+                             metavar='MEDIA-NAME',
+                             type=str,
+                             nargs='+',
+                             help='Names of media to dump. Optional, defaults to all media in database.')
+
+    # load command
+    parser_load = subparsers.add_parser('load',
+                                        help='Read media from a file written by dump into database.')
+    parser_load.set_defaults(func='load')
+    parser_load.add_argument('file',
+                             metavar='FILE',
+                             type=str,
+                             help='Path of file to read. Decompressed with gzip if ending with `.gz`.')
 
     args = parser.parse_args()
+    configure_logging(args.log_level, args.log_file)
     if credentials_options[1]['dest'] in vars(args).keys():
         # Invoke SpotifyCredentialsAction manually in case default was read
         if vars(args)[cred_arg.dest] == cred_arg.default:
@@ -107,8 +369,24 @@ def entrypoint():
         logger.debug('Skipping SpotifyCredentialsAction.')
     args = vars(args)
     logger.debug(f'Application was invoked with args: {args}.')
-    logger.info(f'Invocation of {args["func"].__name__} function.')
-    args['func'](**args)
+    logger.info(f'Invocation of {args["func"]} function.')
+    args['func'] = getattr(_load_api(), args['func'])
+    if args['stats'] is not None:
+        stats.enable()
+    if args['trace'] is not None:
+        from tunefind2spotify import trace
+        trace.enable()
+    try:
+        if args['profile'] is None:
+            args['func'](**args)
+        else:
+            from tunefind2spotify.cmd.profiling import run_profiled
+            run_profiled(args['func'], args, profiler=args['profile'], output=args['profile_output'])
+    finally:
+        if args['stats'] is not None:
+            print(stats.format_report(as_json=args['stats'] == 'json'))
+        if args['trace'] is not None:
+            trace.write(args['trace'])
 
 
 if __name__ == '__main__':
@@ -0,0 +1,97 @@
+"""Profiling of a subcommand invoked via the command line interface.
+
+Two profilers are supported:
+
+- `cprofile` records where CPU time is spent using `cProfile`. Note that only
+  the calling thread is profiled, work done in worker threads (e.g. concurrent
+  exports) appears as time waiting for them.
+
+- `tracemalloc` records which lines allocated the memory still held at the end
+  of the run, along with the peak of traced memory.
+
+Either a report sorted by cumulative time (respectively allocated size) is
+printed, or the raw data is written to file, to be inspected with `pstats`
+(e.g. `python -m pstats FILE`) respectively `tracemalloc.Snapshot.load`.
+
+Attributes:
+    PROFILERS (Tuple[str]): Names of the supported profilers.
+    REPORT_LIMIT (int): Number of entries printed in a report.
+    TRACEMALLOC_FRAMES (int): Number of frames stored per traced allocation.
+"""
+
+import cProfile
+import io
+import pstats
+import tracemalloc
+
+from typing import Any, Callable, Optional
+
+from tunefind2spotify.exceptions import log_and_raise
+from tunefind2spotify.log import fetch_logger
+
+logger = fetch_logger(__name__)
+
+PROFILERS = ('cprofile', 'tracemalloc')
+REPORT_LIMIT = 30
+TRACEMALLOC_FRAMES = 25
+
+
+def _run_cprofile(func: Callable, kwargs: dict, output: Optional[str]) -> Any:
+    """Runs function under `cProfile`, see `run_profiled`."""
+    profile = cProfile.Profile()
+    try:
+        return profile.runcall(func, **kwargs)
+    finally:
+        if output:
+            profile.dump_stats(output)
+            logger.info(f'Wrote profile to \'{output}\'.')
+        else:
+            stream = io.StringIO()
+            pstats.Stats(profile, stream=stream).sort_stats('cumulative').print_stats(REPORT_LIMIT)
+            print(stream.getvalue())
+
+
+def _run_tracemalloc(func: Callable, kwargs: dict, output: Optional[str]) -> Any:
+    """Runs function while tracing memory allocations, see `run_profiled`."""
+    tracemalloc.start(TRACEMALLOC_FRAMES)
+    try:
+        return func(**kwargs)
+    finally:
+        snapshot = tracemalloc.take_snapshot()
+        _, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+        if output:
+            snapshot.dump(output)
+            logger.info(f'Wrote memory snapshot to \'{output}\' (peak {peak / 2 ** 20:.1f} MiB).')
+        else:
+            snapshot = snapshot.filter_traces([tracemalloc.Filter(False, tracemalloc.__file__)])
+            print(f'Peak traced memory: {peak / 2 ** 20:.1f} MiB')
+            for stat in snapshot.statistics('lineno')[:REPORT_LIMIT]:
+                print(stat)
+
+
+def run_profiled(func: Callable,
+                 kwargs: dict,
+                 profiler: str,
+                 output: Optional[str] = None) -> Any:
+    """Calls a function under given profiler.
+
+    Args:
+        func: Function to be profiled.
+        kwargs: Keyword arguments passed to the function.
+        profiler: Name of the profiler, one of `PROFILERS`.
+        output: Path of the file to write the raw profile to. Optional,
+            defaults to `None` in which case a report is printed instead.
+
+    Returns:
+        Whatever the function returns. The profile is written even if the
+        function raises.
+
+    Raises:
+        ValueError: In case the profiler is not supported.
+    """
+    if profiler == 'cprofile':
+        return _run_cprofile(func, kwargs, output)
+    if profiler == 'tracemalloc':
+        return _run_tracemalloc(func, kwargs, output)
+    log_and_raise(logger, ValueError, f'Profiler \'{profiler}\' is not one of {PROFILERS}.')
@@ -1,8 +1,8 @@
 """Database module.
 
 This module handles caching of relevant data scraped from Tunefind in a local
-database. A connector class serves as abstraction layer for easy data insertion
-and retrieval. The database scheme is build up as follows:
+database. A connector class implementing the `Storage` interface serves as
+abstraction layer for easy data insertion and retrieval. The database scheme is build up as follows:
 
 - the `media` table lists the name and type of the media scraped from tunefind.
 
@@ -22,6 +22,42 @@ tables:
   of primary keys from tables `shows` and `songs`, thereby effectively retaining
   the data granularity.
 
+Artists are normalized into their own tables:
+
+- the `artists` table lists each distinct artist name (case-insensitive).
+
+- the `song_artists` table is a NxM reference of primary keys from tables
+  `songs` and `artists`, indexed in both directions.
+
+Each ingest of scraped data is recorded as a run, together with what it added:
+
+- the `runs` table lists each ingest per media with its date, as well as each
+  time songs of the media were linked to Spotify by matching (`run_type`
+  `fetch` or `match`).
+
+- the `changes` table lists per run the episodes, songs (new to the media, or
+  newly linked to Spotify in a run of type `match`) and matches that did not
+  exist before.
+
+- the `exports` table lists which run of a media was last exported to Spotify,
+  per playlist: the playlist of the whole media (no playlist name) or one of
+  its season playlists.
+
+- the `playlists` table mirrors the state of each exported playlist on Spotify
+  as of its snapshot id, keyed by the playlist's name.
+
+- the `track_availability` table caches whether a track URI is available on
+  Spotify per market (empty if none was given), along with the date it was
+  checked.
+
+- the `search_cache` table caches the best track found by searching Spotify
+  for a song without Spotify link, including searches that found nothing.
+
+For full-text search, the `songs_fts` and `media_fts` tables are FTS5 indices
+over song names, artists and readable media names. They are external content
+tables kept in sync with `songs` and `media` by triggers, except for inserted
+songs which are indexed in bulk at ingest.
+
 Attributes:
     DEFAULT_DB_FIELPATH (str): Path to default database file.
     SQL_CREATE_MEDIA_TABLE (str): SQL instruction to create respective table.
@@ -31,15 +67,43 @@ Attributes:
         table.
     SQL_CREATE_MATCH_OTHER_TABLE (str): SQL instruction to create respective
         table.
+    SQL_CREATE_ARTISTS_TABLE (str): SQL instruction to create respective table.
+    SQL_CREATE_SONG_ARTISTS_TABLE (str): SQL instruction to create respective
+        table.
+    SQL_CREATE_RUNS_TABLE (str): SQL instruction to create respective table.
+    SQL_CREATE_CHANGES_TABLE (str): SQL instruction to create respective table.
+    SQL_CREATE_EXPORTS_TABLE (str): SQL instruction to create respective table.
+    SQL_CREATE_PLAYLISTS_TABLE (str): SQL instruction to create respective
+        table.
+    SQL_CREATE_TRACK_AVAILABILITY_TABLE (str): SQL instruction to create
+        respective table.
+    SQL_CREATE_SEARCH_CACHE_TABLE (str): SQL instruction to create respective
+        table.
+    SQL_CREATE_STAGING_TABLES (List[str]): SQL instructions to create temporary
+        tables holding the rows of an ingest for comparison with existing rows.
+    SQL_CREATE_SONGS_FTS_TABLE (str): SQL instruction to create full-text index
+        over songs.
+    SQL_CREATE_MEDIA_FTS_TABLE (str): SQL instruction to create full-text index
+        over media.
+    SQL_CREATE_FTS_TRIGGERS (List[str]): SQL instructions to create triggers
+        that keep the full-text indices in sync with their content tables.
+    SQL_CREATE_INDICES (List[str]): SQL instructions to create indices that
+        enforce uniqueness of entries and are used for lookups and joins.
 
 """
 
+import json
+import logging
 import os
+import re
 import sqlite3
 
+from contextlib import contextmanager
 from datetime import datetime
-from typing import List, Optional, Iterable
+from typing import Collection, Dict, List, Optional, Iterable, Iterator, Set, Tuple
 
+from tunefind2spotify.core.storage import PlaylistState, Storage, split_artists
+from tunefind2spotify import stats
 from tunefind2spotify.exceptions import log_and_raise
 from tunefind2spotify.log import fetch_logger, flatten_multiline_string
 from tunefind2spotify.utils import MediaType, singleton
@@ -47,6 +111,8 @@ from tunefind2spotify.utils import MediaType, singleton
 
 logger = fetch_logger(__name__)
 
+_IN_CHUNK_SIZE = 500
+
 DEFAULT_DB_FILEPATH = os.path.join(
         os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
         'data',
@@ -94,9 +160,171 @@ SQL_CREATE_MATCH_OTHER_TABLE = """CREATE TABLE IF NOT EXISTS match_other (
                                 FOREIGN KEY (song_id) REFERENCES songs (id)
                                 );"""
 
+SQL_CREATE_ARTISTS_TABLE = """CREATE TABLE IF NOT EXISTS artists (
+                              id integer PRIMARY KEY AUTOINCREMENT,
+                              name text NOT NULL UNIQUE COLLATE NOCASE
+                              );"""
+
+SQL_CREATE_SONG_ARTISTS_TABLE = """CREATE TABLE IF NOT EXISTS song_artists (
+                                   song_id integer NOT NULL,
+                                   artist_id integer NOT NULL,
+                                   PRIMARY KEY (song_id, artist_id),
+                                   FOREIGN KEY (song_id) REFERENCES songs (id),
+                                   FOREIGN KEY (artist_id) REFERENCES artists (id)
+                                   ) WITHOUT ROWID;"""
+
+SQL_CREATE_RUNS_TABLE = """CREATE TABLE IF NOT EXISTS runs (
+                           id integer PRIMARY KEY AUTOINCREMENT,
+                           media_id integer NOT NULL,
+                           timestamp integer NOT NULL,
+                           run_type text NOT NULL DEFAULT 'fetch',
+                           FOREIGN KEY (media_id) REFERENCES media (id)
+                           );"""
+
+SQL_CREATE_CHANGES_TABLE = """CREATE TABLE IF NOT EXISTS changes (
+                              id integer PRIMARY KEY AUTOINCREMENT,
+                              run_id integer NOT NULL,
+                              change_type text NOT NULL,
+                              episode_id integer,
+                              song_id integer,
+                              FOREIGN KEY (run_id) REFERENCES runs (id),
+                              FOREIGN KEY (episode_id) REFERENCES shows (id),
+                              FOREIGN KEY (song_id) REFERENCES songs (id)
+                              );"""
+
+SQL_CREATE_EXPORTS_TABLE = """CREATE TABLE IF NOT EXISTS exports (
+                              id integer PRIMARY KEY AUTOINCREMENT,
+                              media_id integer NOT NULL,
+                              run_id integer NOT NULL,
+                              timestamp integer NOT NULL,
+                              playlist_name text,
+                              FOREIGN KEY (media_id) REFERENCES media (id),
+                              FOREIGN KEY (run_id) REFERENCES runs (id)
+                              );"""
+
+SQL_CREATE_PLAYLISTS_TABLE = """CREATE TABLE IF NOT EXISTS playlists (
+                                name text PRIMARY KEY,
+                                playlist_id text NOT NULL,
+                                snapshot_id text NOT NULL,
+                                description text NOT NULL,
+                                track_uris text NOT NULL
+                                );"""
+
+SQL_CREATE_TRACK_AVAILABILITY_TABLE = """CREATE TABLE IF NOT EXISTS track_availability (
+                                         spotify_uri text NOT NULL,
+                                         market text NOT NULL,
+                                         available integer NOT NULL,
+                                         checked integer NOT NULL,
+                                         PRIMARY KEY (spotify_uri, market)
+                                         );"""
+
+SQL_CREATE_SEARCH_CACHE_TABLE = """CREATE TABLE IF NOT EXISTS search_cache (
+                                   query text PRIMARY KEY,
+                                   spotify_uri text,
+                                   score real NOT NULL
+                                   );"""
+
+SQL_CREATE_STAGING_TABLES = [
+    """CREATE TEMP TABLE IF NOT EXISTS staged_episodes (
+       season integer NOT NULL,
+       episode integer NOT NULL
+       );""",
+    """CREATE TEMP TABLE IF NOT EXISTS staged_matches (
+       x_id integer NOT NULL,
+       song_id integer NOT NULL
+       );"""
+]
+
+SQL_CREATE_SONGS_FTS_TABLE = """CREATE VIRTUAL TABLE IF NOT EXISTS songs_fts USING fts5(
+                                song_name,
+                                artists,
+                                content='songs',
+                                content_rowid='id',
+                                tokenize='unicode61 remove_diacritics 2',
+                                prefix='2 3'
+                                );"""
+
+SQL_CREATE_MEDIA_FTS_TABLE = """CREATE VIRTUAL TABLE IF NOT EXISTS media_fts USING fts5(
+                                readable_name,
+                                content='media',
+                                content_rowid='id',
+                                tokenize='unicode61 remove_diacritics 2',
+                                prefix='2 3'
+                                );"""
+
+SQL_CREATE_FTS_TRIGGERS = [
+    # inserted songs are indexed in bulk by `DBConnector._insert_songs`
+    'DROP TRIGGER IF EXISTS songs_fts_insert;',
+    """CREATE TRIGGER IF NOT EXISTS songs_fts_delete AFTER DELETE ON songs BEGIN
+       INSERT INTO songs_fts(songs_fts, rowid, song_name, artists)
+       VALUES ('delete', old.id, old.song_name, old.artists);
+       END;""",
+    """CREATE TRIGGER IF NOT EXISTS songs_fts_update AFTER UPDATE OF song_name, artists ON songs BEGIN
+       INSERT INTO songs_fts(songs_fts, rowid, song_name, artists)
+       VALUES ('delete', old.id, old.song_name, old.artists);
+       INSERT INTO songs_fts(rowid, song_name, artists) VALUES (new.id, new.song_name, new.artists);
+       END;""",
+    """CREATE TRIGGER IF NOT EXISTS media_fts_insert AFTER INSERT ON media BEGIN
+       INSERT INTO media_fts(rowid, readable_name) VALUES (new.id, new.readable_name);
+       END;""",
+    """CREATE TRIGGER IF NOT EXISTS media_fts_delete AFTER DELETE ON media BEGIN
+       INSERT INTO media_fts(media_fts, rowid, readable_name) VALUES ('delete', old.id, old.readable_name);
+       END;""",
+    """CREATE TRIGGER IF NOT EXISTS media_fts_update AFTER UPDATE OF readable_name ON media BEGIN
+       INSERT INTO media_fts(media_fts, rowid, readable_name) VALUES ('delete', old.id, old.readable_name);
+       INSERT INTO media_fts(rowid, readable_name) VALUES (new.id, new.readable_name);
+       END;"""
+]
+
+SQL_CREATE_INDICES = [
+    'CREATE UNIQUE INDEX IF NOT EXISTS media_name_idx ON media (media_name);',
+    'CREATE UNIQUE INDEX IF NOT EXISTS songs_tunefind_idx ON songs (tunefind_id);',
+    'CREATE UNIQUE INDEX IF NOT EXISTS shows_episode_idx ON shows (media_id, season, episode);',
+    'CREATE UNIQUE INDEX IF NOT EXISTS match_show_idx ON match_show (episode_id, song_id);',
+    'CREATE UNIQUE INDEX IF NOT EXISTS match_other_idx ON match_other (media_id, song_id);',
+    'CREATE INDEX IF NOT EXISTS match_show_song_idx ON match_show (song_id);',
+    'CREATE INDEX IF NOT EXISTS match_other_song_idx ON match_other (song_id);',
+    'CREATE INDEX IF NOT EXISTS song_artists_artist_idx ON song_artists (artist_id, song_id);',
+    'CREATE INDEX IF NOT EXISTS runs_media_idx ON runs (media_id);',
+    'CREATE INDEX IF NOT EXISTS changes_run_idx ON changes (run_id);',
+    'CREATE INDEX IF NOT EXISTS exports_media_idx ON exports (media_id);'
+]
+
+SQL_SEARCH = """WITH song_hits AS (SELECT rowid AS song_id, rank
+                                   FROM songs_fts
+                                   WHERE songs_fts MATCH :query
+                                   ORDER BY rank
+                                   LIMIT :limit),
+                     media_hits AS (SELECT rowid AS media_id, rank
+                                    FROM media_fts
+                                    WHERE media_fts MATCH :query
+                                    ORDER BY rank
+                                    LIMIT :limit)
+                SELECT media.media_name, media.readable_name, songs.song_name, songs.artists, songs.spotify_uri,
+                       1, song_hits.rank
+                FROM song_hits
+                JOIN songs ON songs.id=song_hits.song_id
+                JOIN match_other ON match_other.song_id=songs.id
+                JOIN media ON media.id=match_other.media_id
+                UNION
+                SELECT media.media_name, media.readable_name, songs.song_name, songs.artists, songs.spotify_uri,
+                       1, song_hits.rank
+                FROM song_hits
+                JOIN songs ON songs.id=song_hits.song_id
+                JOIN match_show ON match_show.song_id=songs.id
+                JOIN shows ON shows.id=match_show.episode_id
+                JOIN media ON media.id=shows.media_id
+                UNION ALL
+                SELECT media.media_name, media.readable_name, NULL, NULL, NULL, 0, media_hits.rank
+                FROM media_hits
+                JOIN media ON media.id=media_hits.media_id
+                ORDER BY 6, 7
+                LIMIT :limit
+             """
+
 
 @singleton
-class DBConnector:
+class DBConnector(Storage):
     """Handler for access to database.
 
     Attributes:
@@ -117,19 +345,123 @@ class DBConnector:
             logger.debug(f'Creating path to database file \'{path}\'.')
             os.mkdir(path)
         self.conn = sqlite3.connect(db_filepath)
+        self._in_transaction = False
         self._execute(SQL_CREATE_MEDIA_TABLE)
         self._execute(SQL_CREATE_SONGS_TABLE)
         self._execute(SQL_CREATE_SHOWS_TABLE)
         self._execute(SQL_CREATE_MATCH_SHOW_TABLE)
         self._execute(SQL_CREATE_MATCH_OTHER_TABLE)
+        self._execute(SQL_CREATE_RUNS_TABLE)
+        self._add_column('runs', 'run_type', 'text NOT NULL DEFAULT \'fetch\'')
+        self._execute(SQL_CREATE_CHANGES_TABLE)
+        self._execute(SQL_CREATE_EXPORTS_TABLE)
+        self._add_column('exports', 'playlist_name', 'text')
+        self._execute(SQL_CREATE_PLAYLISTS_TABLE)
+        self._create_track_availability_table()
+        self._execute(SQL_CREATE_SEARCH_CACHE_TABLE)
+        for sql in SQL_CREATE_STAGING_TABLES:
+            self._execute(sql)
+        self._create_artist_tables()
+        self._create_fts_tables()
+        for sql in SQL_CREATE_INDICES:
+            self._execute(sql)
         logger.debug(f'Database client {self} successfully initialized using file \'{db_filepath}\'.')
 
+    def _create_artist_tables(self) -> None:
+        """Creates the normalized artist tables.
+
+        Note:
+            If the tables are created for an already populated database, they
+            are filled once from the artists recorded in the `songs` table.
+        """
+        cursor = self._execute('SELECT name FROM sqlite_master WHERE type="table" AND name="artists"')
+        exists = bool(cursor.fetchall())
+        self._execute(SQL_CREATE_ARTISTS_TABLE)
+        self._execute(SQL_CREATE_SONG_ARTISTS_TABLE)
+        if not exists:
+            rows = self._execute('SELECT id, artists FROM songs').fetchall()
+            with self._transaction():
+                self._link_artists(rows)
+            logger.debug(f'Linked artists of {len(rows)} existing songs.')
+
+    def _create_track_availability_table(self) -> None:
+        """Creates the cache of track availability.
+
+        Note:
+            A cache created before availability was cached per market is
+            dropped, as the market its checks were made for is unknown.
+        """
+        columns = [x[1] for x in self._execute('PRAGMA table_info(track_availability)').fetchall()]
+        if columns and 'market' not in columns:
+            self._execute('DROP TABLE track_availability')
+            logger.debug('Dropped cache of track availability without markets.')
+        self._execute(SQL_CREATE_TRACK_AVAILABILITY_TABLE)
+
+    def _add_column(self, table: str, column: str, definition: str) -> None:
+        """Adds a column to a table created before the column existed.
+
+        Note:
+            Existing rows get the column's default, e.g. `NULL` for the
+            `playlist_name` of exports (the playlist of the whole media) and
+            `fetch` for the `run_type` of runs.
+
+        Args:
+            table: Name of the table.
+            column: Name of the column.
+            definition: Type and constraints of the column.
+        """
+        columns = [x[1] for x in self._execute(f'PRAGMA table_info({table})').fetchall()]
+        if column not in columns:
+            self._execute(f'ALTER TABLE {table} ADD COLUMN {column} {definition}')
+            logger.debug(f'Added column \'{column}\' to table \'{table}\'.')
+
+    def _create_fts_tables(self) -> None:
+        """Creates the full-text indices and the triggers keeping them in sync.
+
+        Note:
+            Indices created for an already populated database are rebuilt from
+            their content tables once, afterwards the triggers take over.
+        """
+        for table, sql in [('songs_fts', SQL_CREATE_SONGS_FTS_TABLE),
+                           ('media_fts', SQL_CREATE_MEDIA_FTS_TABLE)]:
+            cursor = self._execute(f'SELECT name FROM sqlite_master WHERE type="table" AND name="{table}"')
+            exists = bool(cursor.fetchall())
+            self._execute(sql)
+            if not exists:
+                self._execute(f'INSERT INTO {table}({table}) VALUES(\'rebuild\')')
+                logger.debug(f'Built full-text index \'{table}\' from existing content.')
+        for sql in SQL_CREATE_FTS_TRIGGERS:
+            self._execute(sql)
+
+    @contextmanager
+    def _transaction(self) -> Iterator[None]:
+        """Context in which all executed SQL is committed at once on exit.
+
+        Note:
+            Rolls back all changes made within the context if an exception
+            is raised. Nested contexts join the outermost transaction.
+        """
+        if self._in_transaction:
+            yield
+            return
+        self._in_transaction = True
+        try:
+            yield
+            self.conn.commit()
+            stats.count('db.commits')
+        except BaseException:
+            self.conn.rollback()
+            raise
+        finally:
+            self._in_transaction = False
+
     def _execute(self, sql: str, params: Optional[Iterable] = ()) -> sqlite3.Cursor:
         """Executes and commits given SQL and returns Cursor object.
 
         Note:
             A commit on any SQL that is not an insert is a no-op (see sqlite3
-                docs).
+                docs). Within `_transaction` the commit is deferred to the end
+                of the transaction.
 
         Args:
             sql: SQL statement to be executed.
@@ -143,223 +475,291 @@ class DBConnector:
             sqlite3.Error: Any Exception in sqlite3.
         """
         try:
-            cursor = self.conn.execute(sql, params)
-            self.conn.commit()
-            logger.debug(f'Executed \'{flatten_multiline_string(sql)}\'.')
+            with stats.timer('db.execute'):
+                cursor = self.conn.execute(sql, params)
+                if not self._in_transaction:
+                    self.conn.commit()
+                    stats.count('db.commits')
+            stats.count('db.statements')
+            if logger.isEnabledFor(logging.DEBUG):
+                logger.debug('Executed \'%s\'.', flatten_multiline_string(sql))
             return cursor
         except sqlite3.Error as e:
             log_and_raise(logger, e, '')
 
-    def insert_json_data(self, data: dict) -> None:
+    def _executemany(self, sql: str, params: Iterable[Iterable]) -> sqlite3.Cursor:
+        """Executes given SQL for each parameter set, see `_execute`.
+
+        Args:
+            sql: SQL statement to be executed.
+            params: Iterable of parameter lists, one per execution.
+
+        Returns:
+            Sqlite3 Cursor object.
+
+        Raises:
+            sqlite3.Error: Any Exception in sqlite3.
+        """
+        try:
+            with stats.timer('db.executemany'):
+                cursor = self.conn.executemany(sql, params)
+                if not self._in_transaction:
+                    self.conn.commit()
+                    stats.count('db.commits')
+            stats.count('db.statements')
+            if logger.isEnabledFor(logging.DEBUG):
+                logger.debug('Executed many \'%s\'.', flatten_multiline_string(sql))
+            return cursor
+        except sqlite3.Error as e:
+            log_and_raise(logger, e, '')
+
+    def _select_in(self, sql: str, values: List, params: Optional[List] = ()) -> List[tuple]:
+        """Runs a query with an `IN` clause over arbitrarily many values.
+
+        Args:
+            sql: SQL statement with a single `{}` placeholder for the
+                parenthesized list of SQL parameters.
+            values: Values bound to the `IN` clause. Queried in chunks to stay
+                below SQLite's limit on the number of parameters.
+            params: Further SQL parameters, bound before the `IN` clause.
+                Optional, defaults to empty tuple.
+
+        Returns:
+            Concatenated result rows of all chunks.
+        """
+        rows = []
+        for i in range(0, len(values), _IN_CHUNK_SIZE):
+            chunk = values[i:i + _IN_CHUNK_SIZE]
+            rows.extend(self._execute(sql.format(','.join('?' * len(chunk))), [*params, *chunk]).fetchall())
+        return rows
+
+    def insert_json_data(self, data: dict) -> int:
         """Inserts data from nested dictionary into database.
 
         Note:
             Schema of the nested dictionary is assumed. This is bad style.
+            All rows are inserted in bulk within a single transaction. Rows
+            that already exist are kept. The ingest is recorded as new run
+            along with the episodes, songs and matches it added.
 
         Args:
             data: Nested dictionary holding data to be inserted into database.
+                May hold key `last_updated` (Unix time stamp in seconds) to
+                record a scraping date other than now.
+
+        Returns:
+            Primary key of the run in runs table.
         """
-        media_prim_key = self._insert_media(media_name=data['media_name'],
-                                            media_type=data['media_type'],
-                                            readable_name=data['readable_name'])
-        if data['media_type'] == MediaType.SHOW:
-            epsids = []
-            song_prim_keys = []
-            # add new songs to songs:
-            for s in data['seasons']:
-                e_ids = []
-                song_s_prim_keys = []
-                for e in s['episodes']:
-                    song_e_prim_keys = []
-                    e_ids.append(e['id'])
-                    for song in e['songs']:
-                        song_prim_key = self._insert_song(song_name=song['name'],
-                                                          artists=song['artists'],
-                                                          tunefind_id=song['id'],
-                                                          spotify_uri=song['spotify'])
-                        song_e_prim_keys.append(song_prim_key)
-                    song_s_prim_keys.append(song_e_prim_keys)
-                epsids.append(e_ids)
-                song_prim_keys.append(song_s_prim_keys)
-            # use returned ids to reference songs in songs table
-            show_prim_keys = self._insert_show(media_foreign_key=media_prim_key, episode_ids=epsids)
-            # update references in match_show
-            for i in range(len(song_prim_keys)):
-                for j in range(len(song_prim_keys[i])):
-                    for k in range(len(song_prim_keys[i][j])):
-                        self._insert_match(x_foreign_key=show_prim_keys[i][j],
-                                           song_foreign_key=song_prim_keys[i][j][k],
-                                           media_type=data['media_type'])
-        else:
-            # add new songs to songs:
-            song_prim_keys = []
-            for song in data['songs']:
-                song_prim_key = self._insert_song(song_name=song['name'],
-                                                  artists=song['artists'],
-                                                  tunefind_id=song['id'],
-                                                  spotify_uri=song['spotify'])
-                song_prim_keys.append(song_prim_key)
-            # update references in match_other
-            for i in range(len(song_prim_keys)):
-                self._insert_match(x_foreign_key=media_prim_key,
-                                   song_foreign_key=song_prim_keys[i],
-                                   media_type=data['media_type'])
+        with self._transaction():
+            media_prim_key = self._insert_media(media_name=data['media_name'],
+                                                media_type=data['media_type'],
+                                                readable_name=data['readable_name'],
+                                                last_updated=data.get('last_updated'))
+            run_prim_key = self._execute('INSERT INTO runs(media_id,timestamp) VALUES(?,?)',
+                                         [media_prim_key, int(datetime.now().timestamp())]).lastrowid
+            if data['media_type'] == MediaType.SHOW:
+                episodes = [(s + 1, e + 1, episode)
+                            for s, season in enumerate(data['seasons'])
+                            for e, episode in enumerate(season['episodes'])]
+                song_prim_keys = self._insert_songs([song for *_, episode in episodes for song in episode['songs']])
+                episode_prim_keys = self._insert_episodes(media_foreign_key=media_prim_key,
+                                                          episodes=[(s, e, episode['id'])
+                                                                    for s, e, episode in episodes],
+                                                          run_foreign_key=run_prim_key)
+                self._insert_matches([(episode_prim_keys[(s, e)], song_prim_keys[song['id']])
+                                      for s, e, episode in episodes
+                                      for song in episode['songs']],
+                                     media_foreign_key=media_prim_key,
+                                     media_type=data['media_type'],
+                                     run_foreign_key=run_prim_key)
+            else:
+                song_prim_keys = self._insert_songs(data['songs'])
+                self._insert_matches([(media_prim_key, song_prim_keys[song['id']]) for song in data['songs']],
+                                     media_foreign_key=media_prim_key,
+                                     media_type=data['media_type'],
+                                     run_foreign_key=run_prim_key)
+        logger.debug(f'Recorded ingest of \'{data["media_name"]}\' as run {run_prim_key}.')
+        return run_prim_key
 
     def _insert_media(self,
                       media_name: str,
                       media_type: MediaType,
-                      readable_name: str) -> int:
+                      readable_name: str,
+                      last_updated: Optional[int] = None) -> int:
         """Inserts new media entry (if not exists) into media table.
 
+        Note:
+            The scraping date of an existing entry is bumped to `last_updated`
+            unless the entry was scraped more recently already.
+
         Args:
             media_name: Name of media to be inserted in media table.
             media_type: Type of media to be inserted in media table.
             readable_name: A readable name of media.
+            last_updated: Unix time stamp in seconds of scraping date.
+                Optional, defaults to `None` in which case the current time is
+                used.
 
         Returns:
             Primary key of entry in media table.
         """
+        if last_updated is None:
+            last_updated = int(datetime.now().timestamp())
         if self.media_exists(media_name):
             cursor = self._execute(f'SELECT * FROM media WHERE media_name=="{media_name}"')
             rows = cursor.fetchall()
             key = rows[0][0]
+            self._execute('UPDATE media SET last_updated=MAX(last_updated,?) WHERE id==?', [last_updated, key])
             logger.debug(f'Song with `media_name` \'{media_name}\' '
                          f'already exists in `media` table for primary key \'{key}\'.')
         else:
             cursor = self._execute(
                     'INSERT INTO media(media_name,media_type,readable_name,last_updated) VALUES(?,?,?,?)',
-                    [media_name, media_type, readable_name, int(datetime.now().timestamp())])
+                    [media_name, media_type, readable_name, last_updated])
             key = cursor.lastrowid
             logger.debug(f'Inserted media with `media_name` \'{media_name}\' '
                          f'into `media` table (primary key \'{key}\').')
         return key
 
-    def _insert_song(self,
-                     song_name: str,
-                     artists: str,
-                     tunefind_id: int,
-                     spotify_uri: str) -> int:
-        """Inserts new song entry (if not exists) into songs table.
+    def _insert_songs(self, songs: List[dict]) -> Dict[int, int]:
+        """Inserts new song entries (if not exist) into songs table.
+
+        Note:
+            Newly inserted songs are added to the full-text index and their
+            artists are linked in bulk as well.
 
         Args:
-            song_name: Name of the song.
-            artists: String of comma-separated artist names.
-            tunefind_id: The unique id of the song on Tunefind.
-            spotify_uri: The URI of the song on Spotify.
+            songs: List of dictionaries with keys `id` (Tunefind ID), `name`,
+                `artists` (string of comma-separated artist names) and
+                `spotify` (Spotify URI). Duplicates are inserted only once.
 
         Returns:
-            Primary key of entry in songs table.
+            Mapping of Tunefind ID to primary key of entry in songs table.
         """
-        cursor = self._execute(f'SELECT * FROM songs WHERE tunefind_id=="{tunefind_id}"')
-        rows = cursor.fetchall()
-        assert len(rows) <= 1, rows  # There should be at most one result as the Tunefind ID are unique.
-        if rows:
-            key = rows[0][0]
-            logger.debug(f'Song with `tunefind_id` \'{tunefind_id}\' '
-                         f'already exists in `songs` table for primary key \'{key}\'.')
-        else:
-            cursor = self._execute('INSERT INTO songs(song_name,artists,tunefind_id,spotify_uri) VALUES(?,?,?,?)',
-                                   [song_name, artists, tunefind_id, spotify_uri])
-            key = cursor.lastrowid
-            logger.debug(f'Inserted song with `tunefind_id` \'{tunefind_id}\' '
-                         f'into `songs` table (primary key \'{key}\').')
-        return key
+        songs = list({song['id']: song for song in songs}.values())
+        existing = {x[0] for x in self._select_in('SELECT tunefind_id FROM songs WHERE tunefind_id IN ({})',
+                                                  [song['id'] for song in songs])}
+        new_songs = [song for song in songs if song['id'] not in existing]
+        max_key = self._execute('SELECT IFNULL(MAX(id), 0) FROM songs').fetchone()[0]
+        self._executemany('INSERT INTO songs(song_name,artists,tunefind_id,spotify_uri) VALUES(?,?,?,?)',
+                          [(song['name'], song['artists'], song['id'], song['spotify']) for song in new_songs])
+        self._execute('INSERT INTO songs_fts(rowid, song_name, artists) SELECT id, song_name, artists FROM songs '
+                      'WHERE id>?', [max_key])
+        keys = dict(self._select_in('SELECT tunefind_id, id FROM songs WHERE tunefind_id IN ({})',
+                                    [song['id'] for song in songs]))
+        self._link_artists([(keys[song['id']], song['artists']) for song in new_songs])
+        logger.debug(f'Inserted {len(new_songs)} new songs into `songs` table '
+                     f'({len(songs) - len(new_songs)} already existed).')
+        return keys
 
-    def _insert_show(self,
-                     media_foreign_key: int,
-                     episode_ids: List[List[int]]) -> List[List[int]]:
-        """Inserts new show entry (if not exists) into shows table.
+    def _link_artists(self, songs: List[Tuple[int, str]]) -> None:
+        """Inserts artists (if not exist) and references them to given songs.
+
+        Args:
+            songs: List of tuples holding primary key of the respective song
+                and the string of comma-separated artist names.
+        """
+        links = [(song_foreign_key, name) for song_foreign_key, artists in songs for name in split_artists(artists)]
+        names = list(dict.fromkeys(name for _, name in links))
+        self._executemany('INSERT OR IGNORE INTO artists(name) VALUES(?)', [(name,) for name in names])
+        # artist names are unique regardless of case
+        keys = {name.lower(): key for key, name in self._select_in('SELECT id, name FROM artists WHERE name IN ({})',
+                                                                   names)}
+        self._executemany('INSERT OR IGNORE INTO song_artists(song_id,artist_id) VALUES(?,?)',
+                          [(song_foreign_key, keys[name.lower()]) for song_foreign_key, name in links])
+
+    def _insert_episodes(self,
+                         media_foreign_key: int,
+                         episodes: List[Tuple[int, int, int]],
+                         run_foreign_key: int) -> Dict[Tuple[int, int], int]:
+        """Inserts new episode entries (if not exist) into shows table.
+
+        Note:
+            Episodes that did not exist before are recorded as changes of the
+            given run.
 
         Args:
             media_foreign_key: Primary key of respective media in media table.
-            episode_ids: Nested list of unique Tunefind ids for each episode.
-                First axis iterates over seasons, second over the episodes in
-                each season.
+            episodes: List of tuples of season number, episode number (both
+                starting at 1) and unique Tunefind id for each episode.
+            run_foreign_key: Primary key of the run of the ingest.
 
         Returns:
-            List of primary keys of entry in show table wrt. to season order.
-        """
-        keys = []
-        for s, e_ids in enumerate(episode_ids):
-            eps_keys = []
-            for e, e_id in enumerate(e_ids):
-                cursor = self._execute(f"""SELECT *
-                                           FROM shows
-                                           WHERE media_id=="{media_foreign_key}"
-                                           AND season=="{s+1}"
-                                           AND episode=="{e+1}"
-                                       """)
-                rows = cursor.fetchall()
-                assert len(rows) <= 1  # There should be at most one result.
-                if rows:
-                    key = rows[0][0]
-                    logger.debug(f'Episode {e} (\'{e_id}\') for media \'{media_foreign_key}\' '
-                                 f'already exists in `shows` table for primary key \'{key}\'.')
-                    eps_keys.append(key)
-                else:
-                    cursor = self._execute('INSERT INTO shows(season,episode,tunefind_id,media_id) VALUES(?,?,?,?)',
-                                           [s + 1, e + 1, e_id, media_foreign_key])
-                    key = cursor.lastrowid
-                    logger.debug(f'Inserted episode with `tunefind_id` \'{e_id}\' '
-                                 f'into `shows` table (primary key \'{key}\').')
-                    eps_keys.append(key)
-            keys.append(eps_keys)
+            Mapping of season and episode number to primary key of entry in
+            shows table.
+        """
+        self._execute('DELETE FROM staged_episodes')
+        self._executemany('INSERT INTO staged_episodes(season,episode) VALUES(?,?)',
+                          [(s, e) for s, e, _ in episodes])
+        new_episodes = self._execute("""SELECT season, episode
+                                        FROM staged_episodes
+                                        EXCEPT
+                                        SELECT season, episode
+                                        FROM shows
+                                        WHERE media_id==?
+                                     """, [media_foreign_key]).fetchall()
+        self._executemany('INSERT OR IGNORE INTO shows(season,episode,tunefind_id,media_id) VALUES(?,?,?,?)',
+                          [(s, e, e_id, media_foreign_key) for s, e, e_id in episodes])
+        cursor = self._execute('SELECT season, episode, id FROM shows WHERE media_id==?', [media_foreign_key])
+        keys = {(s, e): key for s, e, key in cursor.fetchall()}
+        self._executemany('INSERT INTO changes(run_id,change_type,episode_id) VALUES(?,\'episode\',?)',
+                          [(run_foreign_key, keys[x]) for x in sorted(new_episodes)])
         return keys
 
-    def _insert_match(self,
-                      x_foreign_key: int,
-                      song_foreign_key: int,
-                      media_type: MediaType) -> int:
-        """Inserts match entry into match_show or match_other table.
+    def _insert_matches(self,
+                        matches: List[Tuple[int, int]],
+                        media_foreign_key: int,
+                        media_type: MediaType,
+                        run_foreign_key: int) -> None:
+        """Inserts match entries (if not exist) into match_show or match_other.
+
+        Note:
+            Prior to insertion, songs new to the media and, for shows, matches
+            that did not exist before are recorded as changes of the given run.
+            Both are determined as set difference of the staged matches and the
+            existing ones.
 
         Args:
-            x_foreign_key: Primary key of either media (media table) or episode
-                (show table) to which the song will be referenced. Dependent on
-                media type.
-            song_foreign_key: Primary key of the respective song.
+            matches: List of tuples of primary key of either media (media
+                table) or episode (shows table) and primary key of the song
+                referenced to it. Dependent on media type.
+            media_foreign_key: Primary key of respective media in media table.
             media_type: Type of the media. Required to distinguish table in
                 which to insert the match data.
-
-        Returns:
-            Primary key of entry in corresponding match table.
+            run_foreign_key: Primary key of the run of the ingest.
         """
+        self._execute('DELETE FROM staged_matches')
+        self._executemany('INSERT INTO staged_matches(x_id,song_id) VALUES(?,?)', matches)
+        params = {'run': run_foreign_key, 'media': media_foreign_key}
         if media_type == MediaType.SHOW:
-            cursor = self._execute(f"""SELECT *
-                                       FROM match_show
-                                       WHERE episode_id=="{x_foreign_key}"
-                                       AND song_id=="{song_foreign_key}"
-                                   """)
-            rows = cursor.fetchall()
-            assert len(rows) <= 1  # There should be at most one result.
-            if rows:
-                key = rows[0][0]
-                logger.debug(f'Match (\'{x_foreign_key}\', \'{song_foreign_key}\') '
-                             f'already exists in table `match_show` for primary key \'{key}\'.')
-            else:
-                cursor = self._execute('INSERT INTO match_show(episode_id,song_id) VALUES(?,?)',
-                                       [x_foreign_key, song_foreign_key])
-                key = cursor.lastrowid
-                logger.debug(f'Inserted match (\'{x_foreign_key}\', \'{song_foreign_key}\') '
-                             f'into `match_show` table (primary key \'{key}\').')
+            self._execute("""INSERT INTO changes(run_id,change_type,song_id)
+                             SELECT :run, 'song', song_id
+                             FROM (SELECT song_id FROM staged_matches
+                                   EXCEPT
+                                   SELECT match_show.song_id
+                                   FROM match_show
+                                   JOIN shows ON shows.id=match_show.episode_id
+                                   WHERE shows.media_id==:media)
+                          """, params)
+            self._execute("""INSERT INTO changes(run_id,change_type,episode_id,song_id)
+                             SELECT :run, 'match', x_id, song_id
+                             FROM staged_matches
+                             WHERE NOT EXISTS (SELECT 1 FROM match_show
+                                               WHERE match_show.episode_id==staged_matches.x_id
+                                               AND match_show.song_id==staged_matches.song_id)
+                             GROUP BY x_id, song_id
+                          """, params)
+            sql = 'INSERT OR IGNORE INTO match_show(episode_id,song_id) SELECT x_id, song_id FROM staged_matches'
         else:
-            cursor = self._execute(f"""SELECT *
-                                       FROM match_other
-                                       WHERE media_id=="{x_foreign_key}"
-                                       AND song_id=="{song_foreign_key}"
-                                   """)
-            rows = cursor.fetchall()
-            assert len(rows) <= 1  # There should be at most one result.
-            if rows:
-                key = rows[0][0]
-                logger.debug(f'Match (\'{x_foreign_key}\', \'{song_foreign_key}\') '
-                             f'already exists in table `match_other` for primary key \'{key}\'.')
-            else:
-                cursor = self._execute('INSERT INTO match_other(media_id,song_id) VALUES(?,?)',
-                                       [x_foreign_key, song_foreign_key])
-                key = cursor.lastrowid
-                logger.debug(f'Inserted match (\'{x_foreign_key}\', \'{song_foreign_key}\') '
-                             f'into `match_other` table (primary key \'{key}\').')
-        return key
+            self._execute("""INSERT INTO changes(run_id,change_type,song_id)
+                             SELECT :run, 'song', song_id
+                             FROM (SELECT song_id FROM staged_matches
+                                   EXCEPT
+                                   SELECT song_id FROM match_other WHERE media_id==:media)
+                          """, params)
+            sql = 'INSERT OR IGNORE INTO match_other(media_id,song_id) SELECT x_id, song_id FROM staged_matches'
+        cursor = self._execute(sql)
+        logger.debug(f'Inserted {cursor.rowcount} new matches for {media_type}.')
 
     def get_track_uris_media(self, media_name: str) -> List[str]:
         """Retrieves song URIs from database referencing to given media name.
@@ -425,6 +825,455 @@ class DBConnector:
         rows = cursor.fetchall()
         return [x[0] for x in rows if x[0]]
 
+    def get_track_uris_by_episode(self, media_name: str) -> Dict[Tuple[int, int], List[str]]:
+        """Retrieves song URIs of given show grouped by episode in a single query.
+
+        Args:
+            media_name: Name of the media.
+
+        Returns:
+            Dictionary mapping tuples of season and episode number (starting at
+            1) to song URIs, ordered by season and episode. Episodes without
+            song URIs are omitted.
+        """
+        cursor = self._execute("""SELECT shows.season, shows.episode, songs.spotify_uri
+                                  FROM shows
+                                  JOIN media ON media.id=shows.media_id
+                                  JOIN match_show ON match_show.episode_id=shows.id
+                                  JOIN songs ON songs.id=match_show.song_id
+                                  WHERE media.media_name==? AND songs.spotify_uri IS NOT NULL
+                                  ORDER BY shows.season, shows.episode, match_show.id
+                               """, [media_name])
+        episodes = {}
+        for season, episode, uri in cursor.fetchall():
+            if uri:
+                episodes.setdefault((int(season), int(episode)), []).append(uri)
+        return episodes
+
+    def search(self, query: str, limit: Optional[int] = 20) -> List[Dict[str, Optional[str]]]:
+        """Full-text search over song names, artists and readable media names.
+
+        Note:
+            Every word of the query must match (as prefix) for a hit. Songs are
+            reported once for each media they appear in. Hits on media come
+            first, followed by hits on songs, each ranked by relevance (bm25)
+            within their own index. The scores of both indexes depend on the
+            statistics of their own table and are not comparable.
+
+        Args:
+            query: Search terms.
+            limit: Maximum number of hits returned. Optional, defaults to 20.
+
+        Returns:
+            List of hits as dictionaries with keys `media_name`,
+            `readable_name`, `song_name`, `artists` and `spotify_uri`. The song
+            related values are `None` for hits on the media itself.
+        """
+        fts_query = _fts_query(query)
+        if not fts_query:
+            return []
+        cursor = self._execute(SQL_SEARCH, {'query': fts_query, 'limit': limit})
+        keys = ['media_name', 'readable_name', 'song_name', 'artists', 'spotify_uri']
+        return [dict(zip(keys, row)) for row in cursor.fetchall()]
+
+    def get_media_for_artist(self, artist: str) -> List[str]:
+        """Retrieves names of all media in which songs of given artist appear.
+
+        Args:
+            artist: Name of the artist (case-insensitive).
+
+        Returns:
+            List of media names.
+        """
+        cursor = self._execute("""SELECT media.media_name
+                                  FROM artists
+                                  JOIN song_artists ON song_artists.artist_id=artists.id
+                                  JOIN match_other ON match_other.song_id=song_artists.song_id
+                                  JOIN media ON media.id=match_other.media_id
+                                  WHERE artists.name==?
+                                  UNION
+                                  SELECT media.media_name
+                                  FROM artists
+                                  JOIN song_artists ON song_artists.artist_id=artists.id
+                                  JOIN match_show ON match_show.song_id=song_artists.song_id
+                                  JOIN shows ON shows.id=match_show.episode_id
+                                  JOIN media ON media.id=shows.media_id
+                                  WHERE artists.name==?
+                               """, [artist, artist])
+        return [x[0] for x in cursor.fetchall()]
+
+    def get_songs_for_artist(self, artist: str) -> List[Dict[str, str]]:
+        """Retrieves all songs of given artist.
+
+        Args:
+            artist: Name of the artist (case-insensitive).
+
+        Returns:
+            List of songs as dictionaries with keys `song_name`, `artists` and
+            `spotify_uri`.
+        """
+        cursor = self._execute("""SELECT songs.song_name, songs.artists, songs.spotify_uri
+                                  FROM artists
+                                  JOIN song_artists ON song_artists.artist_id=artists.id
+                                  JOIN songs ON songs.id=song_artists.song_id
+                                  WHERE artists.name==?
+                                  ORDER BY songs.id
+                               """, [artist])
+        keys = ['song_name', 'artists', 'spotify_uri']
+        return [dict(zip(keys, row)) for row in cursor.fetchall()]
+
+    def get_media_names(self) -> List[str]:
+        """Retrieves names of all media in the database.
+
+        Returns:
+            List of media names in order of insertion.
+        """
+        cursor = self._execute('SELECT media_name FROM media ORDER BY id')
+        return [x[0] for x in cursor.fetchall()]
+
+    def get_json_data(self, media_name: str) -> dict:
+        """Retrieves all data of given media as nested dictionary.
+
+        Note:
+            Inverse of `insert_json_data`, i.e. the returned dictionary has the
+            same schema as the scraped data plus key `last_updated`.
+
+        Args:
+            media_name: Name of the media.
+
+        Returns:
+            Nested dictionary holding data of the media.
+        """
+        cursor = self._execute('SELECT id, media_type, readable_name, last_updated FROM media WHERE media_name==?',
+                               [media_name])
+        media_key, media_type, readable_name, last_updated = cursor.fetchone()
+        data = dict(media_name=media_name,
+                    media_type=MediaType(int(media_type)),
+                    readable_name=readable_name,
+                    last_updated=int(last_updated))
+        song_keys = ['id', 'name', 'spotify', 'artists']
+        if data['media_type'] == MediaType.SHOW:
+            data['seasons'] = []
+            episodes = self._execute("""SELECT id, season, tunefind_id
+                                        FROM shows
+                                        WHERE media_id==?
+                                        ORDER BY season, episode
+                                     """, [media_key]).fetchall()
+            songs = self._execute("""SELECT match_show.episode_id, songs.tunefind_id, songs.song_name,
+                                            songs.spotify_uri, songs.artists
+                                     FROM match_show
+                                     JOIN shows ON shows.id=match_show.episode_id
+                                     JOIN songs ON songs.id=match_show.song_id
+                                     WHERE shows.media_id==?
+                                     ORDER BY match_show.id
+                                  """, [media_key]).fetchall()
+            episode_songs = {}
+            for episode_key, *song in songs:
+                episode_songs.setdefault(episode_key, []).append(dict(zip(song_keys, song)))
+            for episode_key, season, tunefind_id in episodes:
+                while len(data['seasons']) < season:
+                    s = len(data['seasons']) + 1
+                    data['seasons'].append(dict(name=f'Season {s}', id=f'season/{s}', episodes=[]))
+                episodes_ = data['seasons'][season - 1]['episodes']
+                episodes_.append(dict(name=f'Episode {len(episodes_) + 1}',
+                                      id=tunefind_id,
+                                      songs=episode_songs.get(episode_key, [])))
+        else:
+            songs = self._execute("""SELECT songs.tunefind_id, songs.song_name, songs.spotify_uri, songs.artists
+                                     FROM match_other
+                                     JOIN songs ON songs.id=match_other.song_id
+                                     WHERE match_other.media_id==?
+                                     ORDER BY match_other.id
+                                  """, [media_key]).fetchall()
+            data['songs'] = [dict(zip(song_keys, song)) for song in songs]
+        return data
+
+    def get_run_changes(self, run_id: int) -> Dict[str, int]:
+        """Counts the changes recorded for given run by type.
+
+        Args:
+            run_id: Primary key of the run.
+
+        Returns:
+            Mapping of change type (`episode`, `song`, `match`) to count.
+        """
+        cursor = self._execute('SELECT change_type, COUNT(*) FROM changes WHERE run_id==? GROUP BY change_type',
+                               [run_id])
+        return {**{'episode': 0, 'song': 0, 'match': 0}, **dict(cursor.fetchall())}
+
+    def has_changes(self,
+                    media_name: str,
+                    since_run: Optional[int] = None,
+                    episodes: Optional[Collection[Tuple[int, int]]] = None) -> bool:
+        """Checks whether any run of given media added data.
+
+        Note:
+            Changes of songs that are not tied to an episode (e.g. songs linked
+            to Spotify by `set_spotify_uris`) count for each episode in which
+            the song appears.
+
+        Args:
+            media_name: Name of the media.
+            since_run: Only consider runs after the run with this primary key.
+                Optional, defaults to `None` in which case all runs are
+                considered.
+            episodes: Only consider changes of these episodes, given as tuples
+                of season and episode number (starting at 1). Optional,
+                defaults to `None` in which case changes of the whole media
+                are considered.
+
+        Returns:
+            True, if any changes were recorded, else False.
+        """
+        if episodes is not None:
+            return not self._get_changed_episodes(media_name, since_run).isdisjoint(episodes)
+        cursor = self._execute("""SELECT 1
+                                  FROM changes
+                                  JOIN runs ON runs.id=changes.run_id
+                                  JOIN media ON media.id=runs.media_id
+                                  WHERE media.media_name==? AND changes.run_id>?
+                                  LIMIT 1
+                               """, [media_name, since_run or 0])
+        return bool(cursor.fetchall())
+
+    def _get_changed_episodes(self, media_name: str, since_run: Optional[int] = None) -> Set[Tuple[int, int]]:
+        """Retrieves season and episode numbers of episodes of given show that
+        runs (after run `since_run`) changed, see `has_changes`."""
+        cursor = self._execute("""SELECT shows.season, shows.episode
+                                  FROM changes
+                                  JOIN runs ON runs.id=changes.run_id
+                                  JOIN media ON media.id=runs.media_id
+                                  JOIN shows ON shows.id=changes.episode_id
+                                  WHERE media.media_name==? AND changes.run_id>?
+                                  UNION
+                                  SELECT shows.season, shows.episode
+                                  FROM changes
+                                  JOIN runs ON runs.id=changes.run_id
+                                  JOIN media ON media.id=runs.media_id
+                                  JOIN match_show ON match_show.song_id=changes.song_id
+                                  JOIN shows ON shows.id=match_show.episode_id AND shows.media_id=media.id
+                                  WHERE media.media_name==? AND changes.run_id>?
+                                      AND changes.episode_id IS NULL
+                               """, [media_name, since_run or 0] * 2)
+        return {(int(season), int(episode)) for season, episode in cursor.fetchall()}
+
+    def get_new_track_uris(self, media_name: str, since_run: Optional[int] = None) -> List[str]:
+        """Retrieves URIs of songs that runs of given media added to it.
+
+        Args:
+            media_name: Name of the media.
+            since_run: Only consider runs after the run with this primary key.
+                Optional, defaults to `None` in which case all runs are
+                considered.
+
+        Returns:
+            List of distinct song URIs in order of their addition.
+        """
+        cursor = self._execute("""SELECT songs.spotify_uri
+                                  FROM changes
+                                  JOIN runs ON runs.id=changes.run_id
+                                  JOIN media ON media.id=runs.media_id
+                                  JOIN songs ON songs.id=changes.song_id
+                                  WHERE media.media_name==? AND changes.run_id>? AND changes.change_type=='song'
+                                  ORDER BY changes.id
+                               """, [media_name, since_run or 0])
+        # songs linked by matching are changes of both the fetch and the match
+        return list(dict.fromkeys(x[0] for x in cursor.fetchall() if x[0]))
+
+    def record_export(self, media_name: str, playlist_name: Optional[str] = None) -> None:
+        """Records that the latest run of given media was exported.
+
+        Args:
+            media_name: Name of the media.
+            playlist_name: Name of the playlist exported to, if not the
+                playlist of the whole media (e.g. a season playlist).
+                Optional, defaults to `None`.
+        """
+        self._execute("""INSERT INTO exports(media_id,run_id,timestamp,playlist_name)
+                         SELECT media.id, MAX(runs.id), ?, ?
+                         FROM media
+                         JOIN runs ON runs.media_id=media.id
+                         WHERE media.media_name==?
+                         GROUP BY media.id
+                      """, [int(datetime.now().timestamp()), playlist_name, media_name])
+
+    def get_last_exported_run(self, media_name: str, playlist_name: Optional[str] = None) -> Optional[int]:
+        """Retrieves the latest run of given media that was exported.
+
+        Args:
+            media_name: Name of the media.
+            playlist_name: Name of the playlist exported to, if not the
+                playlist of the whole media. Optional, defaults to `None`.
+
+        Returns:
+            Primary key of the run or `None` if the media was never exported
+            to the playlist.
+        """
+        cursor = self._execute("""SELECT MAX(exports.run_id)
+                                  FROM exports
+                                  JOIN media ON media.id=exports.media_id
+                                  WHERE media.media_name==? AND exports.playlist_name IS ?
+                               """, [media_name, playlist_name])
+        return cursor.fetchone()[0]
+
+    def get_playlist_state(self, name: str) -> Optional[PlaylistState]:
+        """Retrieves the mirrored state of a playlist on Spotify.
+
+        Args:
+            name: Name of the playlist.
+
+        Returns:
+            State of the playlist as of the last export or `None` if the
+            playlist was never exported.
+        """
+        row = self._execute('SELECT playlist_id, snapshot_id, description, track_uris FROM playlists WHERE name==?',
+                            [name]).fetchone()
+        if row is None:
+            return None
+        playlist_id, snapshot_id, description, track_uris = row
+        return PlaylistState(playlist_id=playlist_id,
+                             snapshot_id=snapshot_id,
+                             name=name,
+                             description=description,
+                             track_uris=json.loads(track_uris))
+
+    def set_playlist_state(self, state: PlaylistState) -> None:
+        """Stores the state of a playlist on Spotify, replacing the previous one.
+
+        Args:
+            state: State of the playlist.
+        """
+        self._execute('INSERT OR REPLACE INTO playlists(name,playlist_id,snapshot_id,description,track_uris) '
+                      'VALUES(?,?,?,?,?)',
+                      [state.name, state.playlist_id, state.snapshot_id, state.description,
+                       json.dumps(state.track_uris, separators=(',', ':'))])
+
+    def get_unmatched_songs(self, media_name: Optional[str] = None) -> List[Dict[str, str]]:
+        """Retrieves songs without Spotify URI.
+
+        Args:
+            media_name: Name of the media to restrict the songs to. Optional,
+                defaults to `None` in which case all songs are considered.
+
+        Returns:
+            List of songs as dictionaries with keys `tunefind_id`, `song_name`
+            and `artists`, in order of insertion.
+        """
+        if media_name is None:
+            cursor = self._execute("SELECT tunefind_id, song_name, artists FROM songs WHERE spotify_uri=='' "
+                                   "ORDER BY id")
+        else:
+            cursor = self._execute("""SELECT songs.tunefind_id, songs.song_name, songs.artists
+                                      FROM songs
+                                      WHERE songs.spotify_uri=='' AND songs.id IN (
+                                          SELECT match_show.song_id
+                                          FROM match_show
+                                          JOIN shows ON shows.id=match_show.episode_id
+                                          JOIN media ON media.id=shows.media_id
+                                          WHERE media.media_name==:name
+                                          UNION
+                                          SELECT match_other.song_id
+                                          FROM match_other
+                                          JOIN media ON media.id=match_other.media_id
+                                          WHERE media.media_name==:name)
+                                      ORDER BY songs.id
+                                   """, {'name': media_name})
+        keys = ['tunefind_id', 'song_name', 'artists']
+        return [dict(zip(keys, row)) for row in cursor.fetchall()]
+
+    def set_spotify_uris(self, uris: Dict[int, str]) -> None:
+        """Sets the Spotify URIs of songs that have none.
+
+        Note:
+            The songs linked are recorded as changes of a run of type `match`
+            per media they belong to, so that they count as changes since the
+            last export of the media (see `has_changes` and
+            `get_new_track_uris`).
+
+        Args:
+            uris: Spotify URIs by Tunefind ID of the songs.
+        """
+        with self._transaction():
+            songs = self._select_in("SELECT id, tunefind_id FROM songs WHERE spotify_uri=='' AND tunefind_id IN ({})",
+                                    list(uris))
+            self._executemany('UPDATE songs SET spotify_uri=? WHERE id==?', [(uris[x], key) for key, x in songs])
+            song_keys = sorted(key for key, _ in songs)
+            media = {}
+            for sql in ["""SELECT shows.media_id, match_show.song_id
+                           FROM match_show
+                           JOIN shows ON shows.id=match_show.episode_id
+                           WHERE match_show.song_id IN ({})
+                        """,
+                        'SELECT media_id, song_id FROM match_other WHERE song_id IN ({})']:
+                for media_key, song_key in self._select_in(sql, song_keys):
+                    media.setdefault(media_key, set()).add(song_key)
+            timestamp = int(datetime.now().timestamp())
+            for media_key, keys in media.items():
+                run_key = self._execute('INSERT INTO runs(media_id,timestamp,run_type) VALUES(?,?,\'match\')',
+                                        [media_key, timestamp]).lastrowid
+                self._executemany('INSERT INTO changes(run_id,change_type,song_id) VALUES(?,\'song\',?)',
+                                  [(run_key, x) for x in sorted(keys)])
+        logger.debug(f'Linked {len(songs)} songs of {len(media)} media to Spotify.')
+
+    def get_search_cache(self, queries: List[str]) -> Dict[str, Tuple[Optional[str], float]]:
+        """Retrieves cached results of searches on Spotify.
+
+        Args:
+            queries: Search queries.
+
+        Returns:
+            Tuples of the best track URI found (`None` if nothing was found)
+            and its score by query, for the queries in cache.
+        """
+        rows = self._select_in('SELECT query, spotify_uri, score FROM search_cache WHERE query IN ({})',
+                               list(dict.fromkeys(queries)))
+        return {query: (uri, score) for query, uri, score in rows}
+
+    def set_search_cache(self, results: Dict[str, Tuple[Optional[str], float]]) -> None:
+        """Caches results of searches on Spotify, see `get_search_cache`.
+
+        Args:
+            results: Tuples of the best track URI found and its score by query.
+        """
+        self._executemany('INSERT OR REPLACE INTO search_cache(query,spotify_uri,score) VALUES(?,?,?)',
+                          [(query, uri, score) for query, (uri, score) in results.items()])
+
+    def get_track_availability(self,
+                               track_uris: List[str],
+                               market: Optional[str] = None,
+                               max_age: Optional[int] = None) -> Dict[str, bool]:
+        """Retrieves the cached availability of tracks on Spotify.
+
+        Args:
+            track_uris: URIs of the tracks.
+            market: Market the tracks were checked for, see
+                `SpotifyClient.check_availability`. Optional, defaults to
+                `None` in which case checks without market are retrieved.
+            max_age: Maximal age of a check in seconds. Optional, defaults to
+                `None` in which case checks never expire.
+
+        Returns:
+            Availability by URI of the tracks checked within `max_age`.
+        """
+        oldest = 0 if max_age is None else int(datetime.now().timestamp()) - max_age
+        rows = self._select_in('SELECT spotify_uri, available, checked FROM track_availability '
+                               'WHERE market==? AND spotify_uri IN ({})', list(dict.fromkeys(track_uris)),
+                               params=[market or ''])
+        return {uri: bool(available) for uri, available, checked in rows if checked >= oldest}
+
+    def set_track_availability(self, availability: Dict[str, bool], market: Optional[str] = None) -> None:
+        """Caches the availability of tracks on Spotify as checked now.
+
+        Args:
+            availability: Availability by URI of the tracks.
+            market: Market the tracks were checked for. Optional, defaults to
+                `None`.
+        """
+        now = int(datetime.now().timestamp())
+        self._executemany('INSERT OR REPLACE INTO track_availability(spotify_uri,market,available,checked) '
+                          'VALUES(?,?,?,?)',
+                          [(uri, market or '', int(available), now) for uri, available in availability.items()])
+
     def media_exists(self, media_name) -> bool:
         """Checks whether or not the media exists in the database.
 
@@ -482,21 +1331,17 @@ class DBConnector:
         rows = cursor.fetchall()
         return int(rows[0][0])
 
-    def get_playlist_description(self, media_name: str) -> str:
-        """Creates playlist description for given media name.
+    def __del__(self) -> None:
+        self.conn.close()
 
-        Args:
-            media_name: Name of the media.
 
-        Returns:
-            Description as format string of Tunefind link + scraping date
-        """
-        description_format = 'sourced from: https://www.tunefind.com/{}/{} | last-updated: {}'
-        media_type = self.get_media_type(media_name)
-        last_updated = self.get_last_updated(media_name)
-        date_str = datetime.strftime(datetime.fromtimestamp(last_updated), '%Y-%m-%d %H:%M:%S')
-        x = description_format.format(media_type.name.lower(), media_name, date_str)
-        return x
+def _fts_query(query: str) -> str:
+    """Translates free text into an FTS5 query of quoted prefix terms.
 
-    def __del__(self) -> None:
-        self.conn.close()
+    Args:
+        query: Free text as entered by the user.
+
+    Returns:
+        FTS5 query string, empty if the query does not hold any words.
+    """
+    return ' '.join(f'"{x}"*' for x in re.findall(r'\w+', query))
@@ -0,0 +1,182 @@
+"""Matching of songs without Spotify link by searching Spotify.
+
+Tunefind does not link every song to Spotify and some links fail to resolve.
+Such songs are stored without Spotify URI and thereby never exported. This
+module searches Spotify by song name and artists for them and accepts the best
+result if its similarity to the song reaches a threshold.
+
+The matching runs as a separate stage over the songs in storage that have no
+Spotify URI. Searches run concurrently in a bounded pool of worker threads and
+their results, including searches that found nothing, are cached in storage
+per query. Results are written in chunks as they complete, so that an
+interrupted run resumes where it stopped and each song is searched only once.
+Songs whose name consists of punctuation only are not searched but cached as
+not found.
+Songs linked are recorded as changes of the media they belong to, so that
+exports with `skip_unchanged` or `delta` pick them up.
+
+Attributes:
+    MATCH_THRESHOLD (float): Default minimal score of a match between 0 and 1.
+    MATCH_WORKERS (int): Default number of concurrent searches.
+    CHECKPOINT_SIZE (int): Number of searches after which results are written
+        to storage.
+    NAME_WEIGHT (float): Weight of the similarity of the song name in the
+        score, the remainder weighs the similarity of the artists.
+"""
+
+import re
+
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from dataclasses import dataclass
+from difflib import SequenceMatcher
+from typing import Dict, List, Optional, Tuple
+
+from tunefind2spotify.core.spotify_client import SpotifyClient
+from tunefind2spotify.core.storage import Storage, split_artists
+from tunefind2spotify.log import fetch_logger
+
+
+logger = fetch_logger(__name__)
+
+MATCH_THRESHOLD = 0.8
+MATCH_WORKERS = 4
+CHECKPOINT_SIZE = 50
+NAME_WEIGHT = 0.6
+
+
+@dataclass
+class MatchReport:
+    """Dataclass to hold the outcome of a matching run.
+
+    Args:
+        songs: Number of songs without Spotify URI considered.
+        searched: Number of searches sent to Spotify, the others were cached.
+        matched: Number of songs a Spotify URI was set for.
+        failed: Number of searches that failed.
+    """
+
+    songs: int = 0
+    searched: int = 0
+    matched: int = 0
+    failed: int = 0
+
+
+def _normalize(text: str) -> str:
+    """Lowercases text and strips parenthesized or bracketed parts and
+    punctuation."""
+    text = re.sub(r'\(.*?\)|\[.*?]|\bfeat\..*', ' ', text.lower())
+    return ' '.join(re.findall(r'\w+', text))
+
+
+def build_query(song_name: str, artists: str) -> str:
+    """Builds the Spotify search query for a song.
+
+    Args:
+        song_name: Name of the song.
+        artists: Comma-separated artists of the song.
+
+    Returns:
+        Query restricting the track name and first artist. Both are quoted,
+        so that the field filters apply to all of their words.
+    """
+    artist = next(iter(split_artists(artists)), '')
+    query = f'track:"{_normalize(song_name)}"'
+    return f'{query} artist:"{_normalize(artist)}"' if artist else query
+
+
+def score(song_name: str, artists: str, candidate: Dict[str, str]) -> float:
+    """Scores the similarity of a search result to a song.
+
+    Args:
+        song_name: Name of the song.
+        artists: Comma-separated artists of the song.
+        candidate: Track as returned by `SpotifyClient.search_tracks`.
+
+    Returns:
+        Weighted similarity of names and artists between 0 and 1.
+    """
+    name_ratio = SequenceMatcher(None, _normalize(song_name), _normalize(candidate['name'])).ratio()
+    artists_ratio = max((SequenceMatcher(None, _normalize(x), _normalize(y)).ratio()
+                         for x in split_artists(artists) for y in split_artists(candidate['artists'])),
+                        default=0.0)
+    return NAME_WEIGHT * name_ratio + (1 - NAME_WEIGHT) * artists_ratio
+
+
+def best_match(song_name: str, artists: str, candidates: List[Dict[str, str]]) -> Tuple[Optional[str], float]:
+    """Finds the search result most similar to a song.
+
+    Returns:
+        Tuple of the URI of the best candidate (`None` if there are none) and
+        its score.
+    """
+    scored = [(score(song_name, artists, x), x['uri']) for x in candidates]
+    best_score, uri = max(scored, key=lambda x: x[0], default=(0.0, None))
+    return uri, best_score
+
+
+def match_songs(dbc: Storage,
+                spc: SpotifyClient,
+                media_name: Optional[str] = None,
+                threshold: Optional[float] = MATCH_THRESHOLD,
+                workers: Optional[int] = MATCH_WORKERS) -> MatchReport:
+    """Searches Spotify for the songs in storage that have no Spotify URI.
+
+    Args:
+        dbc: Storage holding the songs and the search cache.
+        spc: Client to search with.
+        media_name: Name of the media to restrict the songs to. Optional,
+            defaults to `None` in which case all songs are considered.
+        threshold: Minimal score of a match between 0 and 1. Optional, defaults
+            to `MATCH_THRESHOLD`.
+        workers: Maximal number of concurrent searches. Optional, defaults to
+            `MATCH_WORKERS`.
+
+    Returns:
+        Report of the run.
+    """
+    songs = dbc.get_unmatched_songs(media_name)
+    queries = {}
+    for song in songs:
+        queries.setdefault(build_query(song['song_name'], song['artists']), []).append(song)
+    results = dbc.get_search_cache(list(queries))
+    report = MatchReport(songs=len(songs))
+    # a bare field filter would match arbitrary tracks
+    unsearchable = {x: (None, 0.0) for x, group in queries.items()
+                    if x not in results and not _normalize(group[0]['song_name'])}
+    if unsearchable:
+        logger.info(f'Skipping search for {len(unsearchable)} songs without searchable name.')
+        dbc.set_search_cache(unsearchable)
+        results.update(unsearchable)
+
+    def apply(batch: Dict[str, Tuple[Optional[str], float]]) -> None:
+        uris = {song['tunefind_id']: uri for query, (uri, best) in batch.items() if uri and best >= threshold
+                for song in queries[query]}
+        dbc.set_spotify_uris(uris)
+        report.matched += len(uris)
+
+    def checkpoint(batch: Dict[str, Tuple[Optional[str], float]]) -> None:
+        dbc.set_search_cache(batch)
+        apply(batch)
+
+    apply(results)
+    pending = [x for x in queries if x not in results]
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        futures = {executor.submit(spc.search_tracks, x): x for x in pending}
+        batch = {}
+        for future in as_completed(futures):
+            query = futures[future]
+            report.searched += 1
+            try:
+                candidates = future.result()
+            except Exception as e:
+                # not cached, so that the search is repeated on the next run
+                logger.warning(f'Search for \'{query}\' failed: {e!r}')
+                report.failed += 1
+                continue
+            song = queries[query][0]
+            batch[query] = best_match(song['song_name'], song['artists'], candidates)
+            if len(batch) >= CHECKPOINT_SIZE:
+                checkpoint(batch)
+                batch = {}
+        checkpoint(batch)
+    return report
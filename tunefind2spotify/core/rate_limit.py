@@ -0,0 +1,324 @@
+"""Rate limiting of calls to the Spotify API.
+
+This module defines a wrapper around a `spotipy` client that passes each call
+through a token bucket shared by all threads using the wrapper. Throttled calls
+(HTTP 429) pause the bucket for the duration given by the `Retry-After` header
+(in seconds or as HTTP date, at most `MAX_RETRY_AFTER` seconds) and lower its
+rate, which then recovers additively with each successful call.
+Transient failures (HTTP 5xx, connection errors and timeouts) are retried with
+jittered exponential backoff. Metrics are recorded per endpoint, i.e. per name
+of the method called.
+
+Calls modifying data without being idempotent (`UNSAFE_METHODS`, e.g. adding
+items to a playlist) are only retried when throttled, as Spotify did not
+process a throttled request. After any other failure, Spotify may have applied
+the call already, so that a retry could e.g. add tracks twice. Such failures
+are raised for the caller to check the actual state (see `is_ambiguous`).
+
+Attributes:
+    DEFAULT_RATE (float): Default maximal number of calls per second.
+    DEFAULT_BURST (int): Default number of calls that may be made at once.
+    MIN_RATE (float): Rate that the bucket is never lowered below.
+    MAX_RETRIES (int): Default number of retries of a failing call.
+    BASE_BACKOFF (float): Default backoff in seconds before the first retry.
+    MAX_BACKOFF (float): Default upper bound of backoff in seconds.
+    MAX_RETRY_AFTER (float): Maximal pause in seconds after being throttled,
+        however long `Retry-After` asks to wait.
+    RETRY_STATUS (Set[int]): HTTP status codes of transient failures.
+    UNSAFE_METHODS (Set[str]): Names of methods of `spotipy.Spotify` that are
+        not retried after failures other than throttling.
+"""
+
+import email.utils
+import math
+import random
+import threading
+import time
+
+from dataclasses import dataclass
+from datetime import datetime, timezone
+from typing import Any, Callable, Optional
+
+from requests.exceptions import ConnectionError, Timeout
+from spotipy import SpotifyException
+
+from tunefind2spotify import stats
+from tunefind2spotify.log import fetch_logger
+
+
+logger = fetch_logger(__name__)
+
+DEFAULT_RATE = 10.0
+DEFAULT_BURST = 20
+MIN_RATE = 0.5
+MAX_RETRIES = 5
+BASE_BACKOFF = 0.5
+MAX_BACKOFF = 30.0
+MAX_RETRY_AFTER = 60.0
+RETRY_STATUS = {429, 500, 502, 503, 504}
+UNSAFE_METHODS = {'playlist_add_items',
+                  'playlist_remove_specific_occurrences_of_items',
+                  'playlist_reorder_items',
+                  'user_playlist_create'}
+
+
+def is_ambiguous(exception: BaseException) -> bool:
+    """Checks whether a failed call may nevertheless have been applied by Spotify.
+
+    Args:
+        exception: Exception the call failed with.
+
+    Returns:
+        True in case of connection errors, timeouts and transient server errors,
+        False e.g. for throttling and client errors.
+    """
+    if isinstance(exception, SpotifyException):
+        return exception.http_status in RETRY_STATUS - {429}
+    return isinstance(exception, (ConnectionError, Timeout))
+
+
+def parse_retry_after(value: Optional[str]) -> Optional[float]:
+    """Parses the `Retry-After` header, given in seconds or as HTTP date.
+
+    Args:
+        value: Value of the header.
+
+    Returns:
+        Seconds to wait (0 for dates in the past) or `None` if the header is
+        missing or malformed.
+    """
+    if not value:
+        return None
+    try:
+        seconds = float(value)
+    except ValueError:
+        try:
+            date = email.utils.parsedate_to_datetime(value)
+        except (TypeError, ValueError):
+            return None
+        if date.tzinfo is None:
+            date = date.replace(tzinfo=timezone.utc)
+        seconds = (date - datetime.now(timezone.utc)).total_seconds()
+    return max(0.0, seconds) if math.isfinite(seconds) else None
+
+
+class TokenBucket:
+    """Thread-safe token bucket with adaptive rate.
+
+    Attributes:
+        rate (float): Current number of tokens added per second.
+        max_rate (float): Rate that the bucket recovers to.
+        burst (int): Maximal number of tokens held.
+    """
+
+    def __init__(self,
+                 rate: Optional[float] = DEFAULT_RATE,
+                 burst: Optional[int] = DEFAULT_BURST,
+                 clock: Optional[Callable[[], float]] = time.monotonic,
+                 sleep: Optional[Callable[[float], None]] = time.sleep) -> None:
+        """Initializes a full bucket.
+
+        Args:
+            rate: Maximal number of tokens added per second. Optional, defaults
+                to `DEFAULT_RATE`.
+            burst: Maximal number of tokens held. Optional, defaults to
+                `DEFAULT_BURST`.
+            clock: Monotonic clock in seconds. Optional, defaults to
+                `time.monotonic`.
+            sleep: Function to wait for given seconds. Optional, defaults to
+                `time.sleep`.
+        """
+        self.rate = self.max_rate = float(rate)
+        self.burst = burst
+        self._clock = clock
+        self._sleep = sleep
+        self._tokens = float(burst)
+        self._last = clock()
+        self._paused_until = 0.0
+        self._lock = threading.Lock()
+
+    def acquire(self) -> float:
+        """Takes a token, waiting until one is available.
+
+        Returns:
+            Seconds waited.
+        """
+        waited = 0.0
+        while True:
+            with self._lock:
+                now = self._clock()
+                self._tokens = min(self.burst, self._tokens + (now - self._last) * self.rate)
+                self._last = now
+                # tolerance guards against waits below the clock's resolution
+                if now >= self._paused_until and self._tokens >= 1 - 1e-6:
+                    self._tokens = max(0.0, self._tokens - 1)
+                    return waited
+                wait = max(self._paused_until - now, (1 - self._tokens) / self.rate)
+            self._sleep(wait)
+            waited += wait
+
+    def throttle(self, pause: float) -> None:
+        """Pauses handing out tokens and halves the rate after being throttled.
+
+        Args:
+            pause: Seconds during which no token is handed out.
+        """
+        with self._lock:
+            now = self._clock()
+            self._paused_until = max(self._paused_until, now + pause)
+            self._tokens = 0.0
+            self.rate = max(MIN_RATE, self.rate / 2)
+        logger.warning(f'Rate limited, pausing for {pause:.1f}s and lowering rate to {self.rate:.2f}/s.')
+
+    def recover(self) -> None:
+        """Raises the rate by a tenth of the maximal rate after a successful call."""
+        if self.rate < self.max_rate:
+            with self._lock:
+                self.rate = min(self.max_rate, self.rate + self.max_rate / 10)
+
+
+@dataclass
+class EndpointMetrics:
+    """Dataclass to hold metrics of calls to an endpoint.
+
+    Args:
+        calls: Number of requests made, including retries.
+        retries: Number of requests retried.
+        throttled: Number of requests answered with HTTP 429.
+        failures: Number of calls that failed after all retries.
+        seconds: Total seconds spent, including waiting for tokens.
+    """
+
+    calls: int = 0
+    retries: int = 0
+    throttled: int = 0
+    failures: int = 0
+    seconds: float = 0.0
+
+
+class RateLimitedClient:
+    """Wrapper of a client object that rate limits and retries its method calls.
+
+    Note:
+        Attributes that are not callable are passed through unchanged.
+
+    Attributes:
+        client: Wrapped client object.
+        bucket (TokenBucket): Budget shared by all calls.
+        metrics (Dict[str, EndpointMetrics]): Metrics per method name.
+    """
+
+    def __init__(self,
+                 client: Any,
+                 bucket: Optional[TokenBucket] = None,
+                 max_retries: Optional[int] = MAX_RETRIES,
+                 base_backoff: Optional[float] = BASE_BACKOFF,
+                 max_backoff: Optional[float] = MAX_BACKOFF,
+                 sleep: Optional[Callable[[float], None]] = time.sleep) -> None:
+        """Wraps the client.
+
+        Args:
+            client: Client object to be wrapped, usually `spotipy.Spotify`.
+            bucket: Token bucket to share. Optional, defaults to `None` in which
+                case a new bucket with default rate is used.
+            max_retries: Number of retries of a failing call. Optional,
+                defaults to `MAX_RETRIES`.
+            base_backoff: Backoff in seconds before the first retry. Optional,
+                defaults to `BASE_BACKOFF`.
+            max_backoff: Upper bound of backoff in seconds. Optional, defaults
+                to `MAX_BACKOFF`.
+            sleep: Function to wait for given seconds. Optional, defaults to
+                `time.sleep`.
+        """
+        self.client = client
+        self.bucket = bucket or TokenBucket()
+        self.metrics = {}
+        self._max_retries = max_retries
+        self._base_backoff = base_backoff
+        self._max_backoff = max_backoff
+        self._sleep = sleep
+        self._lock = threading.Lock()
+
+    def __getattr__(self, name: str) -> Any:
+        attr = getattr(self.client, name)
+        if not callable(attr):
+            return attr
+
+        def call(*args, **kwargs):
+            return self._call(name, attr, *args, **kwargs)
+        return call
+
+    def _record(self, name: str, **deltas) -> None:
+        """Adds given values to the metrics of an endpoint."""
+        with self._lock:
+            metrics = self.metrics.setdefault(name, EndpointMetrics())
+            for key, value in deltas.items():
+                setattr(metrics, key, getattr(metrics, key) + value)
+
+    def _backoff(self, attempt: int) -> float:
+        """Full jitter exponential backoff in seconds for given attempt."""
+        return random.uniform(0, min(self._max_backoff, self._base_backoff * 2 ** attempt))
+
+    def _pause(self, exception: SpotifyException, attempt: int) -> float:
+        """Seconds to pause after being throttled, as asked by `Retry-After`
+        (capped at `MAX_RETRY_AFTER`) or else by backoff."""
+        seconds = parse_retry_after((exception.headers or {}).get('Retry-After'))
+        if seconds is None:
+            return self._backoff(attempt)
+        if seconds > MAX_RETRY_AFTER:
+            logger.warning(f'Spotify asks to wait {seconds:.0f}s before retrying, waiting {MAX_RETRY_AFTER:.0f}s.')
+            return MAX_RETRY_AFTER
+        return seconds
+
+    def _call(self, name: str, func: Callable, *args, **kwargs) -> Any:
+        """Calls function within rate limit, retrying transient failures.
+
+        Note:
+            Methods in `UNSAFE_METHODS` are only retried when throttled.
+
+        Raises:
+            SpotifyException: In case the call failed with a non-transient
+                status or all retries failed.
+            ConnectionError: In case the connection failed on all retries.
+            Timeout: In case the request timed out on all retries.
+        """
+        start = time.perf_counter()
+        unsafe = name in UNSAFE_METHODS
+        try:
+            for attempt in range(self._max_retries + 1):
+                self.bucket.acquire()
+                self._record(name, calls=1)
+                try:
+                    result = func(*args, **kwargs)
+                except SpotifyException as e:
+                    if e.http_status not in RETRY_STATUS or attempt == self._max_retries or \
+                            (unsafe and e.http_status != 429):
+                        self._record(name, failures=1)
+                        raise
+                    if e.http_status == 429:
+                        self._record(name, throttled=1)
+                        self.bucket.throttle(self._pause(e, attempt))
+                    else:
+                        self._sleep(self._backoff(attempt))
+                    logger.debug('Retrying \'%s\' after HTTP %s (attempt %d).', name, e.http_status, attempt + 1)
+                except (ConnectionError, Timeout) as e:
+                    if attempt == self._max_retries or unsafe:
+                        self._record(name, failures=1)
+                        raise
+                    self._sleep(self._backoff(attempt))
+                    logger.debug('Retrying \'%s\' after %s (attempt %d).', name, type(e).__name__, attempt + 1)
+                else:
+                    self.bucket.recover()
+                    return result
+                self._record(name, retries=1)
+                stats.count('spotify.retries')
+        finally:
+            seconds = time.perf_counter() - start
+            self._record(name, seconds=seconds)
+            stats.record(f'spotify.{name}', seconds)
+
+    def log_metrics(self) -> None:
+        """Logs the metrics per endpoint at debug level."""
+        for name, x in sorted(self.metrics.items()):
+            logger.debug(f'Endpoint \'{name}\': {x.calls} calls, {x.retries} retries, {x.throttled} throttled, '
+                         f'{x.failures} failures, {x.seconds:.2f}s.')
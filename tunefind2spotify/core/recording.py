@@ -0,0 +1,119 @@
+"""Recording and replaying of HTTP responses.
+
+Transport adapters of `requests`, to be mounted on a session:
+
+- `RecordingAdapter` passes requests on to the adapter it wraps and stores
+  every response in a directory.
+- `ReplayAdapter` answers requests with the responses stored in a directory,
+  without any network access. Requests without stored response fail with
+  `requests.ConnectionError`.
+
+Every hop of a redirect chain is a request of its own and hence stored
+separately, so that redirects are followed on replay just as when recording.
+Each response is stored as JSON file named after a hash of method and URL,
+holding method, URL, status, reason, the headers in `HEADERS` and the body.
+Bodies are only kept for JSON responses; others (e.g. the web pages forward
+links finally redirect to) are replayed empty. A request made repeatedly is
+stored with its latest response.
+
+Attributes:
+    HEADERS (Tuple[str]): Headers of responses that are stored.
+"""
+
+import hashlib
+import io
+import json
+import os
+import threading
+
+from typing import Optional
+
+import requests
+
+from requests.adapters import BaseAdapter, HTTPAdapter
+from urllib3 import HTTPResponse
+
+from tunefind2spotify.exceptions import log_and_raise
+from tunefind2spotify.log import fetch_logger
+
+
+logger = fetch_logger(__name__)
+
+HEADERS = ('Content-Type', 'Location', 'Retry-After')
+
+
+def _path(directory: str, method: str, url: str) -> str:
+    """Returns the path of the file storing the response to a request."""
+    return os.path.join(directory, hashlib.sha1(f'{method} {url}'.encode()).hexdigest()[:20] + '.json')
+
+
+class RecordingAdapter(BaseAdapter):
+    """Transport adapter storing every response of the adapter it wraps."""
+
+    def __init__(self, directory: str, adapter: BaseAdapter) -> None:
+        """Prepares recording into a directory, which is created if missing.
+
+        Args:
+            directory: Directory to store responses in.
+            adapter: Adapter sending the requests, e.g. the one mounted on the
+                session before.
+        """
+        super().__init__()
+        os.makedirs(directory, exist_ok=True)
+        self.directory = directory
+        self.adapter = adapter
+
+    def send(self, request: requests.PreparedRequest, **kwargs) -> requests.Response:
+        response = self.adapter.send(request, **kwargs)
+        is_json = 'json' in response.headers.get('Content-Type', '')
+        record = {'method': request.method,
+                  'url': request.url,
+                  'status': response.status_code,
+                  'reason': response.reason,
+                  'headers': {x: response.headers[x] for x in HEADERS if x in response.headers},
+                  'body': response.content.decode('utf-8') if is_json else ''}
+        path = _path(self.directory, request.method, request.url)
+        # requests may be made concurrently, never leave a partial file behind
+        temp = f'{path}.{threading.get_ident()}.tmp'
+        with open(temp, 'w') as f:
+            json.dump(record, f)
+        os.replace(temp, path)
+        logger.debug('Recorded response %s for %s %s.', response.status_code, request.method, request.url)
+        return response
+
+    def close(self) -> None:
+        self.adapter.close()
+
+
+class ReplayAdapter(HTTPAdapter):
+    """Transport adapter answering with stored responses instead of the network."""
+
+    def __init__(self, directory: str) -> None:
+        """Prepares replaying from a directory.
+
+        Args:
+            directory: Directory written by a `RecordingAdapter`.
+
+        Raises:
+            FileNotFoundError: In case the directory does not exist.
+        """
+        super().__init__()
+        if not os.path.isdir(directory):
+            log_and_raise(logger, FileNotFoundError, f'Directory of recorded responses \'{directory}\' does not exist.')
+        self.directory = directory
+
+    def send(self, request: requests.PreparedRequest, stream: Optional[bool] = False, **kwargs) -> requests.Response:
+        path = _path(self.directory, request.method, request.url)
+        if not os.path.isfile(path):
+            raise requests.ConnectionError(f'No recorded response for {request.method} {request.url}.',
+                                           request=request)
+        with open(path) as f:
+            record = json.load(f)
+        body = record['body'].encode('utf-8')
+        raw = HTTPResponse(body=io.BytesIO(body),
+                           headers={**record['headers'], 'Content-Length': str(len(body))},
+                           status=record['status'],
+                           reason=record['reason'],
+                           preload_content=False,
+                           decode_content=False)
+        return self.build_response(request, raw)
@@ -11,21 +11,56 @@ authenticate the client class against Spotify. At first usage, the client must
 be authenticated manually via the redirect URI. Afterwards, the access token is
 refreshed automatically and cached in `PROJECT_DIR/.cache`.
 
+Attributes:
+    ADD_ITEMS_LIMIT (int): Maximal number of tracks added to a playlist per
+        request.
+    PLAYLIST_ITEMS_LIMIT (int): Maximal number of playlist items read per
+        request.
+    REMOVE_ITEMS_LIMIT (int): Maximal number of tracks removed from a playlist
+        per request.
+    TRACKS_LIMIT (int): Maximal number of tracks looked up per request.
+    SEARCH_LIMIT (int): Number of tracks returned per search.
+    TRACK_URI_PATTERN (re.Pattern): Format of a valid Spotify track URI.
+    USER_PLAYLISTS_LIMIT (int): Maximal number of the user's playlists read
+        per request.
+    USER_PLAYLISTS_WORKERS (int): Number of threads reading pages of the
+        user's playlists in parallel.
 """
 
+import bisect
+import logging
+import math
+import re
+import threading
+
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
 from dataclasses import dataclass
-from typing import List, Optional
+from typing import Dict, Iterator, List, Optional, Set, Tuple
 
 from spotipy import Spotify
 from spotipy.oauth2 import SpotifyOAuth
 from tqdm import tqdm
 
+from tunefind2spotify import trace
+from tunefind2spotify.core.rate_limit import is_ambiguous, RateLimitedClient
+from tunefind2spotify.core.storage import PlaylistState
+from tunefind2spotify.exceptions import log_and_raise, PlaylistModified
 from tunefind2spotify.log import fetch_logger
 from tunefind2spotify.utils import singleton
 
 
 logger = fetch_logger(__name__)
 
+ADD_ITEMS_LIMIT = 100
+PLAYLIST_ITEMS_LIMIT = 100
+REMOVE_ITEMS_LIMIT = 100
+TRACKS_LIMIT = 50
+SEARCH_LIMIT = 5
+TRACK_URI_PATTERN = re.compile(r'spotify:track:[0-9A-Za-z]{22}')
+USER_PLAYLISTS_LIMIT = 50
+USER_PLAYLISTS_WORKERS = 8
+
 
 @dataclass
 class SpotifyCredentials:
@@ -57,114 +92,554 @@ class SpotifyCredentials:
         return self.__repr__()
 
 
+@dataclass
+class ExportResult:
+    """Dataclass to hold the outcome of exporting a playlist.
+
+    Args:
+        state: State of the playlist after the export.
+        added: Number of tracks added to the playlist.
+        removed: Number of tracks removed from the playlist.
+    """
+
+    state: PlaylistState
+    added: int = 0
+    removed: int = 0
+
+
 @singleton
 class SpotifyClient:
     """Client that exposes relevant interface to Spotify.
 
+    Note:
+        An index of the current user's playlists by name and the user's id are
+        read once and kept for the lifetime of the client. Playlists created by
+        the client are added to the index. Changes made elsewhere are only
+        picked up after calling `invalidate_playlist_index`. Exports may run
+        concurrently from multiple threads, exports to playlists of the same
+        name run one after the other.
+
     Attributes:
-        client (spotipy.client.Spotify): Spotipy client object.
+        client (RateLimitedClient): Spotipy client object wrapped to be rate
+            limited and to retry transient failures.
     """
 
+    _index_lock = threading.Lock()
+    _playlist_locks = {}  # playlist name -> [lock, number of threads holding or waiting for it]
+    _playlist_locks_lock = threading.Lock()
+
     def __init__(self, credentials: SpotifyCredentials) -> None:
         """Initializes the Spotify client with authentication data.
 
+        Note:
+            Since the class is a singleton, the spotipy client and the playlist
+            index are only recreated if the credentials changed.
+
         Args:
             credentials: Spotify credentials object.
         """
-        self.client = Spotify(oauth_manager=SpotifyOAuth(
+        if getattr(self, '_credentials', None) == credentials:
+            logger.debug(f'Spotify client {self} already initialized with given credentials.')
+            return
+        # retries are handled by the rate limiting wrapper instead of spotipy
+        client = Spotify(oauth_manager=SpotifyOAuth(
                     client_id=credentials.client_id,
                     client_secret=credentials.client_secret,
                     redirect_uri=credentials.redirect_uri,
                     scope=['playlist-modify-private',
                            'playlist-read-private']
-                )
+                ),
+                retries=0,
+                status_retries=0,
+                status_forcelist=()
         )
+        trace.install(client._session)
+        self.client = RateLimitedClient(client)
+        self._credentials = credentials
+        self.invalidate_playlist_index()
         logger.debug(f'Spotify client {self} successfully initialized and authenticated.')
 
+    def invalidate_playlist_index(self) -> None:
+        """Drops the cached playlist index and user id to be read again on next use."""
+        self._playlist_index = None
+        self._user_id = None
+
     def export(self,
                playlist_name: str,
                track_uris: List[str],
-               description: Optional[str] = '') -> str:
+               description: Optional[str] = '',
+               sync: Optional[bool] = False,
+               state: Optional[PlaylistState] = None) -> ExportResult:
         """Creates new public playlist with given name and track list.
 
+        Note:
+            If the playlist exists, tracks missing are appended to it. In sync
+            mode, the playlist is instead made to equal `track_uris` including
+            their order, removing all other tracks.
+
+            Given the `state` returned by the previous export, the tracks of
+            the playlist are not read if its snapshot id is still the same, and
+            name and description are only changed if they differ.
+
         Args:
             playlist_name: Name of the playlist to be created.
             track_uris: List of URIs to songs to be added to new playlist.
             description: Description of playlist to be displayed on Spotify.
                 Optional, defaults to empty string.
-
+            sync: Reconcile an existing playlist with `track_uris`. Optional,
+                defaults to False.
+            state: State of the playlist as of the previous export. Optional,
+                defaults to `None`.
 
         Returns:
-            ID of newly created playlist
+            State of the playlist after the export and numbers of tracks added
+            and removed.
         """
         logger.info(f'Exporting playlist \'{playlist_name}\' to Spotify ...')
-        # remove duplicates
+        # remove duplicates while keeping order
         len_before = len(track_uris)
-        track_uris = list(set(track_uris))
+        track_uris = list(dict.fromkeys(track_uris))
         if x := len_before - len(track_uris):
             logger.info(f'Found {x} duplicate tracks for \'{playlist_name}\' and will not export them.')
-        # create playlist
-        if not self._playlist_exists(playlist_name):
-            playlist = self.client.user_playlist_create(self.client.me()['id'],
-                                                        playlist_name,
-                                                        public=False,
-                                                        collaborative=False,
-                                                        description='')
-            playlist_id = playlist['id']
-            self.client.playlist_change_details(playlist_id,
-                                                playlist_name,
-                                                public=False,
-                                                collaborative=False,
-                                                description=description)
-            logger.info(f'Created new playlist: \'{playlist_name}\' ({playlist_id})')
-            # batch fill playlist
-            for batch_idx in tqdm(range(len(track_uris) // 50 + 1), disable=False):
-                batch = track_uris[50 * batch_idx:50 * (batch_idx + 1)]
+        # the playlist must not be created twice by concurrent exports of the same name
+        with self._playlist_lock(playlist_name):
+            if not self._playlist_exists(playlist_name):
+                playlist_id = self._create_playlist(playlist_name, description)
+                snapshot_id, remote_uris = None, []
+            else:
+                playlist_id = self._get_playlist_id(playlist_name)
+                logger.info(f'Playlist \'{playlist_name}\' ({playlist_id}) exists. Updating ...')
+                snapshot_id, remote_uris = self._get_playlist_state(playlist_id, state)
+                if state is None or (state.playlist_id, state.name, state.description) != \
+                        (playlist_id, playlist_name, description):
+                    self._change_details(playlist_id, playlist_name, description)
+                    snapshot_id = None
+            if sync:
+                snapshot_id, remote_uris, added, removed = self._sync_items(playlist_id, track_uris, snapshot_id,
+                                                                            remote_uris)
+            else:
+                existing_uris = set(remote_uris)
+                missing_uris = [x for x in track_uris if x not in existing_uris]
+                logger.info(f'{len(track_uris) - len(missing_uris)} tracks already exist in \'{playlist_name}\' '
+                            f'({playlist_id}), adding {len(missing_uris)} tracks.')
+                snapshot_id = self._add_items(playlist_id, missing_uris) or snapshot_id
+                remote_uris = remote_uris + missing_uris
+                added, removed = len(missing_uris), 0
+            state = PlaylistState(playlist_id=playlist_id,
+                                  snapshot_id=snapshot_id or self._get_snapshot_id(playlist_id),
+                                  name=playlist_name,
+                                  description=description,
+                                  track_uris=remote_uris)
+            self.client.log_metrics()
+            return ExportResult(state=state, added=added, removed=removed)
+
+    def check_availability(self,
+                           track_uris: List[str],
+                           market: Optional[str] = None) -> Dict[str, bool]:
+        """Checks which tracks exist and are playable on Spotify.
+
+        Note:
+            URIs not matching the format of track URIs are unavailable without
+            asking Spotify. The others are looked up in batches of
+            `TRACKS_LIMIT` tracks.
+
+        Args:
+            track_uris: URIs of the tracks.
+            market: ISO 3166-1 alpha-2 country code the tracks must be playable
+                in. Optional, defaults to `None` in which case tracks only need
+                to exist.
+
+        Returns:
+            Availability by URI.
+        """
+        availability = {}
+        valid = []
+        for uri in dict.fromkeys(track_uris):
+            if TRACK_URI_PATTERN.fullmatch(uri or ''):
+                valid.append(uri)
+            else:
+                availability[uri] = False
+        for i in range(0, len(valid), TRACKS_LIMIT):
+            batch = valid[i:i + TRACKS_LIMIT]
+            tracks = self.client.tracks([x.rsplit(':', 1)[1] for x in batch], market=market)['tracks']
+            for uri, track in zip(batch, tracks):
+                # with market given, relinked tracks are playable under another id
+                availability[uri] = track is not None and track.get('is_playable', True)
+        return availability
+
+    def search_tracks(self, query: str) -> List[Dict[str, str]]:
+        """Searches Spotify for tracks.
+
+        Args:
+            query: Search query, see Spotify's search API for the syntax.
+
+        Returns:
+            Up to `SEARCH_LIMIT` tracks as dictionaries with keys `uri`, `name`
+            and `artists` (comma-separated), ordered by relevance.
+        """
+        tracks = self.client.search(q=query, limit=SEARCH_LIMIT, type='track')['tracks']['items']
+        return [dict(uri=x['uri'], name=x['name'], artists=', '.join(a['name'] for a in x['artists']))
+                for x in tracks if x]
+
+    def _create_playlist(self,
+                         playlist_name: str,
+                         description: str) -> str:
+        """Creates new private playlist and adds it to the playlist index.
+
+        Args:
+            playlist_name: Name of the playlist.
+            description: Description of the playlist.
+
+        Note:
+            If creating fails such that the playlist may have been created
+            nevertheless, the user's playlists are read again and the playlist
+            is only created anew if it is missing.
+
+        Returns:
+            ID of the new playlist.
+        """
+        def create() -> str:
+            return self.client.user_playlist_create(self._get_user_id(),
+                                                    playlist_name,
+                                                    public=False,
+                                                    collaborative=False,
+                                                    description='')['id']
+
+        try:
+            playlist_id = create()
+        except Exception as e:
+            if not is_ambiguous(e):
+                raise
+            logger.warning(f'Creating playlist \'{playlist_name}\' failed ({e}), checking whether it exists.')
+            self._playlist_index = None
+            playlist_id = self._get_playlist_id(playlist_name) or create()
+        self._get_playlist_index()[playlist_name] = playlist_id
+        self._change_details(playlist_id, playlist_name, description)
+        logger.info(f'Created new playlist: \'{playlist_name}\' ({playlist_id})')
+        return playlist_id
+
+    def _change_details(self,
+                        playlist_id: str,
+                        playlist_name: str,
+                        description: str) -> None:
+        """Sets name and description of private playlist."""
+        self.client.playlist_change_details(playlist_id,
+                                            playlist_name,
+                                            public=False,
+                                            collaborative=False,
+                                            description=description)
+
+    def _sync_items(self,
+                    playlist_id: str,
+                    track_uris: List[str],
+                    snapshot_id: Optional[str],
+                    remote_uris: List[Optional[str]]) -> Tuple[Optional[str], List[str], int, int]:
+        """Makes the tracks of playlist equal to given list of (unique) URIs.
+
+        Note:
+            Tracks not in `track_uris` and duplicates are removed, missing
+            tracks appended and the result reordered with as few moves as
+            possible. If replacing all tracks takes fewer requests than these
+            operations, the playlist is replaced instead. All position based
+            operations are guarded by the playlist's snapshot id.
+
+        Args:
+            playlist_id: ID of the playlist.
+            track_uris: List of unique URIs in target order.
+            snapshot_id: Snapshot id of the playlist, `None` if unknown.
+            remote_uris: List of track URIs of the playlist as of `snapshot_id`.
+
+        Returns:
+            Snapshot id after the last modification (`None` if unknown), the
+            tracks of the playlist and the numbers of tracks added and removed.
+        """
+        target_uris = set(track_uris)
+        kept_uris, removals = {}, []
+        for position, uri in enumerate(remote_uris):
+            if uri in target_uris and uri not in kept_uris:
+                kept_uris[uri] = None
+            else:
+                removals.append((position, uri))
+        additions = [x for x in track_uris if x not in kept_uris]
+        moves = _plan_moves(list(kept_uris) + additions, track_uris)
+        cost = math.ceil(len(removals) / REMOVE_ITEMS_LIMIT) + math.ceil(len(additions) / ADD_ITEMS_LIMIT) + len(moves)
+        replace_cost = max(1, math.ceil(len(track_uris) / ADD_ITEMS_LIMIT))
+        logger.info(f'Syncing playlist ({playlist_id}): {len(removals)} removals, {len(additions)} additions, '
+                    f'{len(moves)} moves.')
+        if None in remote_uris or replace_cost < cost:
+            logger.debug(f'Replacing all tracks of playlist ({playlist_id}) with {replace_cost} requests.')
+            snapshot_id = self.client.playlist_replace_items(playlist_id, track_uris[:ADD_ITEMS_LIMIT])['snapshot_id']
+            snapshot_id = self._add_items(playlist_id, track_uris[ADD_ITEMS_LIMIT:]) or snapshot_id
+            return snapshot_id, list(track_uris), len(additions), len(removals)
+        if snapshot_id is None and (removals or moves):
+            snapshot_id = self._get_snapshot_id(playlist_id)
+        # remove from the end so that positions of preceding tracks stay valid
+        removals.reverse()
+        for batch_idx in range(0, len(removals), REMOVE_ITEMS_LIMIT):
+            batch = [dict(uri=uri, positions=[position])
+                     for position, uri in removals[batch_idx:batch_idx + REMOVE_ITEMS_LIMIT]]
+            snapshot_id = self.client.playlist_remove_specific_occurrences_of_items(
+                playlist_id, batch, snapshot_id=snapshot_id)['snapshot_id']
+        snapshot_id = self._add_items(playlist_id, additions) or snapshot_id
+        for range_start, insert_before, range_length in moves:
+            snapshot_id = self.client.playlist_reorder_items(playlist_id,
+                                                             range_start=range_start,
+                                                             insert_before=insert_before,
+                                                             range_length=range_length,
+                                                             snapshot_id=snapshot_id)['snapshot_id']
+        return snapshot_id, list(track_uris), len(additions), len(removals)
+
+    def _add_items(self,
+                   playlist_id: str,
+                   track_uris: List[str]) -> Optional[str]:
+        """Adds tracks to playlist in batches of maximal size allowed by the API.
+
+        Args:
+            playlist_id: ID of the playlist.
+            track_uris: List of URIs of tracks to be appended to the playlist.
+
+        Note:
+            If adding a batch fails such that it may have been added
+            nevertheless, the tracks of the playlist are read again and only
+            the tracks of the batch still missing are added, once.
+
+        Returns:
+            Snapshot id of the playlist after the last batch, `None` if no
+            tracks were added.
+        """
+        snapshot_id = None
+        for batch_idx in tqdm(range(0, len(track_uris), ADD_ITEMS_LIMIT), disable=False):
+            batch = track_uris[batch_idx:batch_idx + ADD_ITEMS_LIMIT]
+            if logger.isEnabledFor(logging.DEBUG):
                 for track_uri in batch:
-                    logger.debug(f'Adding track \'{track_uri}\' to playlist \'{playlist_name}\' ({playlist_id})')
-                self.client.playlist_add_items(playlist_id, batch)
-        else:
-            playlist_id = self._get_playlist_id(playlist_name)
-            logger.info(f'Playlist \'{playlist_name}\' ({playlist_id}) exists. Updating ...')
-            self.client.playlist_change_details(playlist_id,
-                                                playlist_name,
-                                                public=False,
-                                                collaborative=False,
-                                                description=description)
-
-            # single fill playlist with checks
-            for track_uri in tqdm(track_uris, disable=False):
-                if not self._item_exists_in_playlist(playlist_id, track_uri):
-                    logger.debug(f'Adding track \'{track_uri}\' to playlist \'{playlist_name}\' ({playlist_id})')
-                    self.client.playlist_add_items(playlist_id, [track_uri])
+                    logger.debug('Adding track \'%s\' to playlist (%s)', track_uri, playlist_id)
+            try:
+                snapshot_id = (self.client.playlist_add_items(playlist_id, batch) or {}).get('snapshot_id')
+            except Exception as e:
+                if not is_ambiguous(e):
+                    raise
+                logger.warning(f'Adding tracks to playlist ({playlist_id}) failed ({e}), checking which were added.')
+                present = self._get_playlist_track_uris(playlist_id)
+                if missing := [x for x in batch if x not in present]:
+                    snapshot_id = (self.client.playlist_add_items(playlist_id, missing) or {}).get('snapshot_id')
                 else:
-                    logger.debug(f'Track \'{track_uri}\' already exists in \'{playlist_name}\' ({playlist_id})')
+                    snapshot_id = self._get_snapshot_id(playlist_id)
+        return snapshot_id
 
-        return playlist_id
+    def _get_user_id(self) -> str:
+        """Retrieves id of the current user, reading it only once."""
+        if self._user_id is None:
+            self._user_id = self.client.me()['id']
+        return self._user_id
+
+    @contextmanager
+    def _playlist_lock(self, name: str) -> Iterator[None]:
+        """Serializes exports to the playlist of given name.
+
+        Note:
+            The lock of a playlist is dropped once no thread holds or waits
+            for it, so that locks do not accumulate over many playlists.
+        """
+        with self._playlist_locks_lock:
+            entry = self._playlist_locks.setdefault(name, [threading.Lock(), 0])
+            entry[1] += 1
+        try:
+            with entry[0]:
+                yield
+        finally:
+            with self._playlist_locks_lock:
+                entry[1] -= 1
+                if not entry[1]:
+                    del self._playlist_locks[name]
+
+    def _get_playlist_index(self) -> Dict[str, str]:
+        """Retrieves index of the current user's playlists, building it only once.
+
+        Returns:
+            Dictionary mapping playlist names to playlist ids.
+        """
+        with self._index_lock:
+            if self._playlist_index is None:
+                self._playlist_index = self._read_playlist_index()
+            return self._playlist_index
+
+    def _read_playlist_index(self) -> Dict[str, str]:
+        """Reads all playlists of the current user.
+
+        Note:
+            The first page yields the total number of playlists, all remaining
+            pages are then read in parallel. Of playlists with the same name,
+            the first one listed is indexed.
+
+        Returns:
+            Dictionary mapping playlist names to playlist ids.
+        """
+        limit = USER_PLAYLISTS_LIMIT
+        first_page = self.client.current_user_playlists(limit, 0)
+        pages = [first_page]
+        offsets = range(limit, first_page.get('total') or 0, limit)
+        if offsets:
+            with ThreadPoolExecutor(max_workers=USER_PLAYLISTS_WORKERS) as executor:
+                pages.extend(executor.map(lambda x: self.client.current_user_playlists(limit, x), offsets))
+        index = {}
+        for page in pages:
+            for x in page['items']:
+                index.setdefault(x['name'], x['id'])
+        logger.debug(f'Indexed {len(index)} playlists of current user.')
+        return index
 
     def _playlist_exists(self, name: str) -> bool:
-        limit, offset = 50, 0
-        while playlists := self.client.current_user_playlists(limit, offset)['items']:
-            if name in [x['name'] for x in playlists]:
-                return True
-            offset += limit
-        return False
+        return name in self._get_playlist_index()
 
     def _get_playlist_id(self, name: str) -> str:
-        limit, offset = 50, 0
-        while playlists := self.client.current_user_playlists(limit, offset)['items']:
-            for x in playlists:
-                if name == x['name']:
-                    return x['id']
-            offset += limit
-        return ''
-
-    def _item_exists_in_playlist(self,
-                                 playlist_id: str,
-                                 track_uri: str) -> bool:
-        limit, offset = 50, 0
-        while items := self.client.playlist_items(playlist_id, limit=limit, offset=offset)['items']:
-            if track_uri in [x['track']['uri'] for x in items]:
-                return True
+        return self._get_playlist_index().get(name, '')
+
+    def _get_snapshot_id(self, playlist_id: str) -> str:
+        """Retrieves the current snapshot id of playlist."""
+        return self.client.playlist(playlist_id, fields='snapshot_id')['snapshot_id']
+
+    def _get_playlist_state(self,
+                            playlist_id: str,
+                            state: Optional[PlaylistState] = None) -> Tuple[str, List[Optional[str]]]:
+        """Retrieves snapshot id and ordered track URIs of playlist.
+
+        Note:
+            If the snapshot id equals the one of the given `state`, the tracks
+            are taken from it. Otherwise, the first page of tracks is read along
+            with the snapshot id. If further pages are needed, the snapshot id
+            is read again afterwards to verify that the playlist was not
+            modified in between.
+
+        Args:
+            playlist_id: ID of the playlist.
+            state: Previously known state of the playlist. Optional, defaults
+                to `None`.
+
+        Returns:
+            Snapshot id and list of track URIs by position, `None` for
+            positions without a track.
+
+        Raises:
+            PlaylistModified: In case the playlist was modified while reading.
+        """
+        if state is not None and state.playlist_id == playlist_id:
+            snapshot_id = self._get_snapshot_id(playlist_id)
+            if snapshot_id == state.snapshot_id:
+                logger.debug(f'Playlist ({playlist_id}) unchanged since snapshot \'{snapshot_id}\'.')
+                return snapshot_id, list(state.track_uris)
+            logger.debug(f'Playlist ({playlist_id}) was modified since snapshot \'{state.snapshot_id}\'.')
+        playlist = self.client.playlist(playlist_id, fields='snapshot_id,tracks(total,items(track(uri)))')
+        snapshot_id, tracks = playlist['snapshot_id'], playlist['tracks']
+        track_uris = [(x['track'] or {}).get('uri') for x in tracks['items']]
+        if len(track_uris) < tracks['total']:
+            track_uris.extend(self._read_playlist_items(playlist_id, offset=len(track_uris)))
+            if self._get_snapshot_id(playlist_id) != snapshot_id:
+                log_and_raise(logger, PlaylistModified, f'Playlist ({playlist_id}) was modified while reading it.')
+        return snapshot_id, track_uris
+
+    def _read_playlist_items(self,
+                             playlist_id: str,
+                             offset: Optional[int] = 0) -> List[Optional[str]]:
+        """Retrieves track URIs of playlist by position, paging with maximal page size.
+
+        Args:
+            playlist_id: ID of the playlist.
+            offset: Position of first track to read. Optional, defaults to 0.
+
+        Returns:
+            List of track URIs, `None` for positions without a track.
+        """
+        track_uris = []
+        limit, total = PLAYLIST_ITEMS_LIMIT, offset + 1
+        while offset < total:
+            page = self.client.playlist_items(playlist_id,
+                                              fields='total,items(track(uri))',
+                                              limit=limit,
+                                              offset=offset)
+            track_uris.extend((x['track'] or {}).get('uri') for x in page['items'])
+            total = page['total'] if page['items'] else offset
             offset += limit
-        return False
+        return track_uris
+
+    def _get_playlist_track_uris(self, playlist_id: str) -> Set[str]:
+        """Retrieves the URIs of all tracks in playlist.
+
+        Args:
+            playlist_id: ID of the playlist.
+
+        Returns:
+            Set of track URIs in playlist.
+        """
+        return set(self._read_playlist_items(playlist_id)) - {None}
+
+
+def _longest_increasing_subsequence(values: List[int]) -> Set[int]:
+    """Finds a longest strictly increasing subsequence in O(n log n).
+
+    Args:
+        values: List of distinct integers.
+
+    Returns:
+        Set of values forming the subsequence.
+    """
+    tails, tail_idx, parents = [], [], []
+    for i, value in enumerate(values):
+        k = bisect.bisect_left(tails, value)
+        if k == len(tails):
+            tails.append(value)
+            tail_idx.append(i)
+        else:
+            tails[k] = value
+            tail_idx[k] = i
+        parents.append(tail_idx[k - 1] if k else None)
+    subsequence = set()
+    i = tail_idx[-1] if tail_idx else None
+    while i is not None:
+        subsequence.add(values[i])
+        i = parents[i]
+    return subsequence
+
+
+def _plan_moves(current: List[str], target: List[str]) -> List[Tuple[int, int, int]]:
+    """Plans the reorder operations that turn one list into a permutation of it.
+
+    Note:
+        The items of a longest subsequence already in target order stay in
+        place. Each other item is moved right behind its predecessor in target
+        order, together with any following items that are to be moved and
+        already adjacent.
+
+    Args:
+        current: List of unique items.
+        target: Permutation of `current`.
+
+    Returns:
+        List of moves as tuples `(range_start, insert_before, range_length)`
+        with positions as in the list before each move, see
+        `spotipy.Spotify.playlist_reorder_items`.
+    """
+    current = list(current)
+    rank = {x: i for i, x in enumerate(target)}
+    stable = _longest_increasing_subsequence([rank[x] for x in current])
+    moves = []
+    i = 0
+    while i < len(target):
+        if i in stable:
+            i += 1
+            continue
+        range_start = current.index(target[i])
+        j = i + 1
+        while j < len(target) and j not in stable and range_start + j - i < len(current) \
+                and current[range_start + j - i] == target[j]:
+            j += 1
+        range_length = j - i
+        insert_before = current.index(target[i - 1]) + 1 if i else 0
+        if insert_before != range_start:
+            moves.append((range_start, insert_before, range_length))
+            block = current[range_start:range_start + range_length]
+            del current[range_start:range_start + range_length]
+            if insert_before > range_start:
+                insert_before -= range_length
+            current[insert_before:insert_before] = block
+        i = j
+    return moves
@@ -0,0 +1,537 @@
+"""Storage module.
+
+This module defines the interface through which scraped data is stored and
+retrieved, independent of the storage backend. Two implementations exist:
+
+- `tunefind2spotify.core.db.DBConnector` persists the data in a local SQLite
+  database.
+
+- `InMemoryStorage` keeps the data in dictionaries and lists of the running
+  process only. It is meant for ephemeral runs (e.g. `pull` of many media) and
+  for benchmarking scraper and exporter without disk I/O.
+
+"""
+
+import re
+
+from abc import ABC, abstractmethod
+from dataclasses import dataclass, field, replace
+from datetime import datetime
+from typing import Collection, Dict, List, Optional, Set, Tuple
+
+from tunefind2spotify.exceptions import log_and_raise
+from tunefind2spotify.log import fetch_logger
+from tunefind2spotify.utils import MediaType
+
+
+logger = fetch_logger(__name__)
+
+
+@dataclass
+class PlaylistState:
+    """Dataclass to hold the state of a playlist on Spotify.
+
+    Args:
+        playlist_id: ID of the playlist.
+        snapshot_id: Snapshot id of the playlist as of this state.
+        name: Name of the playlist.
+        description: Description of the playlist.
+        track_uris: List of track URIs by position, `None` for positions
+            without a track.
+    """
+
+    playlist_id: str
+    snapshot_id: str
+    name: str
+    description: str
+    track_uris: List[Optional[str]] = field(default_factory=list)
+
+
+class Storage(ABC):
+    """Interface for storage of scraped data."""
+
+    @abstractmethod
+    def insert_json_data(self, data: dict) -> int:
+        """Inserts data from nested dictionary as returned by the scraper.
+
+        Args:
+            data: Nested dictionary holding data to be inserted. May hold key
+                `last_updated` (Unix time stamp in seconds) to record a
+                scraping date other than now. The scraping date of existing
+                media is bumped on every ingest, yet never moved backwards.
+
+        Returns:
+            Id of the run recording the ingest.
+        """
+
+    @abstractmethod
+    def get_json_data(self, media_name: str) -> dict:
+        """Retrieves all data of given media as nested dictionary.
+
+        Args:
+            media_name: Name of the media.
+
+        Returns:
+            Nested dictionary in the schema of `insert_json_data` plus key
+            `last_updated`.
+        """
+
+    @abstractmethod
+    def get_media_names(self) -> List[str]:
+        """Retrieves names of all media in order of insertion."""
+
+    @abstractmethod
+    def media_exists(self, media_name: str) -> bool:
+        """Checks whether or not the media exists."""
+
+    @abstractmethod
+    def get_media_type(self, media_name: str) -> MediaType:
+        """Retrieves the type of given media."""
+
+    @abstractmethod
+    def get_readable_name(self, media_name: str) -> str:
+        """Retrieves the readable name of given media."""
+
+    @abstractmethod
+    def get_last_updated(self, media_name: str) -> int:
+        """Retrieves the Unix time stamp in seconds when media was scraped."""
+
+    @abstractmethod
+    def get_track_uris_media(self, media_name: str) -> List[str]:
+        """Retrieves song URIs referenced by given media not of type show."""
+
+    @abstractmethod
+    def get_track_uris_show(self,
+                            media_name: str,
+                            restrict_to_season: Optional[int] = None) -> List[str]:
+        """Retrieves song URIs referenced by given show.
+
+        Args:
+            media_name: Name of the media.
+            restrict_to_season: Only returns URIs for a specified season. Season
+                enumeration starts at 1. Optional, defaults to None in which
+                case URIs across all seasons are returned.
+
+        Returns:
+            List of song URI referenced by media name.
+
+        Raises:
+            ValueError: If case `restrict_to_season` is out-of-bounds.
+        """
+
+    @abstractmethod
+    def get_track_uris_by_episode(self, media_name: str) -> Dict[Tuple[int, int], List[str]]:
+        """Retrieves song URIs referenced by given show grouped by episode.
+
+        Args:
+            media_name: Name of the media.
+
+        Returns:
+            Dictionary mapping tuples of season and episode number (starting at
+            1) to song URIs, ordered by season and episode. Episodes without
+            song URIs are omitted.
+        """
+
+    @abstractmethod
+    def search(self, query: str, limit: Optional[int] = 20) -> List[Dict[str, Optional[str]]]:
+        """Full-text search over song names, artists and readable media names.
+
+        Args:
+            query: Search terms. Each word must match (as prefix) for a hit.
+            limit: Maximum number of hits returned. Optional, defaults to 20.
+
+        Returns:
+            List of hits as dictionaries with keys `media_name`,
+            `readable_name`, `song_name`, `artists` and `spotify_uri`, hits on
+            media before hits on songs. The song related values are `None` for
+            hits on the media itself.
+        """
+
+    @abstractmethod
+    def get_media_for_artist(self, artist: str) -> List[str]:
+        """Retrieves names of all media in which songs of given artist appear."""
+
+    @abstractmethod
+    def get_songs_for_artist(self, artist: str) -> List[Dict[str, str]]:
+        """Retrieves songs of given artist as dictionaries with keys
+        `song_name`, `artists` and `spotify_uri`."""
+
+    @abstractmethod
+    def get_run_changes(self, run_id: int) -> Dict[str, int]:
+        """Counts the changes recorded for given run by type (`episode`,
+        `song`, `match`)."""
+
+    @abstractmethod
+    def has_changes(self,
+                    media_name: str,
+                    since_run: Optional[int] = None,
+                    episodes: Optional[Collection[Tuple[int, int]]] = None) -> bool:
+        """Checks whether any run of given media (after run `since_run`) added
+        data, optionally only to given episodes (tuples of season and episode
+        number) including songs of these episodes linked to Spotify."""
+
+    @abstractmethod
+    def get_new_track_uris(self, media_name: str, since_run: Optional[int] = None) -> List[str]:
+        """Retrieves URIs of songs that runs of given media (after run
+        `since_run`) added to it."""
+
+    @abstractmethod
+    def record_export(self, media_name: str, playlist_name: Optional[str] = None) -> None:
+        """Records that the latest run of given media was exported, to the
+        playlist of the whole media or to the playlist with given name (e.g.
+        a season playlist)."""
+
+    @abstractmethod
+    def get_last_exported_run(self, media_name: str, playlist_name: Optional[str] = None) -> Optional[int]:
+        """Retrieves the latest run of given media that was exported to the
+        playlist of the whole media (or with given name) or `None` if it was
+        never exported there."""
+
+    @abstractmethod
+    def get_playlist_state(self, name: str) -> Optional[PlaylistState]:
+        """Retrieves the mirrored state of the playlist with given name or
+        `None` if it was never exported."""
+
+    @abstractmethod
+    def set_playlist_state(self, state: PlaylistState) -> None:
+        """Stores the state of a playlist, replacing the previous one."""
+
+    @abstractmethod
+    def get_unmatched_songs(self, media_name: Optional[str] = None) -> List[Dict[str, str]]:
+        """Retrieves songs (of given media) without Spotify URI as dictionaries
+        with keys `tunefind_id`, `song_name` and `artists`."""
+
+    @abstractmethod
+    def set_spotify_uris(self, uris: Dict[int, str]) -> None:
+        """Sets the Spotify URIs of songs without one by Tunefind ID and records
+        the songs as changes of a new run of each media they belong to."""
+
+    @abstractmethod
+    def get_search_cache(self, queries: List[str]) -> Dict[str, Tuple[Optional[str], float]]:
+        """Retrieves cached results of Spotify searches as tuples of the best
+        track URI (`None` if nothing was found) and its score by query."""
+
+    @abstractmethod
+    def set_search_cache(self, results: Dict[str, Tuple[Optional[str], float]]) -> None:
+        """Caches results of Spotify searches, see `get_search_cache`."""
+
+    @abstractmethod
+    def get_track_availability(self,
+                               track_uris: List[str],
+                               market: Optional[str] = None,
+                               max_age: Optional[int] = None) -> Dict[str, bool]:
+        """Retrieves the cached availability of given tracks on Spotify in
+        given market, omitting tracks not checked within the last `max_age`
+        seconds."""
+
+    @abstractmethod
+    def set_track_availability(self, availability: Dict[str, bool], market: Optional[str] = None) -> None:
+        """Caches the availability of tracks by URI in given market as
+        checked now."""
+
+    def get_playlist_description(self, media_name: str) -> str:
+        """Creates playlist description for given media name.
+
+        Args:
+            media_name: Name of the media.
+
+        Returns:
+            Description as format string of Tunefind link + scraping date
+        """
+        description_format = 'sourced from: https://www.tunefind.com/{}/{} | last-updated: {}'
+        media_type = self.get_media_type(media_name)
+        last_updated = self.get_last_updated(media_name)
+        date_str = datetime.strftime(datetime.fromtimestamp(last_updated), '%Y-%m-%d %H:%M:%S')
+        x = description_format.format(media_type.name.lower(), media_name, date_str)
+        return x
+
+
+class InMemoryStorage(Storage):
+    """Storage that keeps all data in memory of the running process.
+
+    Note:
+        Songs, episodes and runs are identified by their (1-based) position in
+        respective lists. Other than `DBConnector`, inserts are not atomic.
+    """
+
+    def __init__(self) -> None:
+        """Initializes empty storage."""
+        self._media = {}  # media name -> dict of media attributes
+        self._songs = []  # list of song dicts in the schema of the scraper
+        self._song_keys = {}  # Tunefind ID -> song key
+        self._episodes = {}  # media name -> {(season, episode): episode key}
+        self._episode_ids = []  # Tunefind ID for each episode key
+        self._matches = {}  # media name -> {episode key or 0: list of song keys}
+        self._media_songs = {}  # media name -> dict of song keys (as ordered set)
+        self._song_media = {}  # song key -> dict of media names (as ordered set)
+        self._artist_songs = {}  # lowercase artist name -> list of song keys
+        self._song_tokens = {}  # lowercase word -> set of song keys
+        self._media_tokens = {}  # lowercase word -> set of media names
+        self._runs = []  # list of media names per run key
+        self._changes = []  # list of tuples (run key, change type, episode key, song key)
+        self._exports = {}  # tuple (media name, playlist name or None) -> latest exported run key
+        self._playlists = {}  # playlist name -> playlist state
+        self._availability = {}  # tuple (track URI, market or None) -> tuple (available, timestamp of check)
+        self._search_cache = {}  # query -> tuple (track URI or None, score)
+        logger.debug(f'In-memory storage {self} initialized.')
+
+    def insert_json_data(self, data: dict) -> int:
+        media_name = data['media_name']
+        last_updated = data.get('last_updated') or int(datetime.now().timestamp())
+        if media_name in self._media:
+            self._media[media_name]['last_updated'] = max(self._media[media_name]['last_updated'], last_updated)
+        else:
+            self._media[media_name] = dict(media_type=MediaType(data['media_type']),
+                                           readable_name=data['readable_name'],
+                                           last_updated=last_updated)
+            self._matches[media_name] = {}
+            self._media_songs[media_name] = {}
+            for token in _tokenize(data['readable_name']):
+                self._media_tokens.setdefault(token, set()).add(media_name)
+        self._runs.append(media_name)
+        run_key = len(self._runs)
+        if data['media_type'] == MediaType.SHOW:
+            episodes = self._episodes.setdefault(media_name, {})
+            for s, season in enumerate(data['seasons']):
+                for e, episode in enumerate(season['episodes']):
+                    if (s + 1, e + 1) not in episodes:
+                        self._episode_ids.append(episode['id'])
+                        episodes[(s + 1, e + 1)] = len(self._episode_ids)
+                        self._changes.append((run_key, 'episode', len(self._episode_ids), None))
+                    self._insert_matches(media_name, episodes[(s + 1, e + 1)], episode['songs'], run_key)
+        else:
+            self._insert_matches(media_name, 0, data['songs'], run_key)
+        return run_key
+
+    def _insert_matches(self, media_name: str, episode_key: int, songs: List[dict], run_key: int) -> None:
+        """Inserts songs (if not exist) and references them to media/episode.
+
+        Args:
+            media_name: Name of the media.
+            episode_key: Key of the episode or 0 for media not of type show.
+            songs: List of song dictionaries in the schema of the scraper.
+            run_key: Key of the run of the ingest.
+        """
+        matches = self._matches[media_name].setdefault(episode_key, [])
+        media_songs = self._media_songs[media_name]
+        for song in songs:
+            song_key = self._insert_song(song)
+            if song_key in matches:
+                continue
+            matches.append(song_key)
+            if episode_key:
+                self._changes.append((run_key, 'match', episode_key, song_key))
+            if song_key not in media_songs:
+                media_songs[song_key] = None
+                self._song_media.setdefault(song_key, {})[media_name] = None
+                self._changes.append((run_key, 'song', None, song_key))
+
+    def _insert_song(self, song: dict) -> int:
+        """Inserts song (if not exists) and indexes its words and artists.
+
+        Args:
+            song: Song dictionary in the schema of the scraper.
+
+        Returns:
+            Key of the song.
+        """
+        if song['id'] in self._song_keys:
+            return self._song_keys[song['id']]
+        self._songs.append(dict(id=song['id'], name=song['name'], spotify=song['spotify'], artists=song['artists']))
+        key = self._song_keys[song['id']] = len(self._songs)
+        for artist in split_artists(song['artists']):
+            self._artist_songs.setdefault(artist.lower(), []).append(key)
+        for token in _tokenize(f'{song["name"]} {song["artists"]}'):
+            self._song_tokens.setdefault(token, set()).add(key)
+        return key
+
+    def get_json_data(self, media_name: str) -> dict:
+        media = self._media[media_name]
+        data = dict(media_name=media_name, **media)
+        matches = self._matches[media_name]
+        if media['media_type'] == MediaType.SHOW:
+            data['seasons'] = []
+            for (season, _), episode_key in sorted(self._episodes.get(media_name, {}).items()):
+                while len(data['seasons']) < season:
+                    s = len(data['seasons']) + 1
+                    data['seasons'].append(dict(name=f'Season {s}', id=f'season/{s}', episodes=[]))
+                episodes = data['seasons'][season - 1]['episodes']
+                episodes.append(dict(name=f'Episode {len(episodes) + 1}',
+                                     id=self._episode_ids[episode_key - 1],
+                                     songs=[dict(self._songs[x - 1]) for x in matches.get(episode_key, [])]))
+        else:
+            data['songs'] = [dict(self._songs[x - 1]) for x in matches.get(0, [])]
+        return data
+
+    def get_media_names(self) -> List[str]:
+        return list(self._media)
+
+    def media_exists(self, media_name: str) -> bool:
+        return media_name in self._media
+
+    def get_media_type(self, media_name: str) -> MediaType:
+        return self._media[media_name]['media_type']
+
+    def get_readable_name(self, media_name: str) -> str:
+        return self._media[media_name]['readable_name']
+
+    def get_last_updated(self, media_name: str) -> int:
+        return int(self._media[media_name]['last_updated'])
+
+    def get_track_uris_media(self, media_name: str) -> List[str]:
+        matches = self._matches.get(media_name, {})
+        return [uri for x in matches.get(0, []) if (uri := self._songs[x - 1]['spotify'])]
+
+    def get_track_uris_show(self,
+                            media_name: str,
+                            restrict_to_season: Optional[int] = None) -> List[str]:
+        episodes = sorted(self._episodes.get(media_name, {}).items())
+        if restrict_to_season is not None:
+            episodes = [x for x in episodes if x[0][0] == restrict_to_season]
+            if not episodes:
+                log_and_raise(logger, ValueError,
+                              f'Parameter `restrict-to-season` out-of-bounds with value: {restrict_to_season}')
+        matches = self._matches.get(media_name, {})
+        return [uri for _, episode_key in episodes for x in matches.get(episode_key, [])
+                if (uri := self._songs[x - 1]['spotify'])]
+
+    def get_track_uris_by_episode(self, media_name: str) -> Dict[Tuple[int, int], List[str]]:
+        matches = self._matches.get(media_name, {})
+        episodes = {}
+        for episode, episode_key in sorted(self._episodes.get(media_name, {}).items()):
+            if uris := [uri for x in matches.get(episode_key, []) if (uri := self._songs[x - 1]['spotify'])]:
+                episodes[episode] = uris
+        return episodes
+
+    def search(self, query: str, limit: Optional[int] = 20) -> List[Dict[str, Optional[str]]]:
+        tokens = _tokenize(query)
+        if not tokens:
+            return []
+        hits = [dict(media_name=x, readable_name=self._media[x]['readable_name'],
+                     song_name=None, artists=None, spotify_uri=None)
+                for x in sorted(_match_tokens(self._media_tokens, tokens))]
+        for song_key in sorted(_match_tokens(self._song_tokens, tokens)):
+            song = self._songs[song_key - 1]
+            hits.extend(dict(media_name=x, readable_name=self._media[x]['readable_name'], song_name=song['name'],
+                             artists=song['artists'], spotify_uri=song['spotify'])
+                        for x in self._song_media.get(song_key, {}))
+        return hits[:limit]
+
+    def get_media_for_artist(self, artist: str) -> List[str]:
+        media = {}
+        for song_key in self._artist_songs.get(artist.lower(), []):
+            media.update(self._song_media.get(song_key, {}))
+        return list(media)
+
+    def get_songs_for_artist(self, artist: str) -> List[Dict[str, str]]:
+        songs = [self._songs[x - 1] for x in self._artist_songs.get(artist.lower(), [])]
+        return [dict(song_name=x['name'], artists=x['artists'], spotify_uri=x['spotify']) for x in songs]
+
+    def get_run_changes(self, run_id: int) -> Dict[str, int]:
+        changes = {'episode': 0, 'song': 0, 'match': 0}
+        for run_key, change_type, *_ in self._changes:
+            if run_key == run_id:
+                changes[change_type] += 1
+        return changes
+
+    def _changed_songs(self, media_name: str, since_run: Optional[int]) -> List[int]:
+        """Keys of songs new to the media in runs after `since_run`."""
+        return [song_key for run_key, change_type, _, song_key in self._changes
+                if change_type == 'song' and run_key > (since_run or 0) and self._runs[run_key - 1] == media_name]
+
+    def has_changes(self,
+                    media_name: str,
+                    since_run: Optional[int] = None,
+                    episodes: Optional[Collection[Tuple[int, int]]] = None) -> bool:
+        changes = [(episode_key, song_key) for run_key, _, episode_key, song_key in self._changes
+                   if run_key > (since_run or 0) and self._runs[run_key - 1] == media_name]
+        if episodes is None:
+            return bool(changes)
+        keys = self._episodes.get(media_name, {})
+        episode_keys = {keys[x] for x in episodes if x in keys}
+        matches = self._matches.get(media_name, {})
+        return any(episode_key in episode_keys if episode_key is not None
+                   else any(song_key in matches.get(x, []) for x in episode_keys)
+                   for episode_key, song_key in changes)
+
+    def get_new_track_uris(self, media_name: str, since_run: Optional[int] = None) -> List[str]:
+        return list(dict.fromkeys(uri for x in self._changed_songs(media_name, since_run)
+                                  if (uri := self._songs[x - 1]['spotify'])))
+
+    def record_export(self, media_name: str, playlist_name: Optional[str] = None) -> None:
+        runs = [i + 1 for i, x in enumerate(self._runs) if x == media_name]
+        if runs:
+            self._exports[media_name, playlist_name] = runs[-1]
+
+    def get_last_exported_run(self, media_name: str, playlist_name: Optional[str] = None) -> Optional[int]:
+        return self._exports.get((media_name, playlist_name))
+
+    def get_playlist_state(self, name: str) -> Optional[PlaylistState]:
+        state = self._playlists.get(name)
+        return None if state is None else replace(state, track_uris=list(state.track_uris))
+
+    def set_playlist_state(self, state: PlaylistState) -> None:
+        self._playlists[state.name] = replace(state, track_uris=list(state.track_uris))
+
+    def get_unmatched_songs(self, media_name: Optional[str] = None) -> List[Dict[str, str]]:
+        keys = self._media_songs.get(media_name, {}) if media_name is not None else range(1, len(self._songs) + 1)
+        return [dict(tunefind_id=x['id'], song_name=x['name'], artists=x['artists'])
+                for x in (self._songs[key - 1] for key in keys) if not x['spotify']]
+
+    def set_spotify_uris(self, uris: Dict[int, str]) -> None:
+        media = {}
+        for tunefind_id, uri in uris.items():
+            if (key := self._song_keys.get(tunefind_id)) is not None and not self._songs[key - 1]['spotify']:
+                self._songs[key - 1]['spotify'] = uri
+                for media_name in self._song_media.get(key, {}):
+                    media.setdefault(media_name, set()).add(key)
+        for media_name, keys in media.items():
+            self._runs.append(media_name)
+            self._changes.extend((len(self._runs), 'song', None, x) for x in sorted(keys))
+
+    def get_search_cache(self, queries: List[str]) -> Dict[str, Tuple[Optional[str], float]]:
+        return {x: self._search_cache[x] for x in queries if x in self._search_cache}
+
+    def set_search_cache(self, results: Dict[str, Tuple[Optional[str], float]]) -> None:
+        self._search_cache.update(results)
+
+    def get_track_availability(self,
+                               track_uris: List[str],
+                               market: Optional[str] = None,
+                               max_age: Optional[int] = None) -> Dict[str, bool]:
+        oldest = 0 if max_age is None else datetime.now().timestamp() - max_age
+        return {uri: x[0] for uri in track_uris
+                if (x := self._availability.get((uri, market or None))) and x[1] >= oldest}
+
+    def set_track_availability(self, availability: Dict[str, bool], market: Optional[str] = None) -> None:
+        now = int(datetime.now().timestamp())
+        self._availability.update(((uri, market or None), (available, now)) for uri, available in availability.items())
+
+
+def split_artists(artists: str) -> List[str]:
+    """Splits the comma-separated artists string as built by the scraper.
+
+    Args:
+        artists: String of comma-separated artist names.
+
+    Returns:
+        List of distinct artist names in order of appearance.
+    """
+    return list(dict.fromkeys(x.strip() for x in artists.split(', ') if x.strip()))
+
+
+def _tokenize(text: str) -> List[str]:
+    """Splits text into lowercase words."""
+    return re.findall(r'\w+', text.lower())
+
+
+def _match_tokens(index: Dict[str, Set], tokens: List[str]) -> Set:
+    """Intersection of the index entries of words prefixed by each token."""
+    result = None
+    for token in tokens:
+        entries = set()
+        for word, keys in index.items():
+            if word.startswith(token):
+                entries |= keys
+        result = entries if result is None else result & entries
+    return result
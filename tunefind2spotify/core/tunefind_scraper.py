@@ -3,7 +3,23 @@
 Utilizes Tunefind's undocumented API at `https://tunefind.com/api/frontend/` to
 scrape information about songs and the links to respective tracks on Spotify.
 
+All requests go through one session, so that connections are kept alive and
+reused. Throttled requests (HTTP 429) and transient failures (HTTP 5xx) are
+retried with exponential backoff, respecting the `Retry-After` header up to
+`MAX_RETRY_AFTER` seconds.
+Requests are recorded by `tunefind2spotify.trace` while tracing is enabled.
+Responses can be recorded into a directory and replayed from it instead of
+the network (see `record` and `replay`).
+
 Attributes:
+    BASE_URL (str): Root of Tunefind's website, prefixed to forward links.
+    API (str): Root of Tunefind's frontend API.
+    TIMEOUT (float): Timeout in seconds for connecting and for reading.
+    RETRIES (int): Number of retries of a throttled or failing request.
+    BACKOFF (float): Backoff factor in seconds between retries.
+    MAX_RETRY_AFTER (float): Maximal wait in seconds before retrying a
+        throttled request, however long `Retry-After` asks to wait.
+    RETRY_STATUS (Tuple[int]): HTTP status codes of requests to be retried.
     MEDIA_MAP (dict): Maps each MediaType to its respective scraping function.
 
 """
@@ -12,8 +28,12 @@ import requests
 
 from typing import Optional
 
+from requests.adapters import HTTPAdapter
 from tqdm import tqdm
+from urllib3.util.retry import Retry
 
+from tunefind2spotify import stats, trace
+from tunefind2spotify.core.recording import RecordingAdapter, ReplayAdapter
 from tunefind2spotify.exceptions import log_and_raise, EmptyJSONResponse, MediaNotFound
 from tunefind2spotify.log import fetch_logger
 from tunefind2spotify.utils import MediaType, dict_keep
@@ -21,7 +41,111 @@ from tunefind2spotify.utils import MediaType, dict_keep
 
 logger = fetch_logger(__name__)
 
-API = 'https://www.tunefind.com/api/frontend'
+BASE_URL = 'https://www.tunefind.com'
+API = f'{BASE_URL}/api/frontend'
+TIMEOUT = 30.0
+RETRIES = 3
+BACKOFF = 0.5
+MAX_RETRY_AFTER = 60.0
+RETRY_STATUS = (429, 500, 502, 503, 504)
+
+
+class _Retry(Retry):
+    """Retry configuration capping the wait requested by `Retry-After` at `MAX_RETRY_AFTER`."""
+
+    def parse_retry_after(self, retry_after: str) -> float:
+        seconds = super().parse_retry_after(retry_after)
+        if seconds > MAX_RETRY_AFTER:
+            logger.warning(f'Tunefind asks to wait {seconds:.0f}s before retrying, waiting {MAX_RETRY_AFTER:.0f}s.')
+            return MAX_RETRY_AFTER
+        return seconds
+
+
+def _create_session() -> requests.Session:
+    """Creates the session of the scraper, retrying throttled and failing requests."""
+    retry = _Retry(total=RETRIES,
+                   backoff_factor=BACKOFF,
+                   status_forcelist=RETRY_STATUS,
+                   allowed_methods=['GET'],
+                   respect_retry_after_header=True,
+                   raise_on_status=False)
+    session = requests.Session()
+    session.mount('http://', HTTPAdapter(max_retries=retry))
+    session.mount('https://', HTTPAdapter(max_retries=retry))
+    trace.install(session)
+    return session
+
+
+_session = _create_session()
+
+
+def set_base_url(url: str) -> None:
+    """Points the scraper to another host, e.g. a local stand-in of Tunefind.
+
+    Args:
+        url: Root of the website, e.g. `http://127.0.0.1:8080`.
+    """
+    global BASE_URL, API
+    BASE_URL = url.rstrip('/')
+    API = f'{BASE_URL}/api/frontend'
+
+
+def reset_session() -> None:
+    """Replaces the session of the scraper by a fresh one, ending recording or replaying."""
+    global _session
+    _session = _create_session()
+
+
+def record(directory: str) -> None:
+    """Stores every response to requests of the scraper from now on.
+
+    Args:
+        directory: Directory to store responses in, created if missing.
+    """
+    for prefix in ['http://', 'https://']:
+        _session.mount(prefix, RecordingAdapter(directory, _session.get_adapter(prefix)))
+    logger.info(f'Recording responses into \'{directory}\'.')
+
+
+def replay(directory: str) -> None:
+    """Answers requests of the scraper from now on with responses stored by `record`.
+
+    Note:
+        No request reaches the network, requests without stored response fail
+        with `requests.ConnectionError`.
+
+    Args:
+        directory: Directory the responses were stored in.
+
+    Raises:
+        FileNotFoundError: In case the directory does not exist.
+    """
+    adapter = ReplayAdapter(directory)
+    for prefix in ['http://', 'https://']:
+        _session.mount(prefix, adapter)
+    logger.info(f'Replaying responses from \'{directory}\'.')
+
+
+def _get(url: str, allow_redirects: Optional[bool] = True) -> requests.Response:
+    """Issues a GET request within the session of the scraper.
+
+    Args:
+        url: The full url to which make the request to.
+        allow_redirects: Follow redirects. Optional, defaults to True.
+
+    Returns:
+        The response, after retries in case of throttling or failures.
+
+    Raises:
+        requests.RequestException: Any Exception with the request.
+    """
+    resp = _session.get(url, allow_redirects=allow_redirects, timeout=TIMEOUT)
+    # retries are recorded per hop of redirects
+    retried = sum(len(x.history) for x in [getattr(r.raw, 'retries', None) for r in resp.history + [resp]] if x)
+    if retried:
+        stats.count('tunefind.retries', retried)
+        logger.debug('Retried request to %s %d times.', url, retried)
+    return resp
 
 
 def _fetch_json(url: str) -> dict:
@@ -38,8 +162,11 @@ def _fetch_json(url: str) -> dict:
         requests.RequestException: Any Exception with the request.
     """
     try:
-        resp = requests.get(url)
-        logger.debug(f'Response {resp.status_code} for request to {url}')
+        with stats.timer('tunefind.json'):
+            resp = _get(url)
+        stats.count('tunefind.json.bytes', len(resp.content))
+        logger.debug('Response %s for request to %s', resp.status_code, url)
+        resp.raise_for_status()
         result = resp.json()
         if result:
             return result
@@ -65,20 +192,22 @@ def handle_redirect_link(url: str) -> str:
     """
     retry_limit = 3
     try:
-        resp = requests.get(url, allow_redirects=False)
+        with stats.timer('tunefind.redirect'):
+            resp = _get(url, allow_redirects=False)
         if resp.status_code == 302:
             i = 0
             while i < retry_limit and resp.status_code != 200:
                 try:
-                    resp = requests.get(url, allow_redirects=True)
+                    with stats.timer('tunefind.redirect.follow'):
+                        resp = _get(url)
                 except ConnectionError:
                     pass
                 i += 1
             x = f'spotify:track:{resp.url.split("/")[-1]}'
-            logger.debug(f'Replaced forward link \'{url}\' -> \'{x}\'.')
+            logger.debug('Replaced forward link \'%s\' -> \'%s\'.', url, x)
             return x
         else:
-            logger.debug(f'No redirect for url: \'{url}\'.')
+            logger.debug('No redirect for url: \'%s\'.', url)
     except Exception as e:
         log_and_raise(logger, e, '')
     return ''
@@ -127,7 +256,7 @@ def _scrape_show(media_name: str) -> dict:
                 song = dict_keep(se['song'], ['id', 'name', 'spotify', 'artists'])
                 song.update({'artists': ', '.join([x['name'] for x in song['artists']])})
                 song.update({'spotify': '' if song['spotify'] is None
-                             else handle_redirect_link(f'https://www.tunefind.com{song["spotify"]}')})
+                             else handle_redirect_link(f'{BASE_URL}{song["spotify"]}')})
                 songs.append(song)
             data['seasons'][s]['episodes'].append(
                     dict(name=f'Episode {e+1}',
@@ -169,7 +298,7 @@ def _scrape_movie(media_name: str) -> dict:
         song = dict_keep(s['song'], ['id', 'name', 'spotify', 'artists'])
         song.update({'artists': ', '.join([x['name'] for x in song['artists']])})
         song.update({'spotify': '' if song['spotify'] is None
-                     else handle_redirect_link(f'https://www.tunefind.com{song["spotify"]}')})
+                     else handle_redirect_link(f'{BASE_URL}{song["spotify"]}')})
         data['songs'].append(song)
     logger.info(f'Found {len(data["songs"])} songs in total.')
     return data
@@ -200,7 +329,7 @@ def _scrape_game(media_name: str) -> dict:
         song = dict_keep(s['song'], ['id', 'name', 'spotify', 'artists'])
         song.update({'artists': ', '.join([x['name'] for x in song['artists']])})
         song.update({'spotify': '' if song['spotify'] is None
-                     else handle_redirect_link(f'https://www.tunefind.com{song["spotify"]}')})
+                     else handle_redirect_link(f'{BASE_URL}{song["spotify"]}')})
         data['songs'].append(song)
     logger.info(f'Found {len(data["songs"])} songs in total.')
     return data
@@ -232,7 +361,8 @@ def _resource_exists(media_name: str, media_type: MediaType) -> bool:
     exists = False
     try:
         logger.debug(f'Probing media type \'{str(media_type)}\': {API}/{MediaType.translate(media_type)}/{media_name}')
-        exists = requests.get(f'{API}/{MediaType.translate(media_type)}/{media_name}').status_code == 200
+        with stats.timer('tunefind.probe'):
+            exists = _get(f'{API}/{MediaType.translate(media_type)}/{media_name}').status_code == 200
     except requests.RequestException as e:
         log_and_raise(logger, e, '')
     return exists
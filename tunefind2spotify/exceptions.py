@@ -15,6 +15,10 @@ class MediaNotFound(Exception):
     pass
 
 
+class PlaylistModified(Exception):
+    pass
+
+
 def log_and_raise(logger: logging.Logger, exception: BaseException or type, message: str) -> None:
     """Logs a gives message at ERROR level and raises the given exception.
 
@@ -1,25 +1,130 @@
-"""Factory and utils for module specific logging."""
+"""Factory and utils for module specific logging.
 
+All loggers returned by `fetch_logger` are children of the application's logger
+`ROOT_LOGGER_NAME` and share its handlers. Importing the package only attaches a
+`NullHandler`, as befits a library; the command line entrypoint sets up the
+handlers by `configure_logging`. The application's logger then only holds a
+`QueueHandler`; a `QueueListener` thread takes the records from the queue and
+writes them to the log file and to stderr, so that threads logging do not wait
+for I/O. `reset_logging` stops the listener and restores the `NullHandler`.
+
+Messages on hot paths are formatted lazily (`%`-style arguments) or guarded by
+`Logger.isEnabledFor`, so that debug messages cost next to nothing unless the
+log level is `DEBUG`.
+
+Attributes:
+    ROOT_LOGGER_NAME (str): Name of the logger all module loggers descend from.
+    DEFAULT_LOG_LEVEL (int): Log level used unless configured otherwise.
+    DEFAULT_LOG_FILE (str): Path of the log file used unless configured
+        otherwise.
+"""
+
+import atexit
 import logging
+import queue
+import sys
+import threading
+
+from logging.handlers import QueueHandler, QueueListener
+from typing import Optional, Union
+
+ROOT_LOGGER_NAME = 'tunefind2spotify'
+DEFAULT_LOG_LEVEL = logging.INFO
+DEFAULT_LOG_FILE = 't2s.log'
+
+_listener = None
+_lock = threading.Lock()
+
+logging.getLogger(ROOT_LOGGER_NAME).addHandler(logging.NullHandler())
+
+
+class _StderrHandler(logging.StreamHandler):
+    """Handler writing to `sys.stderr` as of each record, which may be replaced after setup."""
+
+    def __init__(self) -> None:
+        logging.Handler.__init__(self)
+
+    @property
+    def stream(self):
+        return sys.stderr
+
+
+def configure_logging(level: Optional[Union[int, str]] = DEFAULT_LOG_LEVEL,
+                      log_file: Optional[str] = DEFAULT_LOG_FILE) -> None:
+    """Sets up (or replaces) the handlers shared by all loggers of the application.
 
-_LOG_LEVEL = logging.INFO  # DEBUG
+    Args:
+        level: Log level as number or name. Optional, defaults to
+            `DEFAULT_LOG_LEVEL`.
+        log_file: Path of the file to append the log to, which is only opened
+            once the first record is written. Optional, defaults to
+            `DEFAULT_LOG_FILE`. `None` or an empty string disables logging to
+            file.
+    """
+    global _listener
+    with _lock:
+        _stop_listener()
+        handlers = []
+        if log_file:
+            fh = logging.FileHandler(filename=log_file, mode='a', delay=True)
+            fh.setFormatter(logging.Formatter(fmt='%(asctime)s | %(levelname)s:%(name)s:%(message)s',
+                                              datefmt='%Y-%m-%d %H:%M:%S'))
+            handlers.append(fh)
+        sh = _StderrHandler()
+        sh.setFormatter(logging.Formatter(fmt='%(levelname)s: %(message)s'))
+        handlers.append(sh)
+
+        records = queue.SimpleQueue()
+        _listener = QueueListener(records, *handlers)
+        _listener.start()
+        root = logging.getLogger(ROOT_LOGGER_NAME)
+        root.handlers.clear()
+        root.addHandler(QueueHandler(records))
+        root.setLevel(level.upper() if isinstance(level, str) else level)
+        root.propagate = False
+
+
+def _stop_listener() -> None:
+    """Writes all queued records and closes the handlers of the listener."""
+    global _listener
+    if _listener is not None:
+        _listener.stop()
+        for handler in _listener.handlers:
+            handler.close()
+        _listener = None
+
+
+def reset_logging() -> None:
+    """Stops the handlers set up by `configure_logging`, leaving the
+    application's logger to a `NullHandler` as after import."""
+    with _lock:
+        _stop_listener()
+        root = logging.getLogger(ROOT_LOGGER_NAME)
+        root.handlers.clear()
+        root.addHandler(logging.NullHandler())
+        root.setLevel(logging.NOTSET)
+        root.propagate = True
+
+
+def _shutdown() -> None:
+    with _lock:
+        _stop_listener()
+
+
+atexit.register(_shutdown)
 
 
 def fetch_logger(name: str) -> logging.Logger:
-    """Returns a named logger instance."""
-    logger = logging.getLogger(name)
-    logger.setLevel(_LOG_LEVEL)
-
-    fh = logging.FileHandler(filename='t2s.log', mode='a', )
-    ff = logging.Formatter(fmt='%(asctime)s | %(levelname)s:%(name)s:%(message)s', datefmt='%Y-%m-%d %H:%M:%S')
-    fh.setFormatter(ff)
-    logger.addHandler(fh)
-
-    sh = logging.StreamHandler()
-    sf = logging.Formatter(fmt='%(levelname)s: %(message)s')
-    sh.setFormatter(sf)
-    logger.addHandler(sh)
-    return logger
+    """Returns a named logger instance.
+
+    Note:
+        Names outside of the application's namespace (e.g. `__main__`) are
+        prefixed with `ROOT_LOGGER_NAME`. Records are discarded (or passed on
+        to Python's root logger) until `configure_logging` is called.
+    """
+    if name != ROOT_LOGGER_NAME and not name.startswith(f'{ROOT_LOGGER_NAME}.'):
+        name = f'{ROOT_LOGGER_NAME}.{name}'
+    return logging.getLogger(name)
 
 
 def flatten_multiline_string(x: str) -> str:
@@ -0,0 +1,220 @@
+"""Lightweight instrumentation of the stages of a run.
+
+Counters and timers are recorded in a process-wide registry, keyed by dotted
+names whose first component is the stage (e.g. `tunefind.json`, `db.execute`,
+`spotify.playlist_add_items`). Timers keep a running count, total and maximum
+and count durations in the buckets of a fixed histogram, so that their memory
+does not grow with the number of durations. Latency percentiles are estimated
+from the histogram, interpolating linearly within the bucket of the rank.
+
+Recording is disabled by default. While disabled, `count` returns immediately
+and `timer` returns a shared no-op context manager, so that instrumented hot
+paths cost next to nothing.
+
+Attributes:
+    HISTOGRAM_BOUNDS_MS (List[float]): Upper bounds in milliseconds of the
+        buckets of latency histograms. Durations above the last bound fall
+        into bucket `inf`.
+"""
+
+import bisect
+import json
+import math
+import threading
+import time
+
+from typing import Dict, Optional
+
+HISTOGRAM_BOUNDS_MS = [1, 2, 5, 10, 20, 50, 100, 200, 500, 1000, 2000, 5000]
+
+_enabled = False
+_lock = threading.Lock()
+_counters = {}  # name -> count
+_timings = {}  # name -> _Timing
+
+
+class _Timing:
+    """Running summary of the durations recorded under a name, in milliseconds."""
+
+    __slots__ = ('count', 'total', 'max', 'buckets')
+
+    def __init__(self) -> None:
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+        self.buckets = [0] * (len(HISTOGRAM_BOUNDS_MS) + 1)
+
+    def add(self, ms: float) -> None:
+        self.count += 1
+        self.total += ms
+        self.max = max(self.max, ms)
+        self.buckets[bisect.bisect_left(HISTOGRAM_BOUNDS_MS, ms)] += 1
+
+    def copy(self) -> '_Timing':
+        timing = _Timing()
+        timing.count, timing.total, timing.max, timing.buckets = self.count, self.total, self.max, list(self.buckets)
+        return timing
+
+
+class _Timer:
+    """Context manager recording its duration under a name."""
+
+    __slots__ = ('name', 'start')
+
+    def __init__(self, name: str) -> None:
+        self.name = name
+        self.start = 0.0
+
+    def __enter__(self) -> '_Timer':
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc) -> None:
+        record(self.name, time.perf_counter() - self.start)
+
+
+class _NullTimer:
+    """Context manager doing nothing, used while recording is disabled."""
+
+    __slots__ = ()
+
+    def __enter__(self) -> '_NullTimer':
+        return self
+
+    def __exit__(self, *exc) -> None:
+        pass
+
+
+_NULL_TIMER = _NullTimer()
+
+
+def enable(enabled: Optional[bool] = True) -> None:
+    """Switches recording on (or off)."""
+    global _enabled
+    _enabled = enabled
+
+
+def is_enabled() -> bool:
+    """Checks whether recording is switched on."""
+    return _enabled
+
+
+def reset() -> None:
+    """Discards everything recorded so far."""
+    with _lock:
+        _counters.clear()
+        _timings.clear()
+
+
+def count(name: str, n: Optional[int] = 1) -> None:
+    """Adds to a counter.
+
+    Args:
+        name: Name of the counter.
+        n: Value to add. Optional, defaults to 1.
+    """
+    if _enabled:
+        with _lock:
+            _counters[name] = _counters.get(name, 0) + n
+
+
+def record(name: str, seconds: float) -> None:
+    """Records a duration.
+
+    Args:
+        name: Name of the timer.
+        seconds: Duration in seconds.
+    """
+    if _enabled:
+        with _lock:
+            if (timing := _timings.get(name)) is None:
+                timing = _timings[name] = _Timing()
+            timing.add(seconds * 1000)
+
+
+def timer(name: str):
+    """Returns a context manager recording the duration of its body.
+
+    Args:
+        name: Name of the timer.
+    """
+    return _Timer(name) if _enabled else _NULL_TIMER
+
+
+def _percentile(timing: _Timing, q: float) -> float:
+    """Estimates the nearest-rank percentile from the histogram of a timer.
+
+    Note:
+        The bucket holding the rank spans from the bound below it (0 for the
+        first bucket) to its bound, capped by the maximum recorded. The last
+        bucket is unbounded and spans up to the maximum.
+    """
+    rank = max(1, math.ceil(q / 100 * timing.count))
+    below = 0
+    for i, n in enumerate(timing.buckets):
+        if below + n >= rank:
+            lower = HISTOGRAM_BOUNDS_MS[i - 1] if i else 0.0
+            upper = min(HISTOGRAM_BOUNDS_MS[i] if i < len(HISTOGRAM_BOUNDS_MS) else math.inf, timing.max)
+            return lower + (upper - lower) * (rank - below) / n
+        below += n
+    return timing.max
+
+
+def _summarize(timing: _Timing) -> dict:
+    """Summarizes a timer in milliseconds, see `snapshot`."""
+    bounds = [str(x) for x in HISTOGRAM_BOUNDS_MS + [math.inf]]
+    return {'count': timing.count,
+            'total_ms': timing.total,
+            'p50_ms': _percentile(timing, 50),
+            'p95_ms': _percentile(timing, 95),
+            'max_ms': timing.max,
+            'histogram': {k: v for k, v in zip(bounds, timing.buckets) if v}}
+
+
+def snapshot() -> Dict[str, dict]:
+    """Returns everything recorded so far.
+
+    Returns:
+        Dictionary with keys `counters` (count by name) and `timers` (by name,
+        dictionaries with keys `count`, `total_ms`, `p50_ms`, `p95_ms`,
+        `max_ms` and `histogram`, the latter counting durations by upper bound
+        of their bucket in milliseconds). Percentiles are estimates, see
+        `_percentile`.
+    """
+    with _lock:
+        counters = dict(_counters)
+        timings = {k: v.copy() for k, v in _timings.items()}
+    return {'counters': dict(sorted(counters.items())),
+            'timers': {k: _summarize(v) for k, v in sorted(timings.items())}}
+
+
+def format_report(data: Optional[dict] = None, as_json: Optional[bool] = False) -> str:
+    """Formats a report of everything recorded, grouped by stage.
+
+    Args:
+        data: Snapshot to format. Optional, defaults to `None` in which case a
+            snapshot is taken.
+        as_json: Format as JSON instead of a table. Optional, defaults to
+            False.
+
+    Returns:
+        The report.
+    """
+    data = snapshot() if data is None else data
+    if as_json:
+        return json.dumps(data, indent=2)
+    names = sorted(set(data['counters']) | set(data['timers']))
+    width = max([len(x) for x in names] + [len('name')])
+    lines = [f'{"name":<{width}} {"count":>9} {"total ms":>10} {"p50 ms":>9} {"p95 ms":>9} {"max ms":>9}']
+    stage = None
+    for name in names:
+        if name.split('.')[0] != stage:
+            stage = name.split('.')[0]
+            lines.append(f'[{stage}]')
+        if name in data['timers']:
+            x = data['timers'][name]
+            lines.append(f'{name:<{width}} {x["count"]:>9} {x["total_ms"]:>10.1f} {x["p50_ms"]:>9.2f} '
+                         f'{x["p95_ms"]:>9.2f} {x["max_ms"]:>9.2f}')
+        if name in data['counters']:
+            lines.append(f'{name:<{width}} {data["counters"][name]:>9}')
+    return '\n'.join(lines)
@@ -0,0 +1,180 @@
+"""Opt-in tracing of HTTP requests, written as HAR file.
+
+Sessions of `requests` are instrumented by `install`, e.g. the session of the
+Tunefind scraper and the one of the `spotipy` client. While tracing is enabled,
+every response received through them is recorded as an entry of an HTTP
+Archive (HAR 1.2), which browsers' developer tools and HAR viewers display as a
+waterfall:
+
+- `request`: method, URL, query string and body size.
+- `response`: status, content size and type, and for redirects the target in
+  `redirectURL`. Every hop of a redirect chain is an entry of its own.
+- `timings`: `connect` (including the TLS handshake, -1 for reused
+  connections), `wait` (until the headers were received, i.e. time to first
+  byte, including retries) and `receive` (reading the body), in milliseconds.
+- `_retries`: number of retries of the request (throttling, server errors).
+
+Headers are not recorded, as requests to Spotify carry the access token.
+
+Tracing is disabled by default, in which case the instrumented sessions only
+pay for a function call per response.
+"""
+
+import datetime
+import json
+import threading
+import time
+
+from typing import List, Optional
+from urllib.parse import parse_qsl, urlsplit
+
+import requests
+
+from requests.adapters import HTTPAdapter
+from urllib3.connection import HTTPConnection, HTTPSConnection
+from urllib3.connectionpool import HTTPConnectionPool, HTTPSConnectionPool
+
+from tunefind2spotify.log import fetch_logger
+
+
+logger = fetch_logger(__name__)
+
+_enabled = False
+_lock = threading.Lock()
+_entries = []
+
+
+class _TracedHTTPConnection(HTTPConnection):
+    """Connection remembering how long connecting took."""
+
+    def connect(self) -> None:
+        start = time.perf_counter()
+        super().connect()
+        self.connect_seconds = time.perf_counter() - start
+
+
+class _TracedHTTPSConnection(HTTPSConnection):
+    """Connection remembering how long connecting, including the TLS handshake, took."""
+
+    def connect(self) -> None:
+        start = time.perf_counter()
+        super().connect()
+        self.connect_seconds = time.perf_counter() - start
+
+
+class _TracedHTTPConnectionPool(HTTPConnectionPool):
+    ConnectionCls = _TracedHTTPConnection
+
+
+class _TracedHTTPSConnectionPool(HTTPSConnectionPool):
+    ConnectionCls = _TracedHTTPSConnection
+
+
+def enable(enabled: Optional[bool] = True) -> None:
+    """Switches tracing on (or off)."""
+    global _enabled
+    _enabled = enabled
+
+
+def is_enabled() -> bool:
+    """Checks whether tracing is switched on."""
+    return _enabled
+
+
+def reset() -> None:
+    """Discards every entry traced so far."""
+    with _lock:
+        _entries.clear()
+
+
+def install(session: requests.Session) -> None:
+    """Instruments a session, so that its requests are traced while tracing is enabled.
+
+    Args:
+        session: Session to instrument. Installing twice has no further effect.
+    """
+    if _hook in session.hooks['response']:
+        return
+    session.hooks['response'].append(_hook)
+    for adapter in set(session.adapters.values()):
+        if isinstance(adapter, HTTPAdapter):
+            adapter.poolmanager.pool_classes_by_scheme = {'http': _TracedHTTPConnectionPool,
+                                                          'https': _TracedHTTPSConnectionPool}
+            adapter.poolmanager.clear()
+
+
+def _ms(seconds: float) -> float:
+    return round(seconds * 1000, 3)
+
+
+def _hook(response: requests.Response, *args, stream: Optional[bool] = False, **kwargs) -> None:
+    """Records a response as HAR entry, see `entries`."""
+    if not _enabled:
+        return
+    # only the first request on a new connection paid for connecting
+    connection = getattr(response.raw, 'connection', None)
+    connect = connection.__dict__.pop('connect_seconds', None) if connection is not None else None
+    start = time.perf_counter()
+    size = -1 if stream else len(response.content)
+    receive = time.perf_counter() - start
+    elapsed = response.elapsed.total_seconds()
+    retries = getattr(response.raw, 'retries', None)
+    request = response.request
+    body = request.body or b''
+    started = datetime.datetime.now(datetime.timezone.utc) - response.elapsed - datetime.timedelta(seconds=receive)
+    entry = {'startedDateTime': started.isoformat(timespec='milliseconds'),
+             'time': _ms(elapsed + receive),
+             'request': {'method': request.method,
+                         'url': request.url,
+                         'httpVersion': 'HTTP/1.1',
+                         'cookies': [],
+                         'headers': [],
+                         'queryString': [{'name': k, 'value': v} for k, v in parse_qsl(urlsplit(request.url).query)],
+                         'headersSize': -1,
+                         'bodySize': len(body.encode() if isinstance(body, str) else body)},
+             'response': {'status': response.status_code,
+                          'statusText': response.reason or '',
+                          'httpVersion': 'HTTP/1.1',
+                          'cookies': [],
+                          'headers': [],
+                          'content': {'size': size, 'mimeType': response.headers.get('Content-Type', '')},
+                          'redirectURL': response.headers.get('Location', '') if response.is_redirect else '',
+                          'headersSize': -1,
+                          'bodySize': size},
+             'cache': {},
+             'timings': {'blocked': -1,
+                         'dns': -1,
+                         'connect': -1 if connect is None else _ms(connect),
+                         'send': 0,
+                         'wait': _ms(max(0.0, elapsed - (connect or 0.0))),
+                         'receive': _ms(receive),
+                         'ssl': -1},
+             '_retries': len(retries.history) if retries else 0}
+    with _lock:
+        _entries.append(entry)
+
+
+def entries() -> List[dict]:
+    """Returns the HAR entries traced so far, in order of their responses."""
+    with _lock:
+        return list(_entries)
+
+
+def to_har() -> dict:
+    """Returns everything traced so far as HTTP Archive."""
+    return {'log': {'version': '1.2',
+                    'creator': {'name': 'tunefind2spotify', 'version': ''},
+                    'pages': [],
+                    'entries': sorted(entries(), key=lambda x: x['startedDateTime'])}}
+
+
+def write(path: str) -> None:
+    """Writes everything traced so far as HAR file.
+
+    Args:
+        path: Path of the file, conventionally ending with `.har`.
+    """
+    har = to_har()
+    with open(path, 'w') as f:
+        json.dump(har, f, indent=1)
+    logger.info(f'Wrote trace of {len(har["log"]["entries"])} requests to \'{path}\'.')
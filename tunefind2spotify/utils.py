@@ -1,9 +1,10 @@
 """Collection of project wide utility functions."""
 
 import enum
+import gzip
 
 from functools import wraps
-from typing import List
+from typing import IO, List
 
 
 def singleton(cls):
@@ -75,3 +76,18 @@ def dict_keep(d: dict, keys: List[object]) -> dict:
         A new dictionary with at most the keys specified by `keys`.
     """
     return {k: v for k, v in d.items() if k in keys}
+
+
+def open_text(path: str, mode: str) -> IO[str]:
+    """Opens a text file that is transparently gzip compressed by extension.
+
+    Args:
+        path: Path to the file. Files ending with `.gz` are (de)compressed.
+        mode: Either `'r'` or `'w'`.
+
+    Returns:
+        File object in text mode.
+    """
+    if path.endswith('.gz'):
+        return gzip.open(path, mode + 't', encoding='utf-8')
+    return open(path, mode, encoding='utf-8')